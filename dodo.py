@@ -174,6 +174,28 @@ def task_py2xml():
             }
 
 
+def task_bench_parallel():
+    """benchmark py2xml multiprocess conversion by number of workers"""
+    return {
+        'actions': ['python -m pyreg.py2xml_parallel %(module)s'],
+        'params': [{'name': 'module', 'short': 'm',
+                    'default': 'pyreg/py2xml_pos.py',
+                    'help': 'python module to be converted'}],
+        'verbosity': 2,
+        }
+
+
+def task_bench_compact():
+    """benchmark astview compact HTML against the tables HTML"""
+    return {
+        'actions': ['python -m pyreg.astview_compact %(module)s'],
+        'params': [{'name': 'module', 'short': 'm',
+                    'default': 'samples/sample2.py',
+                    'help': 'python module to be rendered'}],
+        'verbosity': 2,
+        }
+
+
 def task_roundtrip():
     """check roundtrip PY -> XML -> PY on all python stdlib files"""
 
@@ -0,0 +1,150 @@
+"""asyncio API, conversions are executed without blocking the event loop
+
+    from pyreg import aio
+    xml = await aio.convert(source)
+
+The work is done by an executor (default a process pool).
+A thread pool can be used but conversions are not executed in
+parallel, each process executes one conversion at a time.
+The number of conversions submitted to the executor is limited,
+other requests wait for a free slot.
+Results are cached by content, concurrent requests of the same
+content share a single conversion.
+"""
+
+import json
+import asyncio
+import hashlib
+import functools
+import weakref
+
+from .serve import execute, ResultCache
+
+
+# python3.6 has no get_running_loop()
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+class Converter:
+    """executes conversions on an executor
+
+    :param executor: `concurrent.futures.Executor`, default
+        a `ProcessPoolExecutor` created on first use. Conversions on
+        a `ThreadPoolExecutor` are executed one at a time.
+    :param max_concurrency: (int) max number of conversions
+        submitted to the executor at the same time
+    :param cache_size: (int) number of results kept in the LRU cache
+    """
+
+    def __init__(self, executor=None, max_concurrency=4, cache_size=128):
+        self._executor = executor
+        # executor passed by the caller is not shutdown by `close()`
+        self._own_executor = False
+        self.max_concurrency = max_concurrency
+        self.cache = ResultCache(cache_size)
+        # semaphore per event loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        # key -> 2-item list [task, number of waiting requests]
+        self._pending = {}
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(self.max_concurrency)
+            self._own_executor = True
+        return self._executor
+
+    def close(self):
+        """shutdown executor, if created by the converter"""
+        if self._own_executor:
+            self._executor.shutdown()
+            self._executor = None
+            self._own_executor = False
+
+    async def _run(self, op, source, filename, options):
+        loop = _running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        async with semaphore:
+            work = functools.partial(execute, op, source, filename, options)
+            return await loop.run_in_executor(self.executor, work)
+
+    def _done(self, key, task):
+        del self._pending[key]
+        if not task.cancelled() and task.exception() is None:
+            self.cache.put(key, task.result())
+
+    async def request(self, op, source, filename='<str>', **options):
+        """execute request, see `serve.execute`
+        :return: (str) result
+        """
+        key = (op, filename, json.dumps(options, sort_keys=True),
+               hashlib.sha256(source.encode('utf-8')).digest())
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        pending = self._pending.get(key)
+        if pending is None:
+            task = asyncio.ensure_future(
+                self._run(op, source, filename, options))
+            pending = self._pending[key] = [task, 0]
+            task.add_done_callback(functools.partial(self._done, key))
+        task = pending[0]
+        pending[1] += 1
+        try:
+            # shield: a cancelled request does not cancel other requests
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # last request waiting for the conversion
+            if pending[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            pending[1] -= 1
+
+    async def convert(self, source, filename='<str>', **options):
+        """:return: (str) XML, see `py2xml.py2xml`"""
+        return await self.request('py2xml', source, filename, **options)
+
+    async def reverse(self, xml):
+        """:return: (str) python source, see `py2xml.xml2py`"""
+        return await self.request('xml2py', xml)
+
+    async def render_ast_html(self, source, filename='<str>'):
+        """:return: (str) HTML, see `astview.ast2html`"""
+        return await self.request('astview', source, filename,
+                                  format='html')
+
+
+
+_converter = None
+
+def configure(executor=None, max_concurrency=4, cache_size=128):
+    """set the `Converter` used by module level functions"""
+    global _converter
+    if _converter is not None:
+        _converter.close()
+    _converter = Converter(executor, max_concurrency, cache_size)
+    return _converter
+
+def get_converter():
+    if _converter is None:
+        configure()
+    return _converter
+
+
+async def convert(source, filename='<str>', **options):
+    """:return: (str) XML, see `py2xml.py2xml`"""
+    return await get_converter().convert(source, filename, **options)
+
+async def reverse(xml):
+    """:return: (str) python source, see `py2xml.xml2py`"""
+    return await get_converter().reverse(xml)
+
+async def render_ast_html(source, filename='<str>'):
+    """:return: (str) HTML, see `astview.ast2html`"""
+    return await get_converter().render_ast_html(source, filename)
@@ -15,7 +15,7 @@ Fields describe the quantity and the category of child nodes.
 import json
 import argparse
 
-import jinja2
+from .jinja_env import get_env
 
 
 
@@ -212,10 +212,7 @@ class ASDL2HTML(ASDL):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.css = {} # map category to a CSS color
-        self.jinja_env = jinja2.Environment(
-            loader=jinja2.PackageLoader('pyreg', 'templates'),
-            undefined=jinja2.StrictUndefined,
-            trim_blocks=True)
+        self.jinja_env = get_env()
 
         # divide categories into groups
         self.builtin_types = []
@@ -1,13 +1,17 @@
 """super pretty print of python source-code's AST"""
 
 import platform
+import sys
 import os
+import itertools
 import ast
+import tokenize
 import json
 import argparse
 
 from pkg_resources import resource_filename
-import jinja2
+
+from .jinja_env import get_env
 
 
 
@@ -28,8 +32,14 @@ class TypeField(AstField):
     def to_text(self):
         return repr(self.value)
 
+    def iter_text(self):
+        yield self.to_text()
+
     def to_map(self):
-        return ["%s => %s" % (self.path, repr(self.value))]
+        return list(self.iter_map())
+
+    def iter_map(self):
+        yield "%s => %s" % (self.path, repr(self.value))
 
     def to_html(self):
         if isinstance(self.value, str):
@@ -39,6 +49,9 @@ class TypeField(AstField):
             str_value = repr(self.value)
         return '<span class="final">%s</span>' % str_value
 
+    def iter_html(self):
+        yield self.to_html()
+
 
 class NodeField(AstField):
     def __init__(self, value, path, lines, parent):
@@ -48,14 +61,22 @@ class NodeField(AstField):
     def to_text(self):
         return self.value.to_text()
 
+    def iter_text(self):
+        return self.value.iter_text()
+
     def to_map(self):
-        ll = ["%s (%s)" % (self.path, self.value.node.__class__.__name__)]
-        ll.extend(self.value.to_map())
-        return ll
+        return list(self.iter_map())
+
+    def iter_map(self):
+        yield "%s (%s)" % (self.path, self.value.node.__class__.__name__)
+        yield from self.value.iter_map()
 
     def to_html(self):
         return self.value.to_html()
 
+    def iter_html(self):
+        return self.value.iter_html()
+
 class ListField(AstField):
     def __init__(self, value, path, lines, parent):
         self.value = []
@@ -69,21 +90,38 @@ class ListField(AstField):
         self.path = path
 
     def to_text(self):
-        return "[%s]" % ", ".join((n.to_text() for n in self.value))
+        return "".join(self.iter_text())
+
+    def iter_text(self):
+        yield "["
+        for i, n in enumerate(self.value):
+            if i:
+                yield ", "
+            yield from n.iter_text()
+        yield "]"
 
     def to_map(self):
-        ll = ["%s []" % self.path]
+        return list(self.iter_map())
+
+    def iter_map(self):
+        yield "%s []" % self.path
         for n in self.value:
-            ll.append("%s (%s)" % (n.path, n.node.__class__.__name__))
-            ll.extend(n.to_map())
-        return ll
+            if isinstance(n, TypeField):
+                yield from n.iter_map()
+                continue
+            yield "%s (%s)" % (n.path, n.node.__class__.__name__)
+            yield from n.iter_map()
 
     def to_html(self):
-        t_head = '<table class="field_list">'
-        row = "<tr><td>%s</td></tr>"
-        t_body = "".join(row % n.to_html() for n in self.value)
-        t_foot = '</table>'
-        return t_head + t_body + t_foot
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        yield '<table class="field_list">'
+        for n in self.value:
+            yield "<tr><td>"
+            yield from n.iter_html()
+            yield "</td></tr>"
+        yield '</table>'
 
 
 class AstNode(object):
@@ -92,6 +130,8 @@ class AstNode(object):
     @ivar node: stdlib AST node
     @ivar path: python variable's "path" to this node
     @ivar lines: node location on file
+    @ivar line_nums: (set) lines of node and its sub-nodes, nested
+                     statements not included
     @ivar class_: AST type
     @ivar attrs: list of tuple (name, value) of all attributes
     @ivar fields: dict of AstField
@@ -100,6 +140,8 @@ class AstNode(object):
     # this values are injected by ast2html
     node_template = None
     MAP = None
+    # python < 3.8: end line -> start line of multi-line strings
+    string_starts = {}
 
 
     @classmethod
@@ -111,8 +153,21 @@ class AstNode(object):
         stream.seek(0)
         lines = stream.readlines()
         cls.line_list = lines
+        if sys.version_info < (3, 8):
+            cls.string_starts = cls._string_starts(lines)
         return cls(ct, '', [l for l in lines], None)
 
+    @staticmethod
+    def _string_starts(lines):
+        """multi-line strings location from tokens, on python < 3.8
+        AST string nodes only have the position of the last line.
+        """
+        starts = {}
+        for tok in tokenize.generate_tokens(iter(lines).__next__):
+            if tok[0] == tokenize.STRING and tok[3][0] > tok[2][0]:
+                starts[tok[3][0]] = tok[2][0]
+        return starts
+
     @classmethod
     def load_map(cls):
         """load type map/info from json file"""
@@ -131,7 +186,6 @@ class AstNode(object):
         self.lines = lines
         self.parent = parent
         self.class_ = node.__class__.__name__
-        self.line_nums = set()
 
         # normalize values when using python2.5
         # on python2.5 node might not have _attributes, ...
@@ -157,81 +211,173 @@ class AstNode(object):
                 self.fields[name] = ListField(value, f_path, lines, self)
             else:
                 self.fields[name] = TypeField(value, f_path, lines)
+        self.line_nums = self._line_nums()
+
+    def _is_string(self):
+        node = self.node
+        if self.class_ == 'Constant':
+            return isinstance(node.value, (str, bytes))
+        return self.class_ in ('Str', 'Bytes', 'JoinedStr')
+
+    def _line_nums(self):
+        """lines of this node and its (non-statement) sub-nodes"""
+        line_nums = set()
+        if self.attrs:
+            first = last = self.line
+            if self._is_string() or self.column == -1:
+                if hasattr(self.node, 'end_lineno'):
+                    last = self.node.end_lineno
+                else:
+                    first = self.string_starts.get(last, last)
+            line_nums.update(range(first, last + 1))
+        for field in self.fields.values():
+            if isinstance(field, NodeField):
+                children = [field.value]
+            elif isinstance(field, ListField):
+                children = field.value
+            else:
+                continue
+            for child in children:
+                if isinstance(child, AstNode) and \
+                   not isinstance(child.node, ast.stmt):
+                    line_nums.update(child.line_nums)
+        return line_nums
 
     def __repr__(self):
         return '{}(path={}, node={}, attrs={})'.format(
             self.__class__.__name__, self.path, self.node.__class__, self.attrs)
 
     def to_html(self):
-        """return HTML string for node
-          - set line_nums of node
+        """return HTML string for node"""
+        return "".join(self.iter_html())
+
+    def html_start(self):
+        """HTML of node type, attributes and source lines, up to its fields
+        (must be closed by `node_end` macro)
         """
         class_info = self.MAP[self.class_]
         category = class_info['category']
-
-        # add line number of this node to the contatining statement
-        if self.attrs:
-            curent = self
-            while True:
-                if self.MAP[curent.class_]['category'] != "stmt":
-                    if curent.parent:
-                        curent = curent.parent
-                        continue
-                    else:
-                        break
-                else:
-                    curent.line_nums.add(self.attrs[0][1])
-                    break
-
-        # special case for triple quotes multiple line string
-        if category == 'stmt' and self.attrs and self.attrs[1][1] == -1:
-            # start from last line
-            triple_quote_line = self.attrs[0][1]
-            # move up if line contains only terminating triple quotes
-            if len(self.lines[triple_quote_line-1].strip()) == 3:
-                triple_quote_line -= 1
-                self.line_nums.add(triple_quote_line)
-            # move up until it finds starting triple quotes
-            while not self.lines[triple_quote_line-1].strip().startswith('"""'):
-                triple_quote_line -= 1
-                self.line_nums.add(triple_quote_line)
-
         attrs = [v for k,v in self.attrs]
-        return self.node_template.module.node(self, class_info, category, attrs)
+        macros = self.node_template.module
+        return macros.node_start(self, class_info, category, attrs)
+
+    def iter_html(self):
+        """generate HTML of node (and its sub-nodes) in chunks"""
+        macros = self.node_template.module
+        yield self.html_start()
+        for field_name in self.MAP[self.class_]['order']:
+            yield macros.field_start(field_name)
+            yield from self.fields[field_name].iter_html()
+            yield macros.field_end()
+        yield macros.node_end()
 
 
     def to_text(self):
         """dumps node info in plain text
         @returns string
         """
-        attrs = ["%s=%s" % (k, v) for k,v in self.attrs]
-        fields = ["%s=%s" % (k, v.to_text()) for k,v in
-                  sorted(self.fields.items())]
-        return "%s(%s)" % (self.class_, ", ".join(attrs + fields))
+        return "".join(self.iter_text())
+
+    def iter_text(self):
+        """generate plain text of node in chunks"""
+        yield "%s(" % self.class_
+        sep = ""
+        for k, v in self.attrs:
+            yield "%s%s=%s" % (sep, k, v)
+            sep = ", "
+        for k, v in sorted(self.fields.items()):
+            yield "%s%s=" % (sep, k)
+            yield from v.iter_text()
+            sep = ", "
+        yield ")"
 
     def to_map(self):
-        items = []
+        return list(self.iter_map())
+
+    def iter_map(self):
+        """generate lines of "map" format"""
         for name, value in sorted(self.fields.items()):
-            items.extend(value.to_map())
-        return items
+            yield from value.iter_map()
+
+
+def init_html():
+    """inject some global variables into AstNode class
+    :return: jinja2 Environment
+    """
+    jinja_env = get_env()
+    AstNode.node_template = jinja_env.get_template("ast_node.html")
+    if AstNode.MAP is None:
+        AstNode.load_map()
+    return jinja_env
+
+
+def iter_ast2html(filename, tree, stylesheet=None):
+    """pretty print ast in HTML, generate the document in chunks
+    :param stylesheet: (str) URL of CSS, default is inline CSS
+    """
+    template = init_html().get_template("ast.html")
+    return template.generate(filename=filename, tree=tree,
+                             stylesheet=stylesheet)
 
 
 def ast2html(filename, tree):
     """pretty print ast in HTML"""
-    jinja_env = jinja2.Environment(
-        loader=jinja2.PackageLoader('pyreg', 'templates'),
-        undefined=jinja2.StrictUndefined,
-        trim_blocks=True)
-    template = jinja_env.get_template("ast.html")
+    return ''.join(iter_ast2html(filename, tree))
 
-    # inject some global variables into AstNode class
-    AstNode.node_template = jinja_env.get_template("ast_node.html")
-    AstNode.load_map()
 
-    # ready to generate the HTML
-    return template.render(filename=filename, tree=tree)
 
 
+FORMATS = ('html', 'map', 'txt', 'json', 'xml')
+
+def iter_format(fmt, filename, tree, flat=False, compact=False):
+    """generate output of a tree in the given format in chunks
+
+    :param fmt: (str) one of `FORMATS`, `xml` is the `py2xml` output
+        (on python3.8+ converted from the same AST)
+    :param flat: (bool) flat `json` format
+    :param compact: (bool) compact `html` format
+    """
+    if fmt == 'html':
+        if compact:
+            from .astview_compact import iter_compact_html
+            return iter_compact_html(filename, tree)
+        return iter_ast2html(filename, tree)
+    if fmt == 'map':
+        return (line + '\n' for line in tree.iter_map())
+    if fmt == 'txt':
+        return itertools.chain(tree.iter_text(), ['\n'])
+    if fmt == 'json':
+        from .astview_json import iter_json, iter_flat_json
+        if flat:
+            return iter_flat_json(tree)
+        return itertools.chain(iter_json(tree), ['\n'])
+    if fmt == 'xml':
+        from .py2xml import py2xml
+        options = {'tree': tree.node} if sys.version_info >= (3, 8) else {}
+        return [py2xml(fromstring=''.join(tree.lines), **options)]
+    raise ValueError('Invalid format: {}'.format(fmt))
+
+
+def _format_list(value):
+    """argparse type: comma separated list of formats"""
+    formats = value.split(',')
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise argparse.ArgumentTypeError(
+                'invalid format: {} (choose from {})'.format(
+                    fmt, ', '.join(FORMATS)))
+    return formats
+
+
+def _write_chunks(chunks):
+    """write chunks of text to stdout (encoded as UTF-8)"""
+    if sys.stdout.encoding == 'UTF-8' or sys.stdout.encoding is None:
+        write = sys.stdout.write
+    else:
+        buf = sys.stdout.buffer
+        write = lambda chunk: buf.write(chunk.encode('utf-8'))
+    for chunk in chunks:
+        write(chunk)
 
 
 def ast_view(args=None):
@@ -244,13 +390,72 @@ Super pretty-printer for python modules's AST(abstract syntax tree)."""
     parser = argparse.ArgumentParser(description=description)
     parser.add_argument(
         '-f', '--format', dest='format', metavar='FORMAT',
-        choices=('html', 'map', 'txt'), default='html',
-        help='output format one of [%(choices)s], default=%(default)s')
+        type=_format_list, default=['html'],
+        help='output format one of [{}], default=html. '
+        'Several comma separated formats can be written '
+        'to a directory (see -o)'.format(', '.join(FORMATS)))
+    parser.add_argument(
+        '-o', '--output', dest='output', metavar='DIR',
+        help='write each format to file `DIR/MODULE.FORMAT`')
+    parser.add_argument(
+        '--compact', dest='compact', action='store_true',
+        help='html format: smaller HTML using nested <details> elements')
+    parser.add_argument(
+        '--chunked', dest='chunked', action='store_true',
+        help='html format: page with top-level statements only, other '
+        'nodes are loaded on demand from fragment files (requires -o)')
+    parser.add_argument(
+        '-j', '--jobs', dest='jobs', type=int, default=None,
+        help='number of processes writing --chunked fragments (default 1) '
+        'or --site pages (default CPU count), 0 uses the number of CPUs')
+    parser.add_argument(
+        '--serve', dest='serve', metavar='DIR',
+        help='start HTTP server to browse modules in DIR')
+    parser.add_argument(
+        '--site', dest='site', metavar='SRC',
+        help='write pages of all modules in directory SRC, with an index, '
+        'into --output. Unchanged modules are skipped')
+    parser.add_argument(
+        '--port', dest='port', type=int, default=8000,
+        help='--serve port (default: %(default)s)')
+    parser.add_argument(
+        '--flat', dest='flat', action='store_true',
+        help='json format: array of nodes instead of nested objects')
     parser.add_argument(
         'py_file', metavar='MODULE', nargs='?',
         help='python module, if not specified uses stdin.')
 
     args = parser.parse_args(args)
+    if len(args.format) > 1 and not args.output:
+        parser.error('multiple formats require --output')
+    if args.chunked and (args.format != ['html'] or not args.output):
+        parser.error('--chunked requires html format and --output')
+
+    if args.serve:
+        from .astview_server import Server
+        server = Server(args.serve, ('127.0.0.1', args.port))
+        print('Serving {} on http://127.0.0.1:{}/'.format(
+            args.serve, server.server_address[1]))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt: # pragma: no cover
+            pass
+        finally:
+            server.server_close()
+        return
+
+    if args.site:
+        if not args.output:
+            parser.error('--site requires --output')
+        from .astview_site import build_site
+        summary = build_site(args.site, args.output, args.jobs,
+                             'compact' if args.compact else 'tables')
+        for key in ('rendered', 'skipped', 'removed'):
+            for source in summary[key]:
+                print('{} {}'.format(key, source))
+        for result in summary['errors']:
+            print('{}: {}'.format(result.path, result.error), file=sys.stderr)
+        sys.exit(1 if summary['errors'] else 0)
 
     # create node tree.
     if args.py_file:
@@ -263,19 +468,27 @@ Super pretty-printer for python modules's AST(abstract syntax tree)."""
         fp = io.StringIO(sys.stdin.buffer.read().decode('utf-8'))
         tree = AstNode.tree(fp, filename)
 
-    if args.format == 'html':
-        html = ast2html(filename, tree)
-        if sys.stdout.encoding == 'UTF-8' or sys.stdout.encoding is None:
-            sys.stdout.write(html)
-        else:
-            byte = html.encode('utf-8')
-            sys.stdout.buffer.write(byte)
-    elif args.format == 'map':
-        for x in tree.to_map():
-            print(x)
-    elif args.format == 'txt':
-        print((tree.to_text()))
+    if not args.output:
+        _write_chunks(iter_format(args.format[0], filename, tree,
+                                  args.flat, args.compact))
+        return
+    if args.chunked:
+        from .astview_chunked import write_chunked
+        jobs = 1 if args.jobs is None else args.jobs
+        write_chunked(filename, tree, args.output, jobs)
+        return
+    # module parsed once, write all formats
+    os.makedirs(args.output, exist_ok=True)
+    name = os.path.basename(args.py_file) if args.py_file else 'stdin'
+    for fmt in args.format:
+        path = os.path.join(args.output, '{}.{}'.format(name, fmt))
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.writelines(iter_format(fmt, filename, tree, args.flat,
+                                      args.compact))
 
 
 if __name__ == "__main__":
-    ast_view()
+    # with `python -m` this file is also imported as `pyreg.astview`
+    # by other modules, use its classes (`isinstance` checks)
+    from pyreg.astview import ast_view as main
+    main()
@@ -0,0 +1,113 @@
+"""HTML of AST for big modules, loaded on demand (`astview --chunked`)
+
+The page contains only the top-level statements (type and source
+lines) with collapsed placeholders. The HTML of each statement is
+written into its own fragment file `NAME.fragments/INDEX.js`, loaded
+by the page when the placeholder is expanded.
+
+Fragments are JavaScript (not HTML fetched by the page) so they
+can be loaded by pages opened from the file system.
+"""
+
+import io
+import os
+import json
+import multiprocessing
+
+from .astview import AstNode, init_html
+
+
+def iter_chunked_page(filename, tree, fragment_dir):
+    """generate HTML of page in chunks
+    :param fragment_dir: (str) URL of fragments relative to page
+    """
+    jinja_env = init_html()
+    template = jinja_env.get_template('ast_chunked.html')
+    return template.generate(filename=filename, fragment_dir=fragment_dir,
+                             chunks=_iter_module(tree))
+
+
+def _iter_module(tree):
+    macros = AstNode.node_template.module
+    yield tree.html_start()
+    for field_name in AstNode.MAP[tree.class_]['order']:
+        yield macros.field_start(field_name)
+        if field_name == 'body':
+            yield from _iter_placeholders(tree.fields['body'].value)
+        else:
+            yield from tree.fields[field_name].iter_html()
+        yield macros.field_end()
+    yield macros.node_end()
+
+
+def _iter_placeholders(stmts):
+    macros = AstNode.node_template.module
+    yield '<table class="field_list">'
+    for index, stmt in enumerate(stmts):
+        yield '<tr><td><div id="node%d">' % index
+        yield stmt.html_start()
+        yield macros.placeholder(index)
+        yield macros.node_end()
+        yield '</div></td></tr>'
+    yield '</table>'
+
+
+def fragment_js(tree, index):
+    """:return: (str) JS code of fragment with HTML of statement `index`"""
+    init_html()
+    html = ''.join(tree.fields['body'].value[index].iter_html())
+    return 'pyregFragment({}, {});\n'.format(index, json.dumps(html))
+
+
+def _write_fragment(tree, index, directory):
+    path = os.path.join(directory, '{}.js'.format(index))
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write(fragment_js(tree, index))
+
+
+# tree of module in worker process
+_worker_tree = None
+
+def _init_worker(source, filename):
+    global _worker_tree
+    _worker_tree = AstNode.tree(io.StringIO(source), filename)
+
+def _worker_write(args):
+    index, directory = args
+    _write_fragment(_worker_tree, index, directory)
+
+
+def write_chunked(filename, tree, out_dir, workers=1):
+    """write page `OUT_DIR/NAME.html` and its fragments
+
+    :param workers: (int) number of processes writing fragments,
+        0 uses the number of CPUs
+    :return: (str) path of page
+    """
+    name = os.path.basename(filename) if filename != '<stdin>' else 'stdin'
+    fragment_dir = name + '.fragments'
+    fragment_path = os.path.join(out_dir, fragment_dir)
+    os.makedirs(fragment_path, exist_ok=True)
+    # remove fragments from a previous run
+    for old in os.listdir(fragment_path):
+        if old.endswith('.js'):
+            os.remove(os.path.join(fragment_path, old))
+
+    page = os.path.join(out_dir, name + '.html')
+    with open(page, 'w', encoding='utf-8') as fp:
+        fp.writelines(iter_chunked_page(filename, tree, fragment_dir))
+
+    count = len(tree.fields['body'].value)
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1 or count < 2:
+        for index in range(count):
+            _write_fragment(tree, index, fragment_path)
+    else:
+        # each worker parses the module once
+        source = ''.join(tree.lines)
+        with multiprocessing.Pool(workers, _init_worker,
+                                  (source, filename)) as pool:
+            tasks = [(index, fragment_path) for index in range(count)]
+            for _ in pool.imap_unordered(_worker_write, tasks):
+                pass
+    return page
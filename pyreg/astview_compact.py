@@ -0,0 +1,182 @@
+"""compact HTML of AST (`astview --compact`)
+
+Nodes are nested `<details>` elements with a `<ul>` of fields,
+a much smaller DOM than the tables of `ast.html`:
+
+    <details open class="s"><summary><b>Assign</b>
+    <i title="line,column-end_line,end_column">1,0-1,5</i></summary>
+    <pre>1: x = 1</pre><ul><li>targets: <ol start="0"><li>...</ol>...</ul>
+    </details>
+
+Nodes without attributes and fields (i.e. `Load`, `Add`) are just
+their type name. Statements (class `s`) include their source lines.
+
+If a `depth` is given, nodes deeper than it are collapsed without
+fields, with the attribute `data-path` (i.e. `.body[3].value`)
+used to load them later (see `astview_server`).
+"""
+
+import re
+import time
+import argparse
+from html import escape
+from html.parser import HTMLParser
+
+from .astview import (AstNode, TypeField, NodeField, ListField, init_html,
+                      ast2html)
+
+
+def _class_info(node):
+    if AstNode.MAP is None:
+        AstNode.load_map()
+    return AstNode.MAP[node.class_]
+
+
+def _position(node):
+    """HTML of node attributes: `LINE,COL` or `LINE,COL-END_LINE,END_COL`
+    (end positions on python3.8+)
+    """
+    if not node.attrs:
+        return ''
+    attrs = dict(node.attrs)
+    text = '%d,%d' % (node.line, node.column)
+    title = 'line,column'
+    if attrs.get('end_lineno') is not None:
+        text += '-%d,%d' % (attrs['end_lineno'], attrs['end_col_offset'])
+        title += '-end_line,end_column'
+    return ' <i title="%s">%s</i>' % (title, text)
+
+
+def iter_compact(node, depth=None, path=''):
+    """generate compact HTML of `AstNode` in chunks
+
+    :param depth: (int) levels of sub-nodes with fields, None for all
+    :param path: (str) path of node (used for collapsed nodes)
+    """
+    class_info = _class_info(node)
+    if not class_info['order'] and not node.attrs:
+        yield '<b>%s</b>' % node.class_
+        return
+    is_stmt = class_info['category'] == 'stmt'
+    yield '<details%s%s><summary><b>%s</b>%s</summary>' % (
+        ' data-path="%s"' % path if depth == 0 else ' open',
+        ' class="s"' if is_stmt else '', node.class_, _position(node))
+    if is_stmt and node.line_nums:
+        yield '<pre>%s</pre>' % escape(''.join(
+            '%d: %s' % (num, node.lines[num - 1])
+            for num in sorted(node.line_nums)).rstrip('\n'), quote=False)
+    if depth != 0:
+        yield from iter_compact_fields(
+            node, None if depth is None else depth - 1, path)
+    yield '</details>'
+
+
+def iter_compact_fields(node, depth=None, path=''):
+    """generate compact HTML of the fields of a node (`<ul>` element)"""
+    yield '<ul>'
+    for name in _class_info(node)['order']:
+        yield '<li>%s: ' % name
+        yield from _iter_field(node.fields[name], depth,
+                               '%s.%s' % (path, name))
+    yield '</ul>'
+
+
+def _iter_field(field, depth, path):
+    if isinstance(field, NodeField):
+        yield from iter_compact(field.value, depth, path)
+    elif isinstance(field, ListField):
+        if not field.value:
+            yield '[]'
+            return
+        yield '<ol start="0">'
+        for index, item in enumerate(field.value):
+            yield '<li>'
+            yield from _iter_field(item, depth, '%s[%d]' % (path, index))
+        yield '</ol>'
+    elif isinstance(field, TypeField):
+        yield '<code>%s</code>' % escape(repr(field.value), quote=False)
+    else: # AstNode item of a ListField
+        yield from iter_compact(field, depth, path)
+
+
+def find_node(tree, path):
+    """:return: `AstNode` at path, i.e. `.body[3].value`
+    :raise KeyError: if there is no node at path
+    """
+    node = tree
+    for match in re.finditer(r'\.(\w+)|\[(\d+)\]|(.)', path):
+        name, index, invalid = match.groups()
+        if invalid is not None:
+            raise KeyError(path)
+        if name is not None:
+            if not isinstance(node, AstNode) or name not in node.fields:
+                raise KeyError(path)
+            node = node.fields[name]
+            if isinstance(node, NodeField):
+                node = node.value
+        else:
+            if not isinstance(node, ListField) or \
+               int(index) >= len(node.value):
+                raise KeyError(path)
+            node = node.value[int(index)]
+    if not isinstance(node, AstNode):
+        raise KeyError(path)
+    return node
+
+
+def iter_compact_html(filename, tree, stylesheet=None):
+    """generate compact HTML page in chunks
+    :param stylesheet: (str) URL of CSS, default is inline CSS
+    """
+    template = init_html().get_template('ast_compact.html')
+    return template.generate(filename=filename, chunks=iter_compact(tree),
+                             stylesheet=stylesheet)
+
+
+
+def _best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _parse_html(html):
+    parser = HTMLParser()
+    parser.feed(html)
+    parser.close()
+
+
+def main(args=None):
+    """benchmark: size and time of compact HTML against the tables HTML
+
+    Parse time of `html.parser` is used as a (rough) proxy
+    for the browser rendering cost.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('py_file', metavar='MODULE')
+    parser.add_argument(
+        '--repeat', dest='repeat', type=int, default=3,
+        help='number of runs, best is reported')
+    args = parser.parse_args(args)
+
+    with open(args.py_file, 'r') as fp:
+        tree = AstNode.tree(fp, args.py_file)
+    renders = (
+        ('tables', lambda: ast2html(args.py_file, tree)),
+        ('compact', lambda: ''.join(iter_compact_html(args.py_file, tree))),
+        )
+    print('mode          bytes  elements  generate     parse')
+    for name, render in renders:
+        generate, html = _best_time(render, args.repeat)
+        parse, _ = _best_time(lambda: _parse_html(html), args.repeat)
+        print('{:8s} {:>10d} {:9d} {:8.3f}s {:8.3f}s'.format(
+            name, len(html.encode('utf-8')), html.count('<') -
+            html.count('</'), generate, parse))
+
+
+if __name__ == "__main__": # pragma: no cover
+    main()
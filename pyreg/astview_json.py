@@ -0,0 +1,178 @@
+"""compact JSON encoding of an AST (`astview -f json`)
+
+A node is an object with its type, attributes and fields
+(in the ASDL order):
+
+    {"_type":"Assign","lineno":1,"col_offset":0,"targets":[...],"value":{...}}
+
+Values that are not valid JSON are encoded as objects with the key
+`_const` (`bytes`, `complex`, `Ellipsis`).
+
+In the `flat` format the document is an array with one node per line,
+in post-order (the root is the last item). Sub-nodes are referenced by
+their position in the array: `{"_node":3}`.
+
+The JSON is loaded in a single pass by `json.load` object hook,
+without parsing the python source again.
+"""
+
+import ast
+import json
+
+from .astview import AstNode, TypeField, NodeField, ListField
+
+
+_dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def _encode_value(value):
+    if isinstance(value, bytes):
+        return '{"_const":"bytes","value":%s}' % (
+            _dumps(value.decode('latin-1')))
+    if isinstance(value, complex):
+        return '{"_const":"complex","value":[%s,%s]}' % (
+            _dumps(value.real), _dumps(value.imag))
+    if value is Ellipsis:
+        return '{"_const":"Ellipsis"}'
+    return _dumps(value)
+
+
+# ASDL map not available for this python version
+_no_map = False
+
+def _asdl_map():
+    """:return: (dict) AstNode.MAP, empty if there is no map"""
+    global _no_map
+    if AstNode.MAP is None and not _no_map:
+        try:
+            AstNode.load_map()
+        except OSError:
+            _no_map = True
+    return AstNode.MAP or {}
+
+
+def _field_order(node):
+    """ASDL order, fields not in the ASDL (newer python) at the end"""
+    class_info = _asdl_map().get(node.class_)
+    order = [name for name in (class_info['order'] if class_info else ())
+             if name in node.fields]
+    order.extend(name for name in node.node._fields if name not in order)
+    return order
+
+
+def _node_head(node):
+    head = ['"_type":%s' % _dumps(node.class_)]
+    head.extend('%s:%s' % (_dumps(name), _dumps(value))
+                for name, value in node.attrs)
+    return '{' + ','.join(head)
+
+
+def iter_json(node):
+    """generate nested JSON of `AstNode` in chunks"""
+    yield _node_head(node)
+    for name in _field_order(node):
+        yield ',%s:' % _dumps(name)
+        yield from _iter_field(node.fields[name])
+    yield '}'
+
+
+def _iter_field(field):
+    if isinstance(field, NodeField):
+        yield from iter_json(field.value)
+    elif isinstance(field, ListField):
+        yield '['
+        for i, item in enumerate(field.value):
+            if i:
+                yield ','
+            yield from _iter_field(item)
+        yield ']'
+    elif isinstance(field, TypeField):
+        yield _encode_value(field.value)
+    else: # AstNode item of a ListField
+        yield from iter_json(field)
+
+
+def iter_flat_json(tree):
+    """generate flat JSON (array of nodes in post-order) in lines"""
+    yield '[\n'
+    first = True
+    for line in _iter_flat(tree, [0]):
+        yield line if first else ',\n' + line
+        first = False
+    yield '\n]\n'
+
+
+def _iter_flat(node, counter):
+    """yield encoded node after its sub-nodes
+    :param counter: 1-item list, number of nodes written
+    """
+    values = []
+    for name in _field_order(node):
+        field = node.fields[name]
+        if isinstance(field, NodeField):
+            yield from _iter_flat(field.value, counter)
+            value = '{"_node":%d}' % (counter[0] - 1)
+        elif isinstance(field, ListField):
+            items = []
+            for item in field.value:
+                if isinstance(item, TypeField):
+                    items.append(_encode_value(item.value))
+                else:
+                    yield from _iter_flat(item, counter)
+                    items.append('{"_node":%d}' % (counter[0] - 1))
+            value = '[' + ','.join(items) + ']'
+        else:
+            value = _encode_value(field.value)
+        values.append(',%s:%s' % (_dumps(name), value))
+    counter[0] += 1
+    yield _node_head(node) + ''.join(values) + '}'
+
+
+def tree2json(tree, flat=False):
+    """:return: (str) JSON of `AstNode` tree"""
+    chunks = iter_flat_json(tree) if flat else iter_json(tree)
+    return ''.join(chunks)
+
+
+
+_CONSTS = {
+    'bytes': lambda value: value.encode('latin-1'),
+    'complex': lambda value: complex(*value),
+    'Ellipsis': lambda value: Ellipsis,
+    }
+
+def _object_hook(nodes):
+    def decode(obj):
+        if '_type' in obj:
+            node = getattr(ast, obj.pop('_type'))()
+            for name, value in obj.items():
+                setattr(node, name, value)
+            nodes.append(node)
+            return node
+        if '_node' in obj:
+            return nodes[obj['_node']]
+        if '_const' in obj:
+            return _CONSTS[obj['_const']](obj.get('value'))
+        return obj
+    return decode
+
+
+def json2ast(text):
+    """load JSON (nested or flat) as python `ast` nodes
+    :return: root `ast.AST` node
+    """
+    nodes = []
+    root = json.loads(text, object_hook=_object_hook(nodes))
+    return root[-1] if isinstance(root, list) else root
+
+
+def load(fp, lines=None, as_ast=False):
+    """load JSON from file
+
+    :param lines: (list - str) source lines, used only by HTML output
+    :param as_ast: return python `ast` node instead of `AstNode`
+    """
+    root = json2ast(fp.read())
+    if as_ast:
+        return root
+    return AstNode(root, '', lines or [], None)
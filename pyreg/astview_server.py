@@ -0,0 +1,167 @@
+"""HTTP server to browse the AST of modules in a directory
+(`astview --serve DIR`)
+
+  - `/`: list of modules
+  - `/view/MODULE`: compact HTML of module, with statements collapsed
+  - `/node/MODULE?path=PATH`: fields of the node at PATH
+    (i.e. `.body[3].value`), with sub-nodes collapsed
+
+Pages load the fields of a node when it is expanded, so only the
+visible part of the tree is rendered.
+Modules are parsed on demand, trees are kept in a LRU cache bounded
+by the total number of AST nodes. A tree is used while the file
+modification time, or content hash, is unchanged.
+"""
+
+import io
+import os
+import ast
+import hashlib
+import threading
+import socketserver
+from collections import OrderedDict
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+from .astview import AstNode, init_html
+from .astview_compact import iter_compact, iter_compact_fields, find_node
+
+
+class TreeCache:
+    """thread-safe LRU cache of `AstNode` trees by file path
+
+    :param max_nodes: (int) max total number of AST nodes of cached
+        trees (the last used tree is always kept)
+    """
+
+    def __init__(self, max_nodes=200000):
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        # path -> 4-item list [mtime, sha256, tree, number of nodes]
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        # AstNode.tree() uses class attributes, build one at a time
+        self._build_lock = threading.Lock()
+
+    def _hit(self, path, check):
+        with self._lock:
+            entry = self._items.get(path)
+            if entry is not None and check(entry):
+                self._items.move_to_end(path)
+                return entry
+        return None
+
+    def get(self, path):
+        """:return: `AstNode` tree of module"""
+        mtime = os.stat(path).st_mtime_ns
+        entry = self._hit(path, lambda entry: entry[0] == mtime)
+        if entry is not None:
+            return entry[2]
+
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        digest = hashlib.sha256(data).digest()
+        entry = self._hit(path, lambda entry: entry[1] == digest)
+        if entry is not None:
+            entry[0] = mtime
+            return entry[2]
+
+        from .py2xml import _decode_source
+        with self._build_lock:
+            tree = AstNode.tree(io.StringIO(_decode_source(data)), path)
+        count = sum(1 for _ in ast.walk(tree.node))
+        with self._lock:
+            old = self._items.pop(path, None)
+            if old is not None:
+                self.nodes -= old[3]
+            self._items[path] = [mtime, digest, tree, count]
+            self.nodes += count
+            while self.nodes > self.max_nodes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.nodes -= old[3]
+        return tree
+
+    def __len__(self):
+        return len(self._items)
+
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """handle GET requests, see module docstring"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route, _, module = url.path.lstrip('/').partition('/')
+        module = unquote(module)
+        try:
+            if url.path == '/':
+                body = self.server.index()
+            elif route == 'view':
+                body = self.server.view(module)
+            elif route == 'node':
+                path = parse_qs(url.query).get('path', [''])[0]
+                body = self.server.node(module, path)
+            else:
+                raise KeyError(url.path)
+        except KeyError:
+            self.send_error(404)
+            return
+        except SyntaxError as exception:
+            self.send_error(500, 'SyntaxError: {}'.format(exception))
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class Server(socketserver.ThreadingMixIn, HTTPServer):
+    """HTTP server of modules in `root` directory"""
+    daemon_threads = True
+
+    def __init__(self, root, address=('127.0.0.1', 8000), max_nodes=200000):
+        super().__init__(address, RequestHandler)
+        self.root = os.path.realpath(root)
+        self.cache = TreeCache(max_nodes)
+        self.jinja_env = init_html()
+
+    def modules(self):
+        """:return: sorted list of module paths relative to root"""
+        modules = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [name for name in dirnames
+                           if not name.startswith('.')]
+            for name in filenames:
+                if name.endswith('.py'):
+                    path = os.path.join(dirpath, name)
+                    modules.append(os.path.relpath(path, self.root)
+                                   .replace(os.sep, '/'))
+        return sorted(modules)
+
+    def module_path(self, module):
+        """:raise KeyError: if not a module inside root"""
+        path = os.path.realpath(os.path.join(self.root, module))
+        if (not path.startswith(self.root + os.sep) or
+                not path.endswith('.py') or not os.path.isfile(path)):
+            raise KeyError(module)
+        return path
+
+    def index(self):
+        template = self.jinja_env.get_template('ast_index.html')
+        modules = [('/view/' + quote(module), module)
+                   for module in self.modules()]
+        return template.render(title=self.root, modules=modules)
+
+    def view(self, module):
+        tree = self.cache.get(self.module_path(module))
+        template = self.jinja_env.get_template('ast_serve.html')
+        return template.render(
+            filename=module, chunks=iter_compact(tree, depth=1),
+            node_url='/node/{}?path='.format(quote(module)))
+
+    def node(self, module, path):
+        tree = self.cache.get(self.module_path(module))
+        node = find_node(tree, path)
+        return ''.join(iter_compact_fields(node, depth=0, path=path))
@@ -0,0 +1,158 @@
+"""static site with the AST HTML of all modules in a directory
+(`astview --site SRC -o OUT`)
+
+  - `OUT/PATH.html`: page of module `SRC/PATH`
+  - `OUT/_static/`: CSS shared by all pages
+  - `OUT/index.html`: list of modules
+  - `OUT/MANIFEST.json`: source SHA-256 of rendered modules
+
+Pages are rendered by a process pool. Modules with the same source
+hash (and mode) as in the manifest of a previous run are skipped,
+pages of removed modules are deleted.
+"""
+
+import io
+import os
+import hashlib
+import functools
+import multiprocessing
+
+from .astview import AstNode, init_html, iter_ast2html
+from .py2xml_archive import load_manifest, write_manifest
+from .py2xml_batch import BatchResult, find_modules
+
+
+STATIC = '_static'
+# mode -> CSS template
+STYLESHEETS = {'tables': 'ast.css', 'compact': 'ast_compact.css'}
+
+
+def page_name(source):
+    """:return: (str) path of page relative to site root"""
+    return source + '.html'
+
+
+def render_page(path, source, out_dir, mode):
+    """render page of module, executed in a worker process
+    :param source: (str) module path relative to SRC (`/` separated)
+    :return: BatchResult
+    """
+    try:
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        digest = hashlib.sha256(data).hexdigest()
+        from .py2xml import _decode_source
+        tree = AstNode.tree(io.StringIO(_decode_source(data)), source)
+        out_path = os.path.join(out_dir, page_name(source))
+        page_dir = os.path.dirname(out_path)
+        os.makedirs(page_dir, exist_ok=True)
+        stylesheet = os.path.relpath(
+            os.path.join(out_dir, STATIC, STYLESHEETS[mode]), page_dir)
+        stylesheet = stylesheet.replace(os.sep, '/')
+        if mode == 'compact':
+            from .astview_compact import iter_compact_html
+            chunks = iter_compact_html(source, tree, stylesheet)
+        else:
+            chunks = iter_ast2html(source, tree, stylesheet)
+        # not left half written on errors
+        tmp_path = out_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            try:
+                fp.writelines(chunks)
+            except Exception:
+                fp.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, out_path)
+    except Exception as exception:
+        return BatchResult(path, None, 0, '{}: {}'.format(
+            exception.__class__.__name__, exception), None)
+    return BatchResult(path, out_path, os.path.getsize(out_path), None,
+                       digest)
+
+
+def _render_job(job, out_dir, mode):
+    path, source = job
+    return render_page(path, source, out_dir, mode)
+
+
+def write_assets(out_dir):
+    """write CSS files into `OUT/_static`"""
+    jinja_env = init_html()
+    static_dir = os.path.join(out_dir, STATIC)
+    os.makedirs(static_dir, exist_ok=True)
+    for name in STYLESHEETS.values():
+        css = jinja_env.get_template(name).render() + '\n'
+        with open(os.path.join(static_dir, name), 'w') as fp:
+            fp.write(css)
+
+
+def write_index(out_dir, title, sources):
+    template = init_html().get_template('ast_index.html')
+    modules = [(page_name(source), source) for source in sorted(sources)]
+    with open(os.path.join(out_dir, 'index.html'), 'w',
+              encoding='utf-8') as fp:
+        fp.write(template.render(title=title, modules=modules) + '\n')
+
+
+def _remove_page(out_dir, entry):
+    page = os.path.join(out_dir, entry['member'])
+    if os.path.exists(page):
+        os.remove(page)
+
+
+def _digest(path):
+    with open(path, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+
+def build_site(src_dir, out_dir, workers=None, mode='tables'):
+    """render pages of all modules in `src_dir`
+
+    :param workers: (int) number of processes, default CPU count
+    :param mode: (str) `tables` (default HTML) or `compact`
+    :return: dict with lists: `rendered`, `skipped` and `removed`
+        (source paths), `errors` (BatchResult)
+    """
+    manifest = load_manifest(out_dir)
+    jobs = []
+    skipped = []
+    for path in find_modules([src_dir]):
+        source = os.path.relpath(path, src_dir).replace(os.sep, '/')
+        entry = manifest.get(source)
+        if (entry and entry.get('mode') == mode and
+                entry['sha256'] == _digest(path) and
+                os.path.exists(os.path.join(out_dir, entry['member']))):
+            skipped.append(source)
+        else:
+            jobs.append((path, source))
+
+    sources = set(skipped).union(source for _, source in jobs)
+    removed = sorted(set(manifest).difference(sources))
+    for source in removed:
+        _remove_page(out_dir, manifest.pop(source))
+
+    os.makedirs(out_dir, exist_ok=True)
+    write_assets(out_dir)
+    rendered = []
+    errors = []
+    if jobs:
+        render = functools.partial(_render_job, out_dir=out_dir, mode=mode)
+        with multiprocessing.Pool(workers or None) as pool:
+            for (_, source), result in zip(jobs, pool.imap(render, jobs)):
+                if result.error:
+                    errors.append(result)
+                    # page of a previous version of the module
+                    entry = manifest.pop(source, None)
+                    if entry is not None:
+                        _remove_page(out_dir, entry)
+                    continue
+                rendered.append(source)
+                manifest[source] = {
+                    'source': source, 'sha256': result.digest,
+                    'member': page_name(source), 'size': result.size,
+                    'mode': mode}
+    write_manifest(out_dir, [manifest[source] for source in sorted(manifest)])
+    write_index(out_dir, src_dir, manifest.keys())
+    return {'rendered': rendered, 'skipped': skipped, 'removed': removed,
+            'errors': errors}
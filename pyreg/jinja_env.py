@@ -0,0 +1,50 @@
+"""jinja2 environment shared by HTML generators (astview, asdlview)
+
+A single environment is created per process, so templates are loaded
+only once. Compiled templates are also stored in a bytecode cache
+directory, so new processes do not need to parse the templates.
+Cache directory is `$PYREG_CACHE_DIR/jinja` (default
+`~/.cache/pyreg/jinja`), set `PYREG_CACHE_DIR` to an empty string
+to disable it.
+"""
+
+import os
+
+import jinja2
+
+
+_env = None
+
+
+def cache_dir():
+    """:return: (str) directory of bytecode cache, or None if disabled"""
+    path = os.environ.get('PYREG_CACHE_DIR')
+    if path is None:
+        base = os.environ.get('XDG_CACHE_HOME') or \
+            os.path.join(os.path.expanduser('~'), '.cache')
+        path = os.path.join(base, 'pyreg')
+    elif not path:
+        return None
+    return os.path.join(path, 'jinja')
+
+
+def get_env():
+    """:return: the `jinja2.Environment` for package templates"""
+    global _env
+    if _env is None:
+        bytecode_cache = None
+        directory = cache_dir()
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                pass
+            else:
+                bytecode_cache = jinja2.FileSystemBytecodeCache(directory)
+        _env = jinja2.Environment(
+            loader=jinja2.PackageLoader('pyreg', 'templates'),
+            undefined=jinja2.StrictUndefined,
+            trim_blocks=True,
+            auto_reload=False,
+            bytecode_cache=bytecode_cache)
+    return _env
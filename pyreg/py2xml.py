@@ -1,5 +1,6 @@
 import sys
 import io
+import json
 import argparse
 from tokenize import tokenize
 import tokenize as Token
@@ -7,6 +8,9 @@ import xml.etree.ElementTree as ET
 from xml.dom.minidom import getDOMImplementation, Text
 
 from .astview import AstNode
+from .py2xml_index import add_positions, build_index, write_index
+from .py2xml_bin import MAGIC as BIN_MAGIC, dom2bin, bin2py
+from .py2xml_cst import CstNode
 
 
 ############# monkey-patch minidom.Text so it doesnt escape "
@@ -25,12 +29,57 @@ Text.writexml = _monkey_writexml
 impl = getDOMImplementation()
 DOM = impl.createDocument(None, None, None)
 DOM.Text = DOM.createTextNode
+
 def Element(tag_name, text=None):
     ele = DOM.createElement(tag_name)
     if text:
-        ele.appendChild(DOM.Text(text))
+        add_text(ele, text)
     return ele
 
+def CstElement(tag_name, text=None):
+    """same as `Element` creating a `CstNode` (see py2xml_cst)"""
+    return CstNode(tag_name, text=text or '')
+
+
+# number of Text nodes that were not created by add_text()
+#  - empty: text was an empty string
+#  - merged: text was appended to a previous Text node
+TEXT_NODES_AVOIDED = {'empty': 0, 'merged': 0}
+
+def add_text(parent, text):
+    """append text to an element
+
+    Empty text is dropped and text following another text is merged
+    into the previous Text node, the serialized XML is the same.
+    """
+    if not text:
+        TEXT_NODES_AVOIDED['empty'] += 1
+        return
+    if parent.__class__ is CstNode:
+        parent.add_text(text)
+        return
+    last = parent.lastChild
+    if last is not None and last.nodeType == last.TEXT_NODE:
+        last.data += text
+        TEXT_NODES_AVOIDED['merged'] += 1
+    else:
+        parent.appendChild(DOM.Text(text))
+
+def move_children(from_ele, to_ele):
+    """move all child nodes from one element to another"""
+    if from_ele.__class__ is CstNode:
+        add_text(to_ele, from_ele.text)
+        to_ele.children.extend(from_ele.children)
+        from_ele.text = ''
+        from_ele.children = []
+        return
+    for child in list(from_ele.childNodes):
+        if child.nodeType == child.TEXT_NODE:
+            from_ele.removeChild(child)
+            add_text(to_ele, child.data)
+        else:
+            to_ele.appendChild(child)
+
 
 def pos_byte2str(s):
     """return a list where the element value is the characther index/pos
@@ -44,12 +93,24 @@ def pos_byte2str(s):
 
 
 class AstNodeX(AstNode):
-    """add capability to AstNode be convert to XML"""
+    """add capability to AstNode be convert to XML
+
+    @ivar start: (line, column) where the source of the node really starts
+    """
+
+    # element factory, creates DOM elements
+    Element = staticmethod(Element)
+
+    def __init__(self, node, path, lines, parent):
+        # child nodes are created by AstNode.__init__ so they are
+        # always built before its parent (bottom-up).
+        super().__init__(node, path, lines, parent)
+        self.start = self._calc_start() if self.attrs else None
 
     def to_xml(self, parent=None):
         # hack for root node
         if parent == None:
-            parent = Element(self.class_)
+            parent = self.Element(self.class_)
 
         # apply converter based on node class_
         converter = getattr(self, 'c_' + self.class_, None)
@@ -66,20 +127,25 @@ class AstNodeX(AstNode):
     def real_start(self):
         """Because of http://bugs.python.org/issue18374
 
-        Getting the first element is not correct for deeply nested
+        Position is pre-computed on node creation, see `_calc_start`.
+        """
+        return self.start
+
+    def _calc_start(self):
+        """Getting the first element is not correct for deeply nested
         parens but good enough most of the time...
         If column number provided is correct, it is more reliable,
         os use min() to get the "better" one.
+
+        Sub-nodes already have its `start` computed so this is O(1).
         """
         if self.class_ in ('Attribute', 'Subscript'):
-            first = self.fields['value'].value
-            return first.real_start()
+            return self.fields['value'].value.start
         if self.class_ == 'BinOp':
             first = self.fields['left'].value
-            return min((self.line, self.column), first.real_start())
+            return min((self.line, self.column), first.start)
         if self.class_ == 'Call':
-            first = self.fields['func'].value
-            return first.real_start()
+            return self.fields['func'].value.start
 
         # AST node shows column in as byte position,
         # convert to char position in unicode string
@@ -117,7 +183,7 @@ class AstNodeX(AstNode):
                     element1_start = self.tokens.next().start
                     #print('****', element1_start)
                     self.tokens.lpar.append([lpar_str, element1_start, self])
-            fragment = Element('frag')
+            fragment = self.Element('frag')
             func(self, fragment)
 
             # detect if next significant token is RPAR
@@ -148,14 +214,12 @@ class AstNodeX(AstNode):
             # append paren (if any) and fragment to parent
             if close_paren:
                 self.tokens.lpar.pop()
-                parent.appendChild(DOM.Text(lpar_text))
-                for child in fragment.childNodes:
-                    parent.appendChild(child)
+                add_text(parent, lpar_text)
+                move_children(fragment, parent)
                 text = self.pop_merge_NL(lspace=True, rspace=False)
-                parent.appendChild(DOM.Text(text))
+                add_text(parent, text)
             else:
-                for child in fragment.childNodes:
-                    parent.appendChild(child)
+                move_children(fragment, parent)
             # print('<<<', self.class_)
 
         return _build_expr
@@ -196,11 +260,11 @@ class AstNodeX(AstNode):
             token = self.tokens.pop()
             text += self.tokens.prev_space() + token.string
         text += self.tokens.space_right()
-        ele.appendChild(DOM.Text(text))
+        add_text(ele, text)
 
 
     def c_Module(self, parent):
-        ele = Element('Module')
+        ele = self.Element('Module')
         for stmt in self.fields['body'].value:
             stmt.to_xml(ele)
         return ele
@@ -210,16 +274,16 @@ class AstNodeX(AstNode):
     def c_Num(self, parent):
         token = self.tokens.pop()
         assert token.type == Token.NUMBER, self.tokens.current
-        parent.appendChild(Element('Num', text=token.string))
+        parent.appendChild(self.Element('Num', text=token.string))
 
 
     @expr_wrapper
     def c_Str(self, parent):
-        ele = Element(self.class_)
+        ele = self.Element(self.class_)
         token = self.tokens.pop()
         while True:
             assert token.type == Token.STRING, self.tokens.current
-            ele_s = Element('s', text=token.string)
+            ele_s = self.Element('s', text=token.string)
             ele.appendChild(ele_s)
 
             # check if next token is a string (implicit concatenation)
@@ -242,7 +306,7 @@ class AstNodeX(AstNode):
                 text += self.tokens.prev_space() + token.string
             # add space before next string concatenated
             token = self.tokens.pop()
-            ele.appendChild(DOM.Text(text + self.tokens.prev_space()))
+            add_text(ele, text + self.tokens.prev_space())
         parent.appendChild(ele)
 
     c_Bytes = c_Str
@@ -250,40 +314,40 @@ class AstNodeX(AstNode):
 
     @expr_wrapper
     def c_Tuple(self, parent):
-        ele = Element('Tuple')
+        ele = self.Element('Tuple')
         ele.setAttribute('ctx', self.fields['ctx'].value.class_)
         elts = self.fields['elts'].value
         if elts:
             first = True
             for item in elts:
                 if not first:
-                    ele.appendChild(DOM.Text(self.tokens.space_right()))
+                    add_text(ele, self.tokens.space_right())
                 first = False
                 item.to_xml(ele)
                 text = self.pop_merge_NL(lspace=True, exact_type=Token.COMMA,
                                          rspace=False)
-                ele.appendChild(DOM.Text(text))
+                add_text(ele, text)
         else:
             # special case, empty tuple is represented by an empty `()`
             assert self.tokens.pop().exact_type == Token.LPAR
             assert self.tokens.pop().exact_type == Token.RPAR
             text = '(' + self.tokens.prev_space() + ')'
-            ele.appendChild(DOM.Text(text))
+            add_text(ele, text)
         parent.appendChild(ele)
 
 
     @expr_wrapper
     def c_List(self, parent):
-        ele = Element(self.class_)
+        ele = self.Element(self.class_)
         if 'ctx' in self.fields: # set doesnt have ctx
             ele.setAttribute('ctx', self.fields['ctx'].value.class_)
-        ele.appendChild(DOM.Text(self.pop_merge_NL())) #LSQB
+        add_text(ele, self.pop_merge_NL()) #LSQB
         for item in self.fields['elts'].value:
             item.to_xml(ele)
             self._c_delimiter(ele)
         # close brackets
         assert self.tokens.pop().type == Token.OP
-        ele.appendChild(DOM.Text(self.tokens.current.string))
+        add_text(ele, self.tokens.current.string)
         parent.appendChild(ele)
 
     c_Set = c_List
@@ -291,32 +355,32 @@ class AstNodeX(AstNode):
 
     @expr_wrapper
     def c_Dict(self, parent):
-        ele = Element('Dict')
+        ele = self.Element('Dict')
         parent.appendChild(ele)
 
-        ele.appendChild(DOM.Text(self.pop_merge_NL())) # LBRACE
+        add_text(ele, self.pop_merge_NL()) # LBRACE
         for key, value in zip(self.fields['keys'].value,
                               self.fields['values'].value):
-            item_ele = Element('item')
+            item_ele = self.Element('item')
             ele.appendChild(item_ele)
 
             key.to_xml(item_ele)
             # COLON
-            item_ele.appendChild(DOM.Text(self.pop_merge_NL(lspace=True)))
+            add_text(item_ele, self.pop_merge_NL(lspace=True))
             value.to_xml(item_ele)
             # optional comma
             self._c_delimiter(ele)
         # close text
         assert self.tokens.pop().exact_type == Token.RBRACE
         close_text = '}'
-        ele.appendChild(DOM.Text(close_text))
+        add_text(ele, close_text)
 
 
 
     @expr_wrapper
     def c_Name(self, parent):
         assert self.tokens.pop().type == Token.NAME, self.tokens.current
-        ele = Element('Name', text=self.fields['id'].value)
+        ele = self.Element('Name', text=self.fields['id'].value)
         ele.setAttribute('name', self.fields['id'].value)
         ele.setAttribute('ctx', self.fields['ctx'].value.class_)
         parent.appendChild(ele)
@@ -325,20 +389,20 @@ class AstNodeX(AstNode):
     @expr_wrapper
     def c_NameConstant(self, parent):
         assert self.tokens.pop().type == Token.NAME
-        ele = Element('NameConstant', text=self.tokens.current.string)
+        ele = self.Element('NameConstant', text=self.tokens.current.string)
         parent.appendChild(ele)
 
     @expr_wrapper
     def c_Ellipsis(self, parent):
         assert self.tokens.pop().type == Token.OP
-        ele = Element('Ellipsis', text=self.tokens.current.string)
+        ele = self.Element('Ellipsis', text=self.tokens.current.string)
         parent.appendChild(ele)
 
     @expr_wrapper
     def c_Starred(self, parent):
         assert self.tokens.pop().exact_type == Token.STAR
         text = '*' + self.tokens.space_right()
-        ele = Element('Starred', text=text)
+        ele = self.Element('Starred', text=text)
         ele.setAttribute('ctx', self.fields['ctx'].value.class_)
         self.fields['value'].value.to_xml(ele)
         parent.appendChild(ele)
@@ -346,59 +410,59 @@ class AstNodeX(AstNode):
 
     @expr_wrapper
     def c_Attribute(self, parent):
-        attribute_ele = Element('Attribute')
+        attribute_ele = self.Element('Attribute')
         attribute_ele.setAttribute('ctx', self.fields['ctx'].value.class_)
         # value
-        value_ele = Element('value')
+        value_ele = self.Element('value')
         self.fields['value'].value.to_xml(value_ele)
         attribute_ele.appendChild(value_ele)
         # dot
         text = self.pop_merge_NL(lspace=True)
-        attribute_ele.appendChild(DOM.Text(text))
+        add_text(attribute_ele, text)
         # attr name
         assert self.tokens.pop().type == Token.NAME, self.tokens.current
-        attr_ele = Element('attr', text=self.tokens.current.string)
+        attr_ele = self.Element('attr', text=self.tokens.current.string)
         attribute_ele.appendChild(attr_ele)
         parent.appendChild(attribute_ele)
 
 
     def c_Index(self, parent):
-        ele = Element('Index')
+        ele = self.Element('Index')
         self.fields['value'].value.to_xml(ele)
         parent.appendChild(ele)
 
     def c_Slice(self, parent):
-        ele = Element('Slice')
+        ele = self.Element('Slice')
         parent.appendChild(ele)
 
         # lower
         lower = self.fields['lower'].value
         if lower:
-            ele_lower = Element('lower')
+            ele_lower = self.Element('lower')
             lower.to_xml(ele_lower)
             ele.appendChild(ele_lower)
-            ele.appendChild(DOM.Text(self.tokens.space_right()))
+            add_text(ele, self.tokens.space_right())
 
         # first colon
-        ele.appendChild(DOM.Text(self.pop_merge_NL(rspace=False)))
+        add_text(ele, self.pop_merge_NL(rspace=False))
 
         # upper
         upper = self.fields['upper'].value
         if upper:
-            ele.appendChild(DOM.Text(self.tokens.space_right()))
-            ele_upper = Element('upper')
+            add_text(ele, self.tokens.space_right())
+            ele_upper = self.Element('upper')
             upper.to_xml(ele_upper)
             ele.appendChild(ele_upper)
 
         if self.tokens.next().exact_type == Token.COLON:
             colon2_text = self.pop_merge_NL(lspace=True, rspace=False)
-            ele.appendChild(DOM.Text(colon2_text)) # COLON
+            add_text(ele, colon2_text) # COLON
 
         # step
         step = self.fields['step'].value
         if step:
-            ele.appendChild(DOM.Text(self.tokens.prev_space()))
-            ele_step = Element('step')
+            add_text(ele, self.tokens.prev_space())
+            ele_step = self.Element('step')
             step.to_xml(ele_step)
             ele.appendChild(ele_step)
 
@@ -412,21 +476,21 @@ class AstNodeX(AstNode):
 
     @expr_wrapper
     def c_Subscript(self, parent):
-        sub_ele = Element('Subscript')
+        sub_ele = self.Element('Subscript')
         sub_ele.setAttribute('ctx', self.fields['ctx'].value.class_)
         parent.appendChild(sub_ele)
 
         # value
-        value_ele = Element('value')
+        value_ele = self.Element('value')
         self.fields['value'].value.to_xml(value_ele)
         sub_ele.appendChild(value_ele)
 
         # slice
-        ele_slice = Element('slice')
-        ele_slice.appendChild(DOM.Text(self.pop_merge_NL())) # LSQB
+        ele_slice = self.Element('slice')
+        add_text(ele_slice, self.pop_merge_NL()) # LSQB
         self.fields['slice'].value.to_xml(ele_slice)
         close_text = self.pop_merge_NL(lspace=True, rspace=False) #RSQB
-        ele_slice.appendChild(DOM.Text(close_text))
+        add_text(ele_slice, close_text)
         sub_ele.appendChild(ele_slice)
 
 
@@ -434,12 +498,12 @@ class AstNodeX(AstNode):
     def c_Yield(self, parent):
         assert self.tokens.pop().string == 'yield'
         yield_text = self.tokens.current.string + self.tokens.space_right()
-        ele = Element(self.class_, text=yield_text)
+        ele = self.Element(self.class_, text=yield_text)
         # from (only for YieldFrom)
         if self.class_ == 'YieldFrom':
             assert self.tokens.pop().string == 'from'
             from_text = self.tokens.current.string + self.tokens.space_right()
-            ele.appendChild(DOM.Text(from_text))
+            add_text(ele, from_text)
         # value
         value = self.fields['value'].value
         if value:
@@ -451,27 +515,27 @@ class AstNodeX(AstNode):
 
     @expr_wrapper
     def c_BinOp(self, parent):
-        ele = Element(self.class_)
+        ele = self.Element(self.class_)
         self.fields['left'].value.to_xml(ele)
         # operator
         op = self.fields['op'].value
         op_text = self.pop_merge_NL(lspace=True) # OP
-        ele.appendChild(Element(op.class_, text=op_text))
+        ele.appendChild(self.Element(op.class_, text=op_text))
         # right value
         self.fields['right'].value.to_xml(ele)
         parent.appendChild(ele)
 
     @expr_wrapper
     def c_BoolOp(self, parent):
-        ele = Element(self.class_)
+        ele = self.Element(self.class_)
         ele.setAttribute('op', self.fields['op'].value.class_)
 
         for index, value in enumerate(self.fields['values'].value):
             if index:
                 # prepend operator text to all values but first one
                 op_text = self.pop_merge_NL(lspace=True)
-                ele.appendChild(DOM.Text(op_text))
-            ele_value = Element('value')
+                add_text(ele, op_text)
+            ele_value = self.Element('value')
             value.to_xml(ele_value)
             ele.appendChild(ele_value)
         parent.appendChild(ele)
@@ -480,7 +544,7 @@ class AstNodeX(AstNode):
     def c_UnaryOp(self, parent):
         self.tokens.pop() # operator can be an OP or NAME
         op_text = self.tokens.current.string
-        ele = Element(self.class_, text=op_text)
+        ele = self.Element(self.class_, text=op_text)
         self.tokens.write_non_ast_tokens(ele)
         ele.setAttribute('op', self.fields['op'].value.class_)
         self.fields['operand'].value.to_xml(ele)
@@ -502,9 +566,9 @@ class AstNodeX(AstNode):
         }
     @expr_wrapper
     def c_Compare(self, parent):
-        ele = Element(self.class_)
+        ele = self.Element(self.class_)
 
-        ele_left = Element('value')
+        ele_left = self.Element('value')
         self.fields['left'].value.to_xml(ele_left)
         ele.appendChild(ele_left)
 
@@ -513,26 +577,26 @@ class AstNodeX(AstNode):
             cmp_text = self.tokens.space_right()
             for token in range(self.CMP_TOKEN_COUNT[op.class_]):
                 cmp_text += self.pop_merge_NL()
-            ele_op = Element('cmpop', text=cmp_text)
+            ele_op = self.Element('cmpop', text=cmp_text)
             ele.appendChild(ele_op)
             # value
-            ele_value = Element('value')
+            ele_value = self.Element('value')
             value.to_xml(ele_value)
             ele.appendChild(ele_value)
         parent.appendChild(ele)
 
 
     def _c_call_keyword(self, parent, keyword):
-        ele_keyword = Element('keyword')
+        ele_keyword = self.Element('keyword')
         parent.appendChild(ele_keyword)
         # arg
         assert self.tokens.pop().type == Token.NAME, self.tokens.current
-        ele_arg = Element('arg', text=keyword.fields['arg'].value)
+        ele_arg = self.Element('arg', text=keyword.fields['arg'].value)
         ele_keyword.appendChild(ele_arg)
         # equal
-        ele_keyword.appendChild(DOM.Text(self.pop_merge_NL(lspace=True)))
+        add_text(ele_keyword, self.pop_merge_NL(lspace=True))
         # value
-        ele_val = Element('value')
+        ele_val = self.Element('value')
         keyword.fields['value'].value.to_xml(ele_val)
         ele_keyword.appendChild(ele_val)
         self._c_delimiter(parent)
@@ -543,7 +607,7 @@ class AstNodeX(AstNode):
         # START DOUBLESTAR
         assert token.type == Token.OP, self.tokens.current
         text = token.string + self.tokens.space_right()
-        ele_xargs = Element(field, text=text)
+        ele_xargs = self.Element(field, text=text)
         xarg.to_xml(ele_xargs)
         ele.appendChild(ele_xargs)
         # optional comma
@@ -578,18 +642,18 @@ class AstNodeX(AstNode):
 
     @expr_wrapper
     def c_Call(self, parent):
-        ele = Element('Call')
+        ele = self.Element('Call')
 
         # func
-        ele_func = Element('func')
+        ele_func = self.Element('func')
         self.fields['func'].value.to_xml(ele_func)
         ele.appendChild(ele_func)
 
-        ele.appendChild(DOM.Text(self.pop_merge_NL(lspace=True))) # LPAR
+        add_text(ele, self.pop_merge_NL(lspace=True)) # LPAR
         # args
         args = self.fields['args'].value
         if args:
-            ele_args = Element('args')
+            ele_args = self.Element('args')
             ele.appendChild(ele_args)
             for arg in args:
                 arg.to_xml(ele_args)
@@ -603,96 +667,96 @@ class AstNodeX(AstNode):
             self._c_call_star_arg(ele, kwargs, 'kwargs')
 
         assert self.tokens.pop().exact_type == Token.RPAR, self.tokens.current
-        ele.appendChild(DOM.Text(')'))
+        add_text(ele, ')')
         parent.appendChild(ele)
 
 
     @expr_wrapper
     def c_IfExp(self, parent):
-        ele = Element('IfExpr')
+        ele = self.Element('IfExpr')
         parent.appendChild(ele)
 
         # body
-        ele_body = Element('body')
+        ele_body = self.Element('body')
         self.fields['body'].value.to_xml(ele_body)
         ele.appendChild(ele_body)
 
         # if
-        ele.appendChild(DOM.Text(self.pop_merge_NL(lspace=True)))
+        add_text(ele, self.pop_merge_NL(lspace=True))
 
         # test
-        ele_test = Element('test')
+        ele_test = self.Element('test')
         self.fields['test'].value.to_xml(ele_test)
         ele.appendChild(ele_test)
 
         # else
-        ele.appendChild(DOM.Text(self.pop_merge_NL(lspace=True)))
+        add_text(ele, self.pop_merge_NL(lspace=True))
 
         # orelse
-        ele_orelse = Element('orelse')
+        ele_orelse = self.Element('orelse')
         self.fields['orelse'].value.to_xml(ele_orelse)
         ele.appendChild(ele_orelse)
 
 
     @expr_wrapper
     def c_GeneratorExp(self, parent):
-        ele = Element(self.class_)
+        ele = self.Element(self.class_)
         if self.class_ != 'GeneratorExp':
-            ele.appendChild(DOM.Text(self.pop_merge_NL())) #LSQB
+            add_text(ele, self.pop_merge_NL()) #LSQB
 
         if 'elt' in self.fields: # GeneratorExp ListComp SetComp
             # elt
-            ele_elt = Element('elt')
+            ele_elt = self.Element('elt')
             ele.appendChild(ele_elt)
             self.fields['elt'].value.to_xml(ele_elt)
         else: # DictComp
-            ele_key = Element('key')
+            ele_key = self.Element('key')
             ele.appendChild(ele_key)
             self.fields['key'].value.to_xml(ele_key)
-            ele.appendChild(DOM.Text(self.pop_merge_NL(lspace=True))) # COLON
-            ele_value = Element('value')
+            add_text(ele, self.pop_merge_NL(lspace=True)) # COLON
+            ele_value = self.Element('value')
             ele.appendChild(ele_value)
             self.fields['value'].value.to_xml(ele_value)
 
         # generators
-        ele_gen = Element('generators')
+        ele_gen = self.Element('generators')
         ele.appendChild(ele_gen)
         for gen in self.fields['generators'].value:
-            ele_comp = Element('comprehension')
+            ele_comp = self.Element('comprehension')
             ele_gen.appendChild(ele_comp)
             # for
             for_text = self.pop_merge_NL(lspace=True) # for
-            ele_comp.appendChild(DOM.Text(for_text))
+            add_text(ele_comp, for_text)
             # target
-            ele_target = Element('target')
+            ele_target = self.Element('target')
             gen.fields['target'].value.to_xml(ele_target)
             ele_comp.appendChild(ele_target)
             # in
             in_text = self.pop_merge_NL(lspace=True) # in
-            ele_comp.appendChild(DOM.Text(in_text))
+            add_text(ele_comp, in_text)
             # iter
-            ele_iter = Element('iter')
+            ele_iter = self.Element('iter')
             gen.fields['iter'].value.to_xml(ele_iter)
             ele_comp.appendChild(ele_iter)
 
             # ifs
             ifs = gen.fields['ifs'].value
             if ifs:
-                ele_ifs = Element('ifs')
+                ele_ifs = self.Element('ifs')
                 ele_comp.appendChild(ele_ifs)
                 for gif in ifs:
-                    ele_if = Element('if')
+                    ele_if = self.Element('if')
                     ele_ifs.appendChild(ele_if)
                     # if
                     if_text = self.pop_merge_NL(lspace=True) # if
-                    ele_if.appendChild(DOM.Text(if_text))
+                    add_text(ele_if, if_text)
                     # target
                     gif.to_xml(ele_if)
 
         # close brackets
         if self.class_ != 'GeneratorExp':
             close_text = self.pop_merge_NL(lspace=True, rspace=False)
-            ele.appendChild(DOM.Text(close_text))
+            add_text(ele, close_text)
         parent.appendChild(ele)
 
     c_ListComp = c_GeneratorExp
@@ -703,17 +767,17 @@ class AstNodeX(AstNode):
     @expr_wrapper
     def c_Lambda(self, parent):
         assert self.tokens.pop().string == 'lambda'
-        ele = Element('Lambda', text='lambda' + self.tokens.space_right())
+        ele = self.Element('Lambda', text='lambda' + self.tokens.space_right())
         # arguments
-        ele_arguments = Element('arguments')
+        ele_arguments = self.Element('arguments')
         self._arguments(ele_arguments)
         ele.appendChild(ele_arguments)
 
         # COLON :
-        ele.appendChild(DOM.Text(self.pop_merge_NL()))
+        add_text(ele, self.pop_merge_NL())
 
         # body
-        ele_body = Element('body')
+        ele_body = self.Element('body')
         self.fields['body'].value.to_xml(ele_body)
         ele.appendChild(ele_body)
         parent.appendChild(ele)
@@ -726,7 +790,7 @@ class AstNodeX(AstNode):
 
     def _c_field_list(self, parent, field_name, text=None):
         """must a field list that contains line, number information"""
-        ele = Element(field_name, text=text)
+        ele = self.Element(field_name, text=text)
         for item in self.fields[field_name].value:
             item.to_xml(ele)
         parent.appendChild(ele)
@@ -734,7 +798,7 @@ class AstNodeX(AstNode):
 
     def c_Expr(self, parent):
         self.tokens.write_non_ast_tokens(parent)
-        ele = Element('Expr')
+        ele = self.Element('Expr')
         self.fields['value'].value.to_xml(ele)
         parent.appendChild(ele)
 
@@ -742,7 +806,7 @@ class AstNodeX(AstNode):
     def c_Pass(self, parent):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().type == Token.NAME
-        parent.appendChild(Element(self.class_,
+        parent.appendChild(self.Element(self.class_,
                                    text=self.tokens.current.string))
     c_Break = c_Pass
     c_Continue = c_Pass
@@ -752,17 +816,17 @@ class AstNodeX(AstNode):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().string == 'assert'
         assert_text = 'assert' + self.tokens.space_right()
-        assert_ele = Element('Assert', text=assert_text)
+        assert_ele = self.Element('Assert', text=assert_text)
         # test expr
-        test_ele = Element('test')
+        test_ele = self.Element('test')
         self.fields['test'].value.to_xml(test_ele)
         assert_ele.appendChild(test_ele)
         # msg
         msg = self.fields['msg'].value
         if msg:
             assert self.tokens.pop().exact_type == Token.COMMA
-            assert_ele.appendChild(DOM.Text(self.tokens.text_prev2next()))
-            msg_ele = Element('msg')
+            add_text(assert_ele, self.tokens.text_prev2next())
+            msg_ele = self.Element('msg')
             msg.to_xml(msg_ele)
             assert_ele.appendChild(msg_ele)
         parent.appendChild(assert_ele)
@@ -770,15 +834,15 @@ class AstNodeX(AstNode):
 
     def c_Assign(self, parent):
         self.tokens.write_non_ast_tokens(parent)
-        ele = Element('Assign')
+        ele = self.Element('Assign')
         # targets
-        ele_targets = Element('targets')
+        ele_targets = self.Element('targets')
         ele.appendChild(ele_targets)
         for target in self.fields['targets'].value:
             target.to_xml(ele_targets)
             # op `=`
             assert self.tokens.pop().exact_type == Token.EQUAL
-            ele_targets.appendChild(DOM.Text(self.tokens.text_prev2next()))
+            add_text(ele_targets, self.tokens.text_prev2next())
         # value
         self.fields['value'].value.to_xml(ele)
         parent.appendChild(ele)
@@ -787,9 +851,9 @@ class AstNodeX(AstNode):
     def c_Delete(self, parent):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().string == 'del'
-        ele = Element('Delete', text='del' + self.tokens.space_right())
+        ele = self.Element('Delete', text='del' + self.tokens.space_right())
         # targets
-        ele_targets = Element('targets')
+        ele_targets = self.Element('targets')
         ele.appendChild(ele_targets)
         for target in self.fields['targets'].value:
             target.to_xml(ele_targets)
@@ -802,13 +866,13 @@ class AstNodeX(AstNode):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().type == Token.NAME
         text = self.tokens.current.string + self.tokens.space_right()
-        ele = Element(self.class_, text=text)
+        ele = self.Element(self.class_, text=text)
         # names
-        ele_names = Element('names')
+        ele_names = self.Element('names')
         ele.appendChild(ele_names)
         for name in self.fields['names'].value:
             assert self.tokens.pop().type == Token.NAME
-            ele_name = Element('name', text=name.value)
+            ele_name = self.Element('name', text=name.value)
             ele_names.appendChild(ele_name)
             # optional comma
             self._c_delimiter(ele_names)
@@ -819,41 +883,41 @@ class AstNodeX(AstNode):
 
     def c_AugAssign(self, parent):
         self.tokens.write_non_ast_tokens(parent)
-        ele = Element('AugAssign')
+        ele = self.Element('AugAssign')
         parent.appendChild(ele)
         # target
-        ele_target = Element('target')
+        ele_target = self.Element('target')
         self.fields['target'].value.to_xml(ele_target)
         ele.appendChild(ele_target)
         # op
-        ele_op = Element('op')
+        ele_op = self.Element('op')
         assert self.tokens.pop().type == Token.OP
         op = self.fields['op'].value
-        ele_op_val = Element(op.class_, text=self.tokens.text_prev2next())
+        ele_op_val = self.Element(op.class_, text=self.tokens.text_prev2next())
         ele_op.appendChild(ele_op_val)
         ele.appendChild(ele_op)
         # value
-        ele_value = Element('value')
+        ele_value = self.Element('value')
         self.fields['value'].value.to_xml(ele_value)
         ele.appendChild(ele_value)
 
 
     def _c_import_names(self, ele):
         for child in self.fields['names'].value:
-            alias = Element('alias')
+            alias = self.Element('alias')
 
             # add name
             self.tokens.pop_dotted_name()
-            name_ele = Element('name', text=child.fields['name'].value)
+            name_ele = self.Element('name', text=child.fields['name'].value)
             alias.appendChild(name_ele)
 
             # check if optional asname is present
             asname = child.fields.get('asname', None)
             if asname.value:
                 assert self.tokens.pop().string == 'as'
-                alias.appendChild(DOM.Text(self.tokens.text_prev2next()))
+                add_text(alias, self.tokens.text_prev2next())
                 assert self.tokens.pop().type == Token.NAME
-                alias.appendChild(Element('asname', text=asname.value))
+                alias.appendChild(self.Element('asname', text=asname.value))
             ele.appendChild(alias)
             self._c_delimiter(ele)
 
@@ -861,14 +925,14 @@ class AstNodeX(AstNode):
     def c_Import(self, parent):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().string == 'import'
-        ele = Element('Import', text='import' + self.tokens.space_right())
+        ele = self.Element('Import', text='import' + self.tokens.space_right())
         self._c_import_names(ele)
         parent.appendChild(ele)
 
     def c_ImportFrom(self, parent):
         self.tokens.write_non_ast_tokens(parent)
 
-        ele = Element('ImportFrom')
+        ele = self.Element('ImportFrom')
         # level
         ele.setAttribute('level', str(self.fields['level'].value))
 
@@ -879,32 +943,32 @@ class AstNodeX(AstNode):
         while self.tokens.next().exact_type == Token.DOT:
             from_text += '.'
             self.tokens.pop() # dot
-        ele.appendChild(DOM.Text(from_text))
+        add_text(ele, from_text)
 
         # get module name
         module_text = ''
         if self.tokens.next().string != 'import':
             module_text += self.tokens.pop_dotted_name()
-        ele.appendChild(Element('module', text=module_text))
+        ele.appendChild(self.Element('module', text=module_text))
 
         # import keyword
         assert self.tokens.pop().string == 'import'
-        ele.appendChild(DOM.Text(self.tokens.text_prev2next()))
+        add_text(ele, self.tokens.text_prev2next())
 
         # parenthesis
         token = self.tokens.next()
         has_paren = False
         if token.exact_type == Token.LPAR:
             has_paren = True
-            ele.appendChild(DOM.Text(self.pop_merge_NL())) # LPAR
+            add_text(ele, self.pop_merge_NL()) # LPAR
 
         # names
-        names = Element('names')
+        names = self.Element('names')
         self._c_import_names(names)
         ele.appendChild(names)
 
         if has_paren:
-            ele.appendChild(DOM.Text(self.pop_merge_NL())) #RPAR
+            add_text(ele, self.pop_merge_NL()) #RPAR
 
         # append to parent
         parent.appendChild(ele)
@@ -913,37 +977,37 @@ class AstNodeX(AstNode):
     def c_Return(self, parent):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().string == 'return'
-        ele = Element('Return', text='return')
+        ele = self.Element('Return', text='return')
         value = self.fields['value'].value
         if value:
-            ele.appendChild(DOM.Text(self.tokens.space_right()))
+            add_text(ele, self.tokens.space_right())
             value.to_xml(ele)
         parent.appendChild(ele)
 
 
     def _arg_element(self, arg, default=None, kwonly=False):
         """:return: XML node"""
-        arg_ele = Element('arg')
+        arg_ele = self.Element('arg')
         arg_ele.setAttribute('name', arg.fields['arg'].value)
-        arg_ele.appendChild(DOM.Text(arg.fields['arg'].value))
+        add_text(arg_ele, arg.fields['arg'].value)
         if kwonly:
             arg_ele.setAttribute('kwonly', None)
 
         ann = arg.fields['annotation'].value
         if ann:
             assert self.tokens.pop().exact_type == Token.COLON
-            ann_ele = Element('annotation')
+            ann_ele = self.Element('annotation')
             ann_text = self.tokens.text_prev2next()
-            ann_ele.appendChild(DOM.Text(ann_text))
+            add_text(ann_ele, ann_text)
             ann.to_xml(ann_ele)
             arg_ele.appendChild(ann_ele)
 
         # keyword_only arg might not have a default None instead of an ast node
         if hasattr(default, 'fields'):
             assert self.tokens.pop().exact_type == Token.EQUAL
-            default_ele = Element('default')
+            default_ele = self.Element('default')
             equal_text = self.tokens.text_prev2next()
-            default_ele.appendChild(DOM.Text(equal_text))
+            add_text(default_ele, equal_text)
             default.to_xml(default_ele)
             arg_ele.appendChild(default_ele)
 
@@ -954,14 +1018,14 @@ class AstNodeX(AstNode):
         """handle vararg and kwarg"""
         arg = arguments.fields[field].value
         if arg:
-            ele_arg = Element(field)
+            ele_arg = self.Element(field)
             token = self.tokens.pop()
              # START / DOUBLESTAR
             assert token.type == Token.OP, self.tokens.current
             star_text = token.string
-            ele_arg.appendChild(DOM.Text(star_text))
+            add_text(ele_arg, star_text)
             assert self.tokens.pop().type == Token.NAME
-            ele_arg.appendChild(DOM.Text(self.tokens.prev_space()))
+            add_text(ele_arg, self.tokens.prev_space())
             ele_arg.appendChild(self._arg_element(arg))
             ele_arguments.appendChild(ele_arg)
             self._c_delimiter(ele_arguments)
@@ -989,7 +1053,7 @@ class AstNodeX(AstNode):
         if kwonlyargs and not arguments.fields['vararg'].value:
             # if there is kwonly args but no vararg it needs an extra '*' arg
             assert self.tokens.pop().exact_type == Token.STAR
-            ele_arguments.appendChild(DOM.Text('*' + self.tokens.space_right()))
+            add_text(ele_arguments, '*' + self.tokens.space_right())
             self._c_delimiter(ele_arguments)
         for arg, default in zip(kwonlyargs, kw_defaults):
             assert self.tokens.pop().type == Token.NAME, self.tokens.current
@@ -1006,7 +1070,7 @@ class AstNodeX(AstNode):
         for deco in decorators:
             assert self.tokens.pop().exact_type == Token.AT
             deco_text = '@' + self.tokens.space_right()
-            ele_deco = Element('decorator', text=deco_text)
+            ele_deco = self.Element('decorator', text=deco_text)
             parent.appendChild(ele_deco)
             deco.to_xml(ele_deco)
             self.tokens.write_non_ast_tokens(parent)
@@ -1014,44 +1078,44 @@ class AstNodeX(AstNode):
 
     def c_FunctionDef(self, parent):
         self.tokens.write_non_ast_tokens(parent)
-        ele = Element('FunctionDef')
+        ele = self.Element('FunctionDef')
 
         # decorator
         self._c_decorator_list(ele)
 
         # def
         assert self.tokens.pop().string == 'def'
-        ele.appendChild(DOM.Text('def' + self.tokens.space_right()))
+        add_text(ele, 'def' + self.tokens.space_right())
 
         # name
         assert self.tokens.pop().type == Token.NAME
         name = self.fields['name'].value
         ele.setAttribute('name', name)
-        ele.appendChild(DOM.Text(name))
+        add_text(ele, name)
 
         # args
         start_arguments_text = self.pop_merge_NL(lspace=True) # LPAR
-        ele_arguments = Element('arguments', text=start_arguments_text)
+        ele_arguments = self.Element('arguments', text=start_arguments_text)
         self._arguments(ele_arguments)
 
         # close parent + colon
         assert self.tokens.pop().exact_type == Token.RPAR
         close_args_text = ')' + self.tokens.space_right()
-        ele_arguments.appendChild(DOM.Text(close_args_text))
+        add_text(ele_arguments, close_args_text)
 
         returns = self.fields['returns'].value
         if returns:
             assert self.tokens.pop().type == Token.OP # ->
             arrow_text = '->' + self.tokens.space_right()
-            ele_returns = Element('returns', text=arrow_text)
+            ele_returns = self.Element('returns', text=arrow_text)
             ele_arguments.appendChild(ele_returns)
             returns.to_xml(ele_returns)
-            ele_returns.appendChild(DOM.Text(self.tokens.space_right()))
+            add_text(ele_returns, self.tokens.space_right())
 
         # colon
         assert self.tokens.pop().exact_type == Token.COLON
         colon_text = ':'
-        ele_arguments.appendChild(DOM.Text(colon_text))
+        add_text(ele_arguments, colon_text)
         ele.appendChild(ele_arguments)
 
         # body
@@ -1061,30 +1125,31 @@ class AstNodeX(AstNode):
 
     def c_ClassDef(self, parent):
         self.tokens.write_non_ast_tokens(parent)
-        ele = Element('ClassDef')
+        ele = self.Element('ClassDef')
 
         # decorator
         self._c_decorator_list(ele)
 
         # class
         assert self.tokens.pop().string == 'class'
-        ele.appendChild(DOM.Text('class'))
+        add_text(ele, 'class')
 
         # name
         assert self.tokens.pop().type == Token.NAME
         name = self.fields['name'].value
         ele.setAttribute('name', name)
         text = self.tokens.prev_space() + name
-        ele.appendChild(DOM.Text(text))
+        add_text(ele, text)
 
         # arguments
         if self.tokens.next().exact_type == Token.LPAR:
             start_arguments_text = self.pop_merge_NL(lspace=True)
-            ele_arguments = Element('arguments', text=start_arguments_text)
+            ele_arguments = self.Element('arguments',
+                                         text=start_arguments_text)
 
             bases = self.fields['bases'].value
             for item in bases:
-                ele_base = Element('base')
+                ele_base = self.Element('base')
                 item.to_xml(ele_base)
                 ele_arguments.appendChild(ele_base)
                 self._c_delimiter(ele_arguments)
@@ -1097,12 +1162,12 @@ class AstNodeX(AstNode):
 
             # close arguments
             assert self.tokens.pop().exact_type == Token.RPAR
-            ele_arguments.appendChild(DOM.Text(')'))
+            add_text(ele_arguments, ')')
             ele.appendChild(ele_arguments)
 
         # colon
         assert self.tokens.pop().exact_type == Token.COLON
-        ele.appendChild(DOM.Text(self.tokens.prev_space() + ':'))
+        add_text(ele, self.tokens.prev_space() + ':')
 
         # body
         self._c_field_list(ele, 'body')
@@ -1114,14 +1179,14 @@ class AstNodeX(AstNode):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().type == Token.NAME
         while_text = self.tokens.current.string + self.tokens.space_right()
-        ele = Element(self.class_, text=while_text)
+        ele = self.Element(self.class_, text=while_text)
         # test expr
-        test_ele = Element('test')
+        test_ele = self.Element('test')
         self.fields['test'].value.to_xml(test_ele)
         ele.appendChild(test_ele)
         # colon
         assert self.tokens.pop().exact_type == Token.COLON
-        ele.appendChild(DOM.Text(self.tokens.prev_space() + ':'))
+        add_text(ele, self.tokens.prev_space() + ':')
         # body
         self._c_field_list(ele, 'body')
         # orelse
@@ -1129,7 +1194,7 @@ class AstNodeX(AstNode):
         if orelse:
             self.tokens.write_non_ast_tokens(ele, rspace=False)
             if self.tokens.next().string == 'elif':
-                ele_orelse = Element('orelse')
+                ele_orelse = self.Element('orelse')
                 orelse[0].to_xml(ele_orelse)
                 ele.appendChild(ele_orelse)
             else:
@@ -1147,22 +1212,22 @@ class AstNodeX(AstNode):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().string == 'for'
         for_text = self.tokens.current.string + self.tokens.space_right()
-        ele = Element(self.class_, text=for_text)
+        ele = self.Element(self.class_, text=for_text)
         # target expr
-        ele_target = Element('target')
+        ele_target = self.Element('target')
         self.fields['target'].value.to_xml(ele_target)
         ele.appendChild(ele_target)
         # 'in'
         assert self.tokens.pop().string == 'in'
         in_text = self.tokens.text_prev2next()
-        ele.appendChild(DOM.Text(in_text))
+        add_text(ele, in_text)
         # iter
-        ele_iter = Element('iter')
+        ele_iter = self.Element('iter')
         self.fields['iter'].value.to_xml(ele_iter)
         ele.appendChild(ele_iter)
         # colon
         assert self.tokens.pop().exact_type == Token.COLON
-        ele.appendChild(DOM.Text(self.tokens.prev_space() + ':'))
+        add_text(ele, self.tokens.prev_space() + ':')
         # body
         self._c_field_list(ele, 'body')
         parent.appendChild(ele)
@@ -1180,12 +1245,12 @@ class AstNodeX(AstNode):
     def c_Raise(self, parent):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().string == 'raise'
-        ele = Element('Raise', text='raise')
+        ele = self.Element('Raise', text='raise')
         # exc
         exc = self.fields['exc'].value
         if exc:
-            ele.appendChild(DOM.Text(self.tokens.space_right()))
-            ele_exc = Element('exc')
+            add_text(ele, self.tokens.space_right())
+            ele_exc = self.Element('exc')
             exc.to_xml(ele_exc)
             ele.appendChild(ele_exc)
 
@@ -1193,50 +1258,50 @@ class AstNodeX(AstNode):
         cause = self.fields['cause'].value
         if cause:
             assert self.tokens.pop().string == 'from'
-            ele.appendChild(DOM.Text(self.tokens.text_prev2next()))
-            ele_cause = Element('cause')
+            add_text(ele, self.tokens.text_prev2next())
+            ele_cause = self.Element('cause')
             cause.to_xml(ele_cause)
             ele.appendChild(ele_cause)
         parent.appendChild(ele)
 
 
     def c_ExceptHandler(self, parent):
-        ele = Element('ExceptHandler')
+        ele = self.Element('ExceptHandler')
         parent.appendChild(ele)
         # except
         self.tokens.write_non_ast_tokens(ele)
         assert self.tokens.pop().string == 'except', self.tokens.current
         except_text = 'except' + self.tokens.space_right()
-        ele.appendChild(DOM.Text(except_text))
+        add_text(ele, except_text)
         # type
         except_type = self.fields['type'].value
         if except_type:
-            ele_type = Element('type')
+            ele_type = self.Element('type')
             except_type.to_xml(ele_type)
             ele.appendChild(ele_type)
             # name
             name = self.fields['name'].value
             if name:
                 assert self.tokens.pop().string == 'as'
-                ele.appendChild(DOM.Text(self.tokens.text_prev2next()))
+                add_text(ele, self.tokens.text_prev2next())
                 assert self.tokens.pop().type == Token.NAME
-                ele_name = Element('name', text=name)
+                ele_name = self.Element('name', text=name)
                 ele.appendChild(ele_name)
         # :
         assert self.tokens.pop().exact_type == Token.COLON
         colon_text = self.tokens.prev_space() + ':'
-        ele.appendChild(DOM.Text(colon_text))
+        add_text(ele, colon_text)
         # body
         self._c_field_list(ele, 'body')
 
 
     def c_Try(self, parent):
         self.tokens.write_non_ast_tokens(parent)
-        ele = Element('Try')
+        ele = self.Element('Try')
         parent.appendChild(ele)
         assert self.tokens.pop().string == 'try', self.tokens.current
         try_text = 'try' + self.tokens.space_right() + ':'
-        ele.appendChild(DOM.Text(try_text))
+        add_text(ele, try_text)
         assert self.tokens.pop().exact_type == Token.COLON
 
         # body
@@ -1245,7 +1310,7 @@ class AstNodeX(AstNode):
         # handlers
         handlers = self.fields['handlers'].value
         if handlers:
-            ele_handlers = Element('handlers')
+            ele_handlers = self.Element('handlers')
             ele.appendChild(ele_handlers)
             for handler in handlers:
                 handler.to_xml(ele_handlers)
@@ -1271,23 +1336,23 @@ class AstNodeX(AstNode):
         self.tokens.write_non_ast_tokens(parent)
         assert self.tokens.pop().string == 'with'
         with_text = 'with' + self.tokens.space_right()
-        ele = Element(self.class_, text=with_text)
-        ele_items = Element('items')
+        ele = self.Element(self.class_, text=with_text)
+        ele_items = self.Element('items')
         ele.appendChild(ele_items)
         for item in self.fields['items'].value:
-            ele_item = Element('withitem')
+            ele_item = self.Element('withitem')
             ele_items.appendChild(ele_item)
             item.fields['context_expr'].value.to_xml(ele_item)
             opt_vars = item.fields['optional_vars'].value
             if opt_vars:
                 assert self.tokens.pop().string == 'as'
-                ele_item.appendChild(DOM.Text(self.tokens.text_prev2next()))
+                add_text(ele_item, self.tokens.text_prev2next())
                 opt_vars.to_xml(ele_item)
             self._c_delimiter(ele_items)
 
         # colon
         assert self.tokens.pop().exact_type == Token.COLON
-        ele.appendChild(DOM.Text(':'))
+        add_text(ele, ':')
         # body
         self._c_field_list(ele, 'body')
         parent.appendChild(ele)
@@ -1366,40 +1431,190 @@ class SrcToken:
             text += self.prev_space() + token.string
         if rspace:
             text += self.space_right()
-        parent_ele.appendChild(DOM.Text(text))
+        add_text(parent_ele, text)
 
 
 
-def py2xml(filename=None, fromstring=None):
-    """convert ast to srcML"""
-    AstNodeX.load_map()
+def _decode_source(data):
+    """decode source bytes keeping its original line endings"""
+    encoding = Token.detect_encoding(io.BytesIO(data).readline)[0]
+    return data.decode(encoding)
 
-    if fromstring:
+class AstNodeCst(AstNodeX):
+    """AstNodeX creating a tree of `CstNode`"""
+    Element = staticmethod(CstElement)
+
+
+def _token_iter(filename=None, fromstring=None, node_class=AstNodeX):
+    """convert using the tokenizer engine, one top-level statement at a time
+
+    Yield the DOM Element of the module after each statement is added
+    to it, and after the remaining text at the end of file is added.
+
+    :param node_class: `AstNodeX` or `AstNodeCst`
+    """
+    node_class.load_map()
+    if fromstring is not None:
         filename = '<str>'
         _bytep = io.BytesIO(fromstring.encode('utf-8'))
         _strp = io.StringIO(fromstring)
-        ast_root = AstNodeX.tree(_strp, filename)
-        AstNodeX.tokens = SrcToken(_bytep)
+        ast_root = node_class.tree(_strp, filename)
+        node_class.tokens = SrcToken(_bytep)
     elif filename:
         with open(filename, 'r') as fp:
             filep = io.StringIO(fp.read())
-        ast_root = AstNodeX.tree(filep, filename)
+        ast_root = node_class.tree(filep, filename)
 
         with open(filename, 'rb') as bs:
-            AstNodeX.tokens = SrcToken(bs)
+            node_class.tokens = SrcToken(bs)
     else:
         filename = '<stdin>'
         _bytep = io.BytesIO(sys.stdin.buffer.read())
         _strp = io.StringIO(_bytep.getvalue().decode('utf-8'))
-        ast_root = AstNodeX.tree(_strp, filename)
-        AstNodeX.tokens = SrcToken(_bytep)
+        ast_root = node_class.tree(_strp, filename)
+        node_class.tokens = SrcToken(_bytep)
 
-    root = ast_root.to_xml()
+    root = node_class.Element('Module')
+    for stmt in ast_root.fields['body'].value:
+        stmt.to_xml(root)
+        yield root
     # add remaining text at the end of the file
     ast_root.tokens.write_non_ast_tokens(root)
+    yield root
+
+
+def iter_module(filename=None, fromstring=None, engine=None,
+                skeleton=False, max_depth=None, lines=None, select=None,
+                tree=None, cst=False):
+    """convert python module one top-level statement at a time
+
+    :param engine: (str) `token` matches every token from the tokenizer,
+        `pos` uses AST node positions (requires python3.8+).
+        Default is `pos` when available.
+    :param skeleton: (bool) only convert imports, classes and function
+        signatures. Other statements and function bodies are added
+        as `raw` elements (only `pos` engine)
+    :param max_depth: (int) nodes nested deeper than this are added
+        as `raw` elements (only `pos` engine)
+    :param lines: 2-tuple (first, last) only convert statements in
+        given line range (only `pos` engine)
+    :param select: (str) dotted name of class/function to be
+        converted, i.e. `MyClass.method` (only `pos` engine)
+    :param tree: `ast.Module` of the source, if already parsed
+        (only `pos` engine)
+    :param cst: (bool) build a tree of `CstNode` instead of DOM
+    :return: iterator of the (same) DOM Element of the module,
+        yielded after each top-level statement is converted
+    """
+    if engine is None:
+        engine = 'pos' if sys.version_info >= (3, 8) else 'token'
+    for key in TEXT_NODES_AVOIDED:
+        TEXT_NODES_AVOIDED[key] = 0
+
+    if engine == 'pos':
+        from .py2xml_pos import iter_pos2xml
+        options = {'skeleton': skeleton, 'max_depth': max_depth,
+                   'lines': lines, 'select': select, 'tree': tree,
+                   'element': CstElement if cst else Element}
+        if fromstring is not None:
+            return iter_pos2xml(fromstring, '<str>', **options)
+        elif filename:
+            with open(filename, 'rb') as fp:
+                source = _decode_source(fp.read())
+            return iter_pos2xml(source, filename, **options)
+        else:
+            source = _decode_source(sys.stdin.buffer.read())
+            return iter_pos2xml(source, '<stdin>', **options)
+    if (skeleton or max_depth is not None or lines or select or
+            tree is not None):
+        raise ValueError('skeleton, max_depth, lines, select and tree '
+                         'require the `pos` engine')
+    return _token_iter(filename, fromstring,
+                       AstNodeCst if cst else AstNodeX)
+
+
+def py2dom(filename=None, fromstring=None, positions=False, **options):
+    """convert ast to srcML
+    :return: DOM Element of the module
+
+    :param positions: (bool) add `start`/`end` attributes with
+        source byte offsets to all elements
+    :param options: see `iter_module`
+    """
+    for root in iter_module(filename, fromstring, **options):
+        pass
+
+    # keep an empty module serialized as <Module></Module>
+    if not root.hasChildNodes():
+        root.appendChild(DOM.Text(''))
+
+    if positions:
+        add_positions(root)
+    return root
+
+
+def py2cst(filename=None, fromstring=None, **options):
+    """convert python module to a tree of `CstNode`
+    :param options: see `iter_module`
+    :return: CstNode of the module
+    """
+    for root in iter_module(filename, fromstring, cst=True, **options):
+        pass
+    return root
+
+
+def dom_events(node):
+    """yield events for a pre-order traversal of a DOM tree
+
+      - ('start', tag, attributes dict)
+      - ('text', text, None)
+      - ('end', tag, None)
+    """
+    # 2-tuple (node, end_of_element)
+    stack = [(node, False)]
+    while stack:
+        node, closing = stack.pop()
+        if node.nodeType == node.TEXT_NODE:
+            yield ('text', node.data, None)
+        elif closing:
+            yield ('end', node.tagName, None)
+        else:
+            yield ('start', node.tagName, dict(node.attributes.items()))
+            stack.append((node, True))
+            for child in reversed(node.childNodes):
+                stack.append((child, False))
 
-    # write XML string
-    return root.toxml()
+
+def iter_events(filename=None, fromstring=None, **options):
+    """convert python module yielding events in document order,
+    same events as `dom_events`.
+
+    Events are generated after each top-level statement is converted,
+    the DOM of previous statements is discarded.
+
+    :param options: see `iter_module`
+    """
+    yield ('start', 'Module', {})
+    for root in iter_module(filename, fromstring, **options):
+        while root.firstChild is not None:
+            child = root.removeChild(root.firstChild)
+            for event in dom_events(child):
+                yield event
+    yield ('end', 'Module', None)
+
+
+def py2xml(*args, **kwargs):
+    """convert ast to srcML, same arguments as `py2dom`
+    :return: (str) XML
+    """
+    return py2dom(*args, **kwargs).toxml()
+
+
+def py2bin(*args, **kwargs):
+    """convert ast to srcML, same arguments as `py2dom`
+    :return: (bytes) binary format, see `py2xml_bin`
+    """
+    return dom2bin(py2dom(*args, **kwargs))
 
 
 
@@ -1407,21 +1622,35 @@ def xml2py(filename=None, fromstring=None):
     """convert XML back to python
 
     To convert back, just get all text from all nodes.
+    Also accepts the binary format from `py2bin`.
     """
     if fromstring:
         xml_str = fromstring
     else:
         if filename:
-            with open(filename) as fp_in:
+            with open(filename, 'rb') as fp_in:
                 xml_str = fp_in.read()
         else:
             xml_str = sys.stdin.buffer.read()
 
+    # binary format contains the source text as is
+    if isinstance(xml_str, bytes) and xml_str.startswith(BIN_MAGIC):
+        return bin2py(xml_str)
     root = ET.fromstring(xml_str)
     return ET.tostring(root, encoding='unicode', method='text')
 
 
 
+def _line_range(value):
+    """argparse type for `FIRST:LAST`"""
+    try:
+        first, last = (int(num) for num in value.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'expected FIRST:LAST, got {!r}'.format(value))
+    return first, last
+
+
 def main(args=None):
     """command line program for py2xml"""
     import difflib
@@ -1430,7 +1659,7 @@ def main(args=None):
     parser = argparse.ArgumentParser(description=description)
     parser.add_argument('-r', '--reverse', dest='reverse',
                         action='store_true',
-                        help='reverse - convert XML back to python code')
+                        help='reverse - convert XML (or bin) back to python code')
     parser.add_argument(
         '-c', '--check', dest='check',
         action='store_true',
@@ -1438,13 +1667,73 @@ def main(args=None):
     parser.add_argument(
         'py_file', metavar='MODULE', nargs='?',
         help='python module, if not specified uses stdin.')
+    parser.add_argument(
+        '--archive', dest='archive', metavar='FILE', default=None,
+        help='with --reverse: read MODULE from an archive '
+        'created by py2xml-batch')
+    parser.add_argument(
+        '--engine', dest='engine', choices=('token', 'pos'), default=None,
+        help='conversion engine: token (all python versions) or '
+        'pos (python3.8+, uses AST positions). Default: pos if available')
+    parser.add_argument(
+        '--positions', dest='positions', action='store_true',
+        help='add start/end (source byte offset) attributes to elements')
+    parser.add_argument(
+        '--index', dest='index', metavar='FILE',
+        help='write a binary index with source and XML byte offsets '
+        'of every element')
+    parser.add_argument(
+        '--skeleton', dest='skeleton', action='store_true',
+        help='only convert imports, classes and function signatures, '
+        'other code is kept as raw text')
+    parser.add_argument(
+        '--max-depth', dest='max_depth', metavar='N', type=int, default=None,
+        help='nodes nested deeper than N are kept as raw text')
+    parser.add_argument(
+        '--lines', dest='lines', metavar='FIRST:LAST', type=_line_range,
+        default=None,
+        help='only convert statements in the line range (inclusive)')
+    parser.add_argument(
+        '--select', dest='select', metavar='NAME', default=None,
+        help='only convert class/function with dotted NAME, '
+        'i.e. MyClass.method')
+    parser.add_argument(
+        '-j', '--jobs', dest='jobs', metavar='N', type=int, default=None,
+        help='convert top-level statements using N processes '
+        '(0 for CPU count). Only XML output with --engine pos')
+    parser.add_argument(
+        '--format', dest='format', choices=('xml', 'bin', 'ndjson'),
+        default='xml',
+        help='output format: xml, bin (compact binary tree) or '
+        'ndjson (one JSON event per line)')
 
     args = parser.parse_args(args)
+    options = {
+        'engine': args.engine,
+        'skeleton': args.skeleton,
+        'max_depth': args.max_depth,
+        'lines': args.lines,
+        'select': args.select,
+        }
+    if args.engine == 'token' and (args.skeleton or
+                                   args.max_depth is not None or
+                                   args.lines or args.select):
+        parser.error('--skeleton, --max-depth, --lines and --select '
+                     'require --engine pos')
+    if args.check and (args.lines or args.select):
+        parser.error('--check converts the whole module')
+    if args.archive and not args.reverse:
+        parser.error('--archive requires --reverse')
+    if args.jobs is not None and (
+            args.engine == 'token' or args.format != 'xml' or
+            args.positions or args.lines or args.select):
+        parser.error('--jobs only supports XML output of the whole module '
+                     'with --engine pos, without --positions')
 
     # DIFF
     if args.check:
         original = open(args.py_file).read()
-        roundtriped = xml2py(fromstring=py2xml(args.py_file))
+        roundtriped = xml2py(fromstring=py2xml(args.py_file, **options))
         diff = difflib.unified_diff(
             original.splitlines(),
             roundtriped.splitlines(),
@@ -1458,11 +1747,53 @@ def main(args=None):
 
     # XML -> PY
     elif args.reverse:
-        sys.stdout.buffer.write(xml2py(args.py_file).encode('utf8'))
+        if args.archive:
+            from .py2xml_archive import ArchiveReader
+            with ArchiveReader(args.archive) as archive:
+                source = archive.xml2py(args.py_file)
+        else:
+            source = xml2py(args.py_file)
+        sys.stdout.buffer.write(source.encode('utf8'))
+
+    # PY -> BIN
+    elif args.format == 'bin':
+        data = py2bin(args.py_file, positions=args.positions, **options)
+        sys.stdout.buffer.write(data)
+
+    # PY -> NDJSON
+    elif args.format == 'ndjson':
+        write = sys.stdout.buffer.write
+        for event, value, attrs in iter_events(args.py_file, **options):
+            line = [event, value, attrs] if attrs is not None \
+                   else [event, value]
+            write(json.dumps(line, ensure_ascii=False).encode('utf8'))
+            write(b'\n')
+
+    # PY -> XML (multiprocess)
+    elif args.jobs is not None:
+        from .py2xml_parallel import parallel_py2xml
+        if args.py_file:
+            with open(args.py_file, 'rb') as fp:
+                source = _decode_source(fp.read())
+        else:
+            source = _decode_source(sys.stdin.buffer.read())
+        xml = parallel_py2xml(source, args.py_file or '<stdin>',
+                              args.jobs or None,
+                              skeleton=args.skeleton,
+                              max_depth=args.max_depth).encode('utf8')
+        if args.index:
+            with open(args.index, 'wb') as fp:
+                write_index(build_index(xml), fp)
+        sys.stdout.buffer.write(xml)
 
     # PY -> XML
     else:
-        sys.stdout.buffer.write(py2xml(args.py_file).encode('utf8'))
+        xml = py2xml(args.py_file, positions=args.positions,
+                     **options).encode('utf8')
+        if args.index:
+            with open(args.index, 'wb') as fp:
+                write_index(build_index(xml), fp)
+        sys.stdout.buffer.write(xml)
 
 
 if __name__ == "__main__": # pragma: no cover
@@ -0,0 +1,196 @@
+"""store py2xml output of many modules in a single archive
+
+Supported archives (by file extension): `.zip`, `.tar`, `.tar.gz`,
+`.tgz`, `.tar.bz2`, `.tar.xz`.
+
+The archive contains one member per module and a `MANIFEST.json`
+(last member). Batch output directories also contain a `MANIFEST.json`
+(without `offset`)::
+
+    {"version": 1,
+     "members": [{"source": "pkg/mod.py", "sha256": "...",
+                  "member": "pkg/mod.py.xml", "offset": 512,
+                  "size": 1234}, ...]}
+
+`offset` is the position of the member in the archive: the local
+file header for zip, the member data for tar (in the uncompressed
+stream). For an uncompressed tar the data is read directly from
+the offset.
+"""
+
+import io
+import os
+import json
+import time
+import tarfile
+import zipfile
+
+
+MANIFEST = 'MANIFEST.json'
+VERSION = 1
+
+TAR_MODES = (
+    ('.tar', ''),
+    ('.tar.gz', 'gz'),
+    ('.tgz', 'gz'),
+    ('.tar.bz2', 'bz2'),
+    ('.tar.xz', 'xz'),
+    )
+
+
+def archive_type(path):
+    """:return: `zip`, `tar`, `tar:gz`... or None if not an archive"""
+    if path.endswith('.zip'):
+        return 'zip'
+    for ext, compression in TAR_MODES:
+        if path.endswith(ext):
+            return 'tar:' + compression if compression else 'tar'
+    return None
+
+
+
+def load_manifest(path):
+    """manifest of an archive or output directory (if any)
+    :return: dict source -> manifest entry
+    """
+    if archive_type(path):
+        if not os.path.exists(path):
+            return {}
+        with ArchiveReader(path) as reader:
+            return reader.members
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'rb') as fp:
+        manifest = json.loads(fp.read().decode('utf8'))
+    return {entry['source']: entry for entry in manifest['members']}
+
+def write_manifest(out_dir, members):
+    """write manifest of an output directory
+    :param members: list of manifest entries
+    """
+    manifest = {'version': VERSION, 'members': members}
+    with open(os.path.join(out_dir, MANIFEST), 'wb') as fp:
+        fp.write(json.dumps(manifest, indent=1).encode('utf8'))
+
+
+
+class ArchiveWriter:
+    """write modules output and manifest into an archive"""
+
+    def __init__(self, path, zip_compression=zipfile.ZIP_DEFLATED):
+        self.kind = archive_type(path)
+        if self.kind is None:
+            raise ValueError('Unsupported archive type: {}'.format(path))
+        self.members = []
+        if self.kind == 'zip':
+            self.archive = zipfile.ZipFile(path, 'w', zip_compression)
+        else:
+            self.archive = tarfile.open(path, 'w' + self.kind[3:])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _write(self, member, data):
+        """:return: offset of member in the archive"""
+        if self.kind == 'zip':
+            info = zipfile.ZipInfo(member, time.localtime()[:6])
+            info.compress_type = self.archive.compression
+            self.archive.writestr(info, data)
+            return info.header_offset
+        info = tarfile.TarInfo(member)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.archive.addfile(info, io.BytesIO(data))
+        # data is padded to a multiple of the block size
+        blocks = -(-info.size // tarfile.BLOCKSIZE)
+        return self.archive.offset - blocks * tarfile.BLOCKSIZE
+
+    def add(self, source, member, data, digest):
+        """add module output
+        :param source: (str) path of the python module
+        :param member: (str) name of member in the archive
+        :param data: (bytes-like) content
+        :param digest: (str) SHA-256 of the python module
+        """
+        offset = self._write(member, data)
+        self.members.append({'source': source, 'sha256': digest,
+                             'member': member, 'offset': offset,
+                             'size': len(data)})
+
+    def close(self):
+        manifest = {'version': VERSION, 'members': self.members}
+        self._write(MANIFEST, json.dumps(manifest, indent=1).encode('utf8'))
+        self.archive.close()
+
+
+
+class ArchiveReader:
+    """read single modules output from an archive without extracting it"""
+
+    def __init__(self, path):
+        self.path = path
+        self.kind = archive_type(path)
+        if self.kind == 'zip':
+            self.archive = zipfile.ZipFile(path)
+            manifest = self.archive.read(MANIFEST)
+        elif self.kind is not None:
+            self.archive = tarfile.open(path, 'r' + self.kind[3:])
+            manifest = self.archive.extractfile(MANIFEST).read()
+        else:
+            raise ValueError('Unsupported archive type: {}'.format(path))
+        manifest = json.loads(manifest.decode('utf8'))
+        # dict source -> manifest entry
+        self.members = {entry['source']: entry
+                        for entry in manifest['members']}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.archive.close()
+
+    def read(self, source):
+        """:return: (bytes) converted output of module `source`"""
+        entry = self.members.get(source)
+        if entry is None:
+            raise KeyError('Module not in archive: {}'.format(source))
+        if self.kind == 'zip':
+            return self.archive.read(entry['member'])
+        if self.kind == 'tar':
+            fileobj = self.archive.fileobj
+            fileobj.seek(entry['offset'])
+            return fileobj.read(entry['size'])
+        return self.archive.extractfile(entry['member']).read()
+
+    def xml2py(self, source):
+        """:return: (str) python source of module `source`"""
+        from .py2xml import xml2py
+        return xml2py(fromstring=self.read(source))
+
+
+
+def batch2archive(files, archive_path, root=None, workers=None, fmt='xml',
+                  **options):
+    """convert python modules in a process pool into an archive
+
+    Members are added in the same order as `files`.
+    :return: list of `BatchResult` with errors
+    """
+    from .py2xml_batch import iter_batch, source_name, EXTENSIONS
+    errors = []
+    with ArchiveWriter(archive_path) as writer:
+        for result, data in iter_batch(files, None, root, workers, fmt,
+                                       **options):
+            if result.error:
+                errors.append(result)
+                continue
+            source = source_name(result.path, root).replace(os.sep, '/')
+            writer.add(source, source + EXTENSIONS[fmt], data, result.digest)
+    return errors
@@ -0,0 +1,281 @@
+"""convert many python modules using a process pool
+
+Workers do not send the converted data back to the parent process,
+only a small `BatchResult` descriptor. The data is either:
+
+ - written by the worker directly to the output file (`out_dir`)
+ - written to a `multiprocessing.shared_memory` segment (python3.8+),
+   the parent reads it in order (i.e. to write an archive) without
+   copying and then releases the segment.
+"""
+
+import os
+import sys
+import hashlib
+import secrets
+import argparse
+import functools
+import multiprocessing
+from collections import namedtuple
+
+from .py2xml_archive import (
+    archive_type, batch2archive, load_manifest, write_manifest)
+
+try:
+    from multiprocessing import shared_memory
+except ImportError: # pragma: no cover
+    shared_memory = None
+
+
+# path: source file
+# output: output file path or name of shared memory segment
+# size: size in bytes of output
+# error: (str) error message, `None` on success
+# digest: SHA-256 (hex) of source file
+BatchResult = namedtuple('BatchResult', 'path output size error digest')
+
+EXTENSIONS = {'xml': '.xml', 'bin': '.bin'}
+
+
+def source_name(path, root=None):
+    """name of module used for output, `path` relative to `root`
+    :raise ValueError: if `path` is outside of `root`
+    """
+    rel_path = os.path.relpath(path, root) if root else path
+    name = os.path.normpath(rel_path.lstrip(os.sep))
+    if name == os.pardir or name.startswith(os.pardir + os.sep):
+        raise ValueError('{} is outside of {}'.format(
+            path, root or 'current directory'))
+    return name
+
+def output_path(path, out_dir, root=None, fmt='xml'):
+    """path of output file for source `path`, relative to `root`
+    :raise ValueError: if output is not inside `out_dir`
+    """
+    out_path = os.path.join(out_dir, source_name(path, root) +
+                            EXTENSIONS[fmt])
+    real_dir = os.path.realpath(out_dir)
+    if not os.path.realpath(out_path).startswith(real_dir + os.sep):
+        raise ValueError('output of {} is outside of {}'.format(
+            path, out_dir))
+    return out_path
+
+
+def convert_file(path, fmt='xml', **options):
+    """:return: (bytes) converted module"""
+    from .py2xml import py2xml, py2bin
+    if fmt == 'bin':
+        return py2bin(path, **options)
+    return py2xml(path, **options).encode('utf8')
+
+
+def _shm_create(name, size):
+    """create shared memory segment not tracked by the worker process,
+    the parent process is responsible to unlink it.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create=True, size=size,
+                                          track=False)
+    from multiprocessing import resource_tracker
+    shm = shared_memory.SharedMemory(name, create=True, size=size)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+def _shm_unlink(name):
+    """unlink shared memory segment if it exists"""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _worker(job, fmt, options):
+    """convert a single file, executed in a worker process
+    :param job: 3-tuple (path, output path, name of shared memory
+        segment), either output path or segment name is None
+    """
+    path, out_path, shm_name = job
+    try:
+        with open(path, 'rb') as fp:
+            digest = hashlib.sha256(fp.read()).hexdigest()
+        data = convert_file(path, fmt, **options)
+    except Exception as exception:
+        return BatchResult(path, None, 0, '{}: {}'.format(
+            exception.__class__.__name__, exception), None)
+
+    if out_path:
+        out_dir = os.path.dirname(out_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(out_path, 'wb') as fp:
+            fp.write(data)
+        return BatchResult(path, out_path, len(data), None, digest)
+
+    # segments can not be empty
+    shm = _shm_create(shm_name, max(len(data), 1))
+    shm.buf[:len(data)] = data
+    shm.close()
+    return BatchResult(path, shm.name, len(data), None, digest)
+
+
+def iter_batch(files, out_dir=None, root=None, workers=None, fmt='xml',
+               **options):
+    """convert python modules in a process pool
+
+    :param files: list of paths to python modules
+    :param out_dir: (str) directory where output files are written.
+        If not specified output is transferred using shared memory.
+    :param root: (str) output paths are relative to `root`
+    :param workers: (int) number of processes, default CPU count
+    :param fmt: (str) `xml` or `bin`
+    :param options: see `py2xml.iter_module`
+    :return: iterator of 2-tuple (BatchResult, data) in the same order
+        as `files`. `data` is a memoryview of the output when using
+        shared memory (valid until next item is taken), otherwise None.
+    """
+    if out_dir is None and shared_memory is None: # pragma: no cover
+        raise ValueError('shared memory transfer requires python3.8+')
+    if out_dir:
+        jobs = [(path, output_path(path, out_dir, root, fmt), None)
+                for path in files]
+    else:
+        # segment names are known by the parent, so segments of
+        # results not received can be released
+        prefix = 'pyreg_{}_'.format(secrets.token_hex(4))
+        jobs = [(path, None, prefix + str(index))
+                for index, path in enumerate(files)]
+    worker = functools.partial(_worker, fmt=fmt, options=options)
+    received = 0
+    with multiprocessing.Pool(workers) as pool:
+        try:
+            for result in pool.imap(worker, jobs):
+                received += 1
+                if out_dir or result.error:
+                    yield result, None
+                    continue
+                shm = shared_memory.SharedMemory(name=result.output)
+                data = shm.buf[:result.size]
+                try:
+                    yield result, data
+                finally:
+                    data.release()
+                    shm.close()
+                    shm.unlink()
+        finally:
+            # iteration stopped early: do not wait for remaining jobs,
+            # release segments not consumed (or partially created)
+            pool.terminate()
+            if out_dir is None:
+                for _, _, name in jobs[received:]:
+                    _shm_unlink(name)
+
+
+def batch2dir(files, out_dir, root=None, workers=None, fmt='xml',
+              **options):
+    """convert python modules in a process pool into `out_dir`
+
+    The manifest of `out_dir` is updated with converted modules.
+    :return: list of `BatchResult` with errors
+    """
+    manifest = load_manifest(out_dir)
+    errors = []
+    for result, _ in iter_batch(files, out_dir, root, workers, fmt,
+                                **options):
+        if result.error:
+            errors.append(result)
+            continue
+        source = source_name(result.path, root).replace(os.sep, '/')
+        manifest[source] = {
+            'source': source, 'sha256': result.digest,
+            'member': source + EXTENSIONS[fmt], 'size': result.size}
+    os.makedirs(out_dir, exist_ok=True)
+    write_manifest(out_dir, list(manifest.values()))
+    return errors
+
+
+def find_modules(paths):
+    """:return: list of python modules in paths (files or directories)"""
+    modules = []
+    for path in paths:
+        if not os.path.isdir(path):
+            modules.append(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            modules.extend(os.path.join(dirpath, name)
+                           for name in sorted(filenames)
+                           if name.endswith('.py'))
+    return modules
+
+
+
+def main(args=None):
+    """command line program to convert many modules"""
+    description = """convert python modules to XML in parallel"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        'paths', metavar='PATH', nargs='*', default=['.'],
+        help='python modules or directories (git repository with --git). '
+        'Default: current directory')
+    parser.add_argument(
+        '-o', '--out-dir', dest='out_dir', required=True,
+        help='output directory or archive file '
+        '(.zip, .tar, .tar.gz, .tgz, .tar.bz2, .tar.xz)')
+    parser.add_argument(
+        '-j', '--jobs', dest='jobs', metavar='N', type=int, default=None,
+        help='number of processes. Default: CPU count')
+    parser.add_argument(
+        '--root', dest='root', default=None,
+        help='output paths are relative to ROOT')
+    parser.add_argument(
+        '--format', dest='format', choices=('xml', 'bin'), default='xml',
+        help='output format')
+    parser.add_argument(
+        '--engine', dest='engine', choices=('token', 'pos'), default=None,
+        help='conversion engine, see py2xml')
+    parser.add_argument(
+        '--git', dest='git', metavar='REVS', default=None,
+        help='only convert modules changed in git repository PATH '
+        'and delete output of removed modules. REVS is BASE (compared '
+        'with working tree) or BASE..HEAD. Output paths are relative '
+        'to the repository root')
+    args = parser.parse_args(args)
+
+    if args.git:
+        from .py2xml_git import incremental
+        if len(args.paths) != 1:
+            parser.error('--git takes a single repository PATH')
+        summary = incremental(args.out_dir, args.git, args.paths[0],
+                              args.jobs, args.format, engine=args.engine)
+        for key in ('converted', 'skipped', 'removed'):
+            for source in summary[key]:
+                print('{} {}'.format(key, source))
+        errors = summary['errors']
+        for result in errors:
+            print('{}: {}'.format(result.path, result.error), file=sys.stderr)
+        sys.exit(1 if errors else 0)
+
+    files = find_modules(args.paths)
+    try:
+        for path in files:
+            if archive_type(args.out_dir):
+                source_name(path, args.root)
+            else:
+                output_path(path, args.out_dir, args.root, args.format)
+    except ValueError as exception:
+        parser.error(str(exception))
+    if archive_type(args.out_dir):
+        errors = batch2archive(files, args.out_dir, args.root, args.jobs,
+                               args.format, engine=args.engine)
+    else:
+        errors = batch2dir(files, args.out_dir, args.root, args.jobs,
+                           args.format, engine=args.engine)
+    for result in errors:
+        print('{}: {}'.format(result.path, result.error), file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__": # pragma: no cover
+    main()
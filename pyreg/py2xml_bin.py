@@ -0,0 +1,203 @@
+"""compact binary serialization of py2xml tree
+
+The file contains (all integers little-endian):
+
+ - header: magic, version, number of: strings, nodes, attributes.
+   Size of strings and text blobs. Type codes of the node columns.
+ - strings: tag names, attribute names and values (UTF-8),
+   `\\0` separated. Each string is stored only once.
+ - nodes in pre-order (document order), stored as columns
+   of the smallest integer type that fits its values:
+    - tag: string id of tag name, `TEXT` (max value) for text nodes
+    - parent: node index of parent + 1, 0 for the root
+    - count: number of children for elements, size in bytes for texts
+    - attr: number of attributes of the node
+ - attributes: 2 string ids (name, value) per attribute
+ - text: UTF-8 text of all text nodes (in document order)
+
+Since text nodes are in document order the text blob is exactly the
+python source code.
+"""
+
+import sys
+import struct
+from array import array
+import xml.etree.ElementTree as ET
+
+
+MAGIC = b'PYXB'
+VERSION = 1
+# magic, version, strings, nodes, attributes, strings size, text size,
+# type code of columns: tag, parent, count, attr, attribute
+HEADER = struct.Struct('<4sHIIIII5s')
+TYPECODES = 'BHI'
+
+
+def _typecode(values):
+    """smallest unsigned array type code for given values"""
+    top = max(values, default=0)
+    for code in TYPECODES:
+        if top < 256 ** array(code).itemsize:
+            return code
+    return 'L' # pragma: no cover
+
+def _to_bytes(values):
+    arr = array(_typecode(values), values)
+    if sys.byteorder == 'big': # pragma: no cover
+        arr.byteswap()
+    return arr.typecode, arr.tobytes()
+
+def _from_bytes(typecode, data, start, count):
+    arr = array(typecode)
+    end = start + count * arr.itemsize
+    arr.frombytes(data[start:end])
+    if sys.byteorder == 'big': # pragma: no cover
+        arr.byteswap()
+    return arr, end
+
+
+
+def dom2bin(root):
+    """serialize a DOM tree
+    :return: bytes
+    """
+    strings = {}
+    def intern(string):
+        sid = strings.get(string)
+        if sid is None:
+            sid = strings[string] = len(strings)
+        return sid
+
+    tags = []
+    parents = []
+    counts = []
+    attr_counts = []
+    attrs = []
+    texts = []
+
+    # 2-tuple (node, parent index + 1)
+    stack = [(root, 0)]
+    while stack:
+        node, parent = stack.pop()
+        parents.append(parent)
+        if node.nodeType == node.TEXT_NODE:
+            text = node.data.encode('utf-8')
+            texts.append(text)
+            tags.append(None)
+            counts.append(len(text))
+            attr_counts.append(0)
+            continue
+        tags.append(intern(node.tagName))
+        node_attrs = node.attributes.items()
+        for name, value in node_attrs:
+            attrs.append(intern(name))
+            attrs.append(intern(value))
+        attr_counts.append(len(node_attrs))
+        children = node.childNodes
+        counts.append(len(children))
+        index = len(tags)
+        for child in reversed(children):
+            stack.append((child, index))
+    # text nodes use the max value of tag column
+    text_id = len(strings)
+    tags = [text_id if tag is None else tag for tag in tags]
+
+    columns = [_to_bytes(col) for col in
+               (tags, parents, counts, attr_counts, attrs)]
+    typecodes = ''.join(code for code, _ in columns).encode('ascii')
+    string_blob = b'\0'.join(s.encode('utf-8') for s in strings)
+    text_blob = b''.join(texts)
+    header = HEADER.pack(MAGIC, VERSION, len(strings), len(tags),
+                         len(attrs) // 2, len(string_blob), len(text_blob),
+                         typecodes)
+    return b''.join([header, string_blob] +
+                    [data for _, data in columns] + [text_blob])
+
+
+
+class BinTree:
+    """read a tree serialized by `dom2bin`"""
+
+    def __init__(self, data):
+        (magic, version, n_strings, n_nodes, n_attrs, strings_size,
+         text_size, typecodes) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a py2xml binary file')
+        typecodes = typecodes.decode('ascii')
+        pos = HEADER.size
+        strings = bytes(data[pos:pos+strings_size]).decode('utf-8')
+        self.strings = strings.split('\0') if n_strings else []
+        pos += strings_size
+        self.tags, pos = _from_bytes(typecodes[0], data, pos, n_nodes)
+        self.parents, pos = _from_bytes(typecodes[1], data, pos, n_nodes)
+        self.counts, pos = _from_bytes(typecodes[2], data, pos, n_nodes)
+        self.attr_counts, pos = _from_bytes(typecodes[3], data, pos, n_nodes)
+        self.attrs, pos = _from_bytes(typecodes[4], data, pos, n_attrs * 2)
+        self.text = bytes(data[pos:pos+text_size])
+        if len(self.text) != text_size:
+            raise ValueError('Truncated py2xml binary file')
+
+    def source(self):
+        """:return: (str) python source, concatenation of all text"""
+        return self.text.decode('utf-8')
+
+    def iter_events(self):
+        """yield events for a pre-order traversal of the tree:
+
+          - ('start', tag, attributes dict)
+          - ('text', text, None)
+          - ('end', tag, None)
+        """
+        strings = self.strings
+        text_id = len(strings)
+        counts = self.counts
+        attr_counts = self.attr_counts
+        attr_names = [strings[sid] for sid in self.attrs[::2]]
+        attr_values = [strings[sid] for sid in self.attrs[1::2]]
+        text = self.text
+        text_pos = 0
+        attr_pos = 0
+        # elements with 2-items list [tag, remaining children]
+        stack = []
+        for index, tag_id in enumerate(self.tags):
+            if tag_id == text_id:
+                size = counts[index]
+                yield ('text', text[text_pos:text_pos+size].decode('utf-8'),
+                       None)
+                text_pos += size
+            else:
+                tag = strings[tag_id]
+                attr_end = attr_pos + attr_counts[index]
+                attrs = dict(zip(attr_names[attr_pos:attr_end],
+                                 attr_values[attr_pos:attr_end]))
+                attr_pos = attr_end
+                yield ('start', tag, attrs)
+                # +1 as the element itself is decremented bellow
+                stack.append([tag, counts[index] + 1])
+            # close elements with no more children
+            while stack:
+                stack[-1][1] -= 1
+                if stack[-1][1]:
+                    break
+                yield ('end', stack.pop()[0], None)
+
+    def to_etree(self):
+        """:return: root `xml.etree.ElementTree.Element`"""
+        builder = ET.TreeBuilder()
+        for event, value, attrs in self.iter_events():
+            if event == 'text':
+                builder.data(value)
+            elif event == 'start':
+                builder.start(value, attrs)
+            else:
+                builder.end(value)
+        return builder.close()
+
+
+def bin2etree(data):
+    """rebuild tree from binary data"""
+    return BinTree(data).to_etree()
+
+def bin2py(data):
+    """python source code from binary data"""
+    return BinTree(data).source()
@@ -0,0 +1,126 @@
+"""lossless concrete syntax tree (CST) as python objects
+
+A lighter alternative to DOM for py2xml, nodes are created directly
+by the converters (see `py2xml.py2cst`).
+
+Text is stored like in ElementTree:
+ - `text`: text before the first child
+ - `tail`: text after the end of the node (before its next sibling)
+"""
+
+
+class CstNode:
+    """node with tag, attributes and children
+
+    Implements the subset of the DOM API used by py2xml converters.
+    """
+    __slots__ = ('tag', 'attrs', 'children', 'text', 'tail', 'parent')
+
+    def __init__(self, tag, attrs=None, text='', tail=''):
+        self.tag = tag
+        self.attrs = attrs # dict or None
+        self.children = []
+        self.text = text
+        self.tail = tail
+        self.parent = None # only set by `link_parents()`
+
+    def __repr__(self):
+        return '<CstNode {}>'.format(self.tag)
+
+    def get(self, name, default=None):
+        """get attribute value"""
+        if self.attrs is None:
+            return default
+        return self.attrs.get(name, default)
+
+    # DOM-like API used by converters
+    def setAttribute(self, name, value):
+        if self.attrs is None:
+            self.attrs = {}
+        self.attrs[name] = value
+
+    def appendChild(self, child):
+        self.children.append(child)
+        return child
+
+    def add_text(self, text):
+        """append text after last child"""
+        if self.children:
+            self.children[-1].tail += text
+        else:
+            self.text += text
+
+
+    def iter(self, tag=None):
+        """pre-order iteration over this node and all its descendants"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if tag is None or node.tag == tag:
+                yield node
+            stack.extend(reversed(node.children))
+
+    def find(self, tag):
+        """:return: first descendant node with given tag or None"""
+        for node in self.iter(tag):
+            if node is not self:
+                return node
+        return None
+
+    def findall(self, tag):
+        """:return: list of all descendant nodes with given tag"""
+        return [node for node in self.iter(tag) if node is not self]
+
+    def link_parents(self):
+        """set `parent` of all descendants"""
+        for node in self.iter():
+            for child in node.children:
+                child.parent = node
+        return self
+
+
+    def to_source(self):
+        """:return: (str) source code (text of node and descendants)"""
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is str:
+                parts.append(node)
+                continue
+            parts.append(node.text)
+            if node is not self:
+                stack.append(node.tail)
+            stack.extend(reversed(node.children))
+        return ''.join(parts)
+
+    def to_xml(self):
+        """:return: (str) XML same as `py2xml`"""
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is str:
+                parts.append(node)
+                continue
+            parts.append('<' + node.tag)
+            if node.attrs:
+                for name, value in node.attrs.items():
+                    parts.append(' {}="{}"'.format(name, _escape_attr(value)))
+            if node is not self and node.tail:
+                stack.append(_escape(node.tail))
+            if node.text or node.children:
+                parts.append('>' + _escape(node.text))
+                stack.append('</{}>'.format(node.tag))
+                stack.extend(reversed(node.children))
+            else:
+                parts.append('/>')
+        return ''.join(parts)
+
+
+def _escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;"). \
+        replace(">", "&gt;")
+
+def _escape_attr(text):
+    return _escape(text).replace('"', "&quot;")
@@ -0,0 +1,173 @@
+"""incremental batch conversion of modules changed in a git repository
+
+Only added/modified modules are converted, outputs of removed modules
+are deleted. Other outputs in the directory/archive are kept.
+Modules with the same hash as in the output manifest are not converted
+again, so running it twice is harmless.
+If a module fails to convert its previous output (and manifest entry)
+is kept, the module is converted again on the next run.
+
+Revisions:
+
+ - `BASE`: changes from `BASE` to the working tree
+   (including not committed and untracked files)
+ - `BASE..HEAD`: changes between 2 revisions, modules are converted
+   from their content on `HEAD`
+"""
+
+import os
+import hashlib
+import tempfile
+import subprocess
+
+from .py2xml_archive import (
+    archive_type, load_manifest, write_manifest,
+    ArchiveReader, ArchiveWriter)
+from .py2xml_batch import iter_batch, batch2dir, EXTENSIONS
+
+
+def git(args, cwd):
+    """:return: (str) output of git command"""
+    output = subprocess.check_output(['git'] + args, cwd=cwd)
+    return output.decode('utf-8')
+
+
+def parse_revisions(revisions):
+    """:return: 2-tuple (base, head), head is None for working tree"""
+    if '..' in revisions:
+        base, head = revisions.split('..', 1)
+        return base or 'HEAD', head or 'HEAD'
+    return revisions, None
+
+
+def git_changes(base, head=None, cwd='.'):
+    """python modules changed between 2 revisions (or working tree)
+
+    :return: 2-tuple of lists with paths relative to the repository
+        root: (added or modified, removed)
+    """
+    cmd = ['diff', '--no-renames', '--name-status', '-z', base]
+    if head:
+        cmd.append(head)
+    changed = []
+    removed = []
+    # NUL separated: status, path, status, path...
+    items = git(cmd + ['--', '*.py'], cwd).split('\0')[:-1]
+    for status, path in zip(items[::2], items[1::2]):
+        if status == 'D':
+            removed.append(path)
+        else:
+            changed.append(path)
+    if head is None:
+        untracked = ['ls-files', '--others', '--exclude-standard', '-z',
+                     '--', '*.py']
+        changed.extend(git(untracked, cwd).split('\0')[:-1])
+    return sorted(changed), sorted(removed)
+
+
+def _export(paths, revision, cwd, dest):
+    """write content of paths on revision into `dest` directory"""
+    for path in paths:
+        content = subprocess.check_output(
+            ['git', 'show', '{}:{}'.format(revision, path)], cwd=cwd)
+        dest_path = os.path.join(dest, path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        with open(dest_path, 'wb') as fp:
+            fp.write(content)
+
+
+def _file_digest(path):
+    with open(path, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+
+def _update_dir(out_dir, files, src_root, removed, fmt, workers, options):
+    for source in removed:
+        path = os.path.join(out_dir, source + EXTENSIONS[fmt])
+        if os.path.exists(path):
+            os.remove(path)
+    errors = batch2dir(files, out_dir, src_root, workers, fmt, **options)
+    if removed:
+        manifest = load_manifest(out_dir)
+        write_manifest(out_dir, [entry for source, entry in manifest.items()
+                                 if source not in removed])
+    return errors
+
+
+def _update_archive(archive, files, src_root, removed, fmt, workers,
+                    options):
+    """create a new archive with unchanged members from the old one"""
+    manifest = load_manifest(archive)
+    # members of modules that failed to convert are kept
+    replaced = set(removed)
+    errors = []
+    head, tail = os.path.split(archive)
+    tmp_archive = os.path.join(head, '.tmp-' + tail)
+    with ArchiveWriter(tmp_archive) as writer:
+        for result, data in iter_batch(files, None, src_root, workers, fmt,
+                                       **options):
+            if result.error:
+                errors.append(result)
+                continue
+            source = os.path.relpath(result.path, src_root)
+            source = source.replace(os.sep, '/')
+            writer.add(source, source + EXTENSIONS[fmt], data, result.digest)
+            replaced.add(source)
+        if manifest:
+            with ArchiveReader(archive) as reader:
+                for source, entry in manifest.items():
+                    if source not in replaced:
+                        writer.add(source, entry['member'],
+                                   reader.read(source), entry['sha256'])
+    os.replace(tmp_archive, archive)
+    return errors
+
+
+def incremental(out, revisions, repo='.', workers=None, fmt='xml',
+                **options):
+    """update output directory/archive `out` with modules changed
+    in the git repository.
+
+    :param revisions: (str) `BASE` or `BASE..HEAD`
+    :return: dict with lists: `converted` and `skipped` (source paths),
+        `removed` and `errors` (BatchResult)
+    """
+    root = git(['rev-parse', '--show-toplevel'], repo).strip()
+    base, head = parse_revisions(revisions)
+    changed, removed = git_changes(base, head, root)
+    manifest = load_manifest(out)
+    removed = [source for source in removed if source in manifest]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src_root = root
+        if head:
+            _export(changed, head, root, tmp_dir)
+            src_root = tmp_dir
+
+        files = []
+        skipped = []
+        for source in changed:
+            path = os.path.join(src_root, source)
+            entry = manifest.get(source)
+            if entry and entry['sha256'] == _file_digest(path):
+                skipped.append(source)
+            else:
+                files.append(path)
+
+        if not files and not removed:
+            errors = []
+        elif archive_type(out):
+            errors = _update_archive(out, files, src_root, removed, fmt,
+                                     workers, options)
+        else:
+            errors = _update_dir(out, files, src_root, removed, fmt,
+                                 workers, options)
+
+    failed = set(result.path for result in errors)
+    return {
+        'converted': [os.path.relpath(path, src_root).replace(os.sep, '/')
+                      for path in files if path not in failed],
+        'skipped': skipped,
+        'removed': removed,
+        'errors': errors,
+        }
@@ -0,0 +1,133 @@
+"""node positions for py2xml output
+
+Elements are identified by their ordinal, the position of the
+element in document order (pre-order), the root `Module` is 0.
+
+Positions are byte offsets:
+ - source offsets are on the UTF-8 encoded source (as written by xml2py)
+ - XML offsets are on the UTF-8 encoded XML, `end` is just after the
+   element closing tag
+
+The sidecar index is a binary file with fixed size records so
+a node position can be read without parsing the XML, i.e.::
+
+    index = NodeIndex.load('module.py.xml.idx')
+    src_start, src_end, xml_start, xml_end = index[42]
+"""
+
+import os
+import re
+import mmap
+import struct
+
+
+MAGIC = b'PYXI'
+VERSION = 1
+# magic, version, number of records
+HEADER = struct.Struct('<4sHI')
+# source start, source end, XML start, XML end
+RECORD = struct.Struct('<IIII')
+
+TAG_RE = re.compile(rb'<([/?!]?)[^>]*?(/?)>')
+
+
+
+def add_positions(root):
+    """add attributes `start`/`end` (source byte offsets) to all elements
+    of a DOM tree
+    """
+    pos = 0
+    # 2-tuple (node, end_of_element)
+    stack = [(root, False)]
+    while stack:
+        node, closing = stack.pop()
+        if node.nodeType == node.TEXT_NODE:
+            pos += len(node.data.encode('utf-8'))
+        elif closing:
+            node.setAttribute('end', str(pos))
+        else:
+            node.setAttribute('start', str(pos))
+            stack.append((node, True))
+            for child in reversed(node.childNodes):
+                stack.append((child, False))
+
+
+def _text_size(chunk):
+    """size of escaped text content after un-escaping"""
+    if b'&' not in chunk:
+        return len(chunk)
+    return (len(chunk) - 3 * (chunk.count(b'&lt;') + chunk.count(b'&gt;'))
+            - 4 * chunk.count(b'&amp;'))
+
+
+def build_index(xml):
+    """scan py2xml output and get position of all elements
+
+    :param xml: (bytes) UTF-8 encoded XML as produced by py2xml
+    :return: list of 4-tuple (src_start, src_end, xml_start, xml_end)
+             indexed by element ordinal
+    """
+    records = []
+    stack = [] # ordinal of open elements
+    src_pos = 0
+    prev_end = 0
+    for match in TAG_RE.finditer(xml):
+        src_pos += _text_size(xml[prev_end:match.start()])
+        prev_end = match.end()
+        kind, empty = match.groups()
+        if kind == b'/':
+            ordinal = stack.pop()
+            src_start, _, xml_start, _ = records[ordinal]
+            records[ordinal] = (src_start, src_pos, xml_start, match.end())
+        elif not kind:
+            if empty:
+                records.append((src_pos, src_pos, match.start(), match.end()))
+            else:
+                stack.append(len(records))
+                records.append((src_pos, None, match.start(), None))
+    return records
+
+
+def write_index(records, fp):
+    """write index records to a binary file object"""
+    fp.write(HEADER.pack(MAGIC, VERSION, len(records)))
+    for record in records:
+        fp.write(RECORD.pack(*record))
+
+
+
+class NodeIndex:
+    """read access to the index created by `write_index`
+
+    Records are unpacked on access, the data might be a `mmap`.
+    """
+    def __init__(self, data):
+        if len(data) < HEADER.size:
+            raise ValueError('Not a py2xml index file')
+        magic, version, self.size = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a py2xml index file')
+        if len(data) < HEADER.size + self.size * RECORD.size:
+            raise ValueError('Truncated py2xml index file')
+        self.data = data
+
+    @classmethod
+    def load(cls, filename):
+        """memory map an index file"""
+        with open(filename, 'rb') as fp:
+            # mmap can not map an empty file
+            if os.fstat(fp.fileno()).st_size < HEADER.size:
+                raise ValueError('Not a py2xml index file')
+            return cls(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, ordinal):
+        """:return: 4-tuple (src_start, src_end, xml_start, xml_end)"""
+        if ordinal < 0:
+            ordinal += self.size
+        if not 0 <= ordinal < self.size:
+            raise IndexError(ordinal)
+        return RECORD.unpack_from(self.data,
+                                  HEADER.size + ordinal * RECORD.size)
@@ -0,0 +1,108 @@
+"""convert a single (big) module using a process pool
+
+The module is split at top-level statement boundaries into chunks.
+Each chunk is a valid module by itself, so workers just convert
+its source text. The `<Module>` content of the chunks is joined
+in order.
+
+Output is the same as `py2xml.py2xml()` using the `pos` engine.
+"""
+
+import ast
+import time
+import argparse
+import functools
+import multiprocessing
+
+from .py2xml_pos import PosConverter, pos2xml
+
+
+def split_module(source, filename='<str>', chunks=4):
+    """split module at top-level statements in chunks of similar size
+
+    Chunks start at the beginning of a line with a top-level statement
+    and include all text up to the next chunk.
+    :return: list of 2-tuple (start, end) offsets of each chunk
+    """
+    tree = ast.parse(source, filename)
+    converter = PosConverter(source)
+    size = len(source) / chunks
+    starts = [0]
+    for stmt in tree.body[1:]:
+        start = converter.stmt_start(stmt)
+        if start - starts[-1] < size:
+            continue
+        # do not split statements on the same line (`a = 1; b = 2`)
+        if source[start-1] in '\r\n':
+            starts.append(start)
+    return list(zip(starts, starts[1:] + [len(source)]))
+
+
+def _chunk2xml(text, options):
+    """worker: :return: (str) XML content of Module element"""
+    xml = pos2xml(text, **options).toxml()
+    if xml == '<Module/>':
+        return ''
+    return xml[len('<Module>'):-len('</Module>')]
+
+
+def parallel_py2xml(source, filename='<str>', workers=None,
+                    chunks_per_worker=4, **options):
+    """convert python source code to XML using a process pool
+
+    :param workers: (int) number of processes, default CPU count
+    :param chunks_per_worker: (int) number of chunks per process,
+        more chunks give better load balance
+    :param options: see `PosConverter`
+    :return: (str) XML
+    """
+    workers = workers or multiprocessing.cpu_count()
+    chunks = split_module(source, filename, workers * chunks_per_worker)
+    if len(chunks) < 2 or workers == 1:
+        xml = pos2xml(source, filename, **options).toxml()
+        # same as py2xml, empty module is not serialized as <Module/>
+        return '<Module></Module>' if xml == '<Module/>' else xml
+
+    convert = functools.partial(_chunk2xml, options=options)
+    texts = (source[start:end] for start, end in chunks)
+    with multiprocessing.Pool(workers) as pool:
+        parts = pool.imap(convert, texts)
+        return '<Module>' + ''.join(parts) + '</Module>'
+
+
+
+def main(args=None):
+    """benchmark: conversion time by number of workers"""
+    from .py2xml import _decode_source
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('py_file', metavar='MODULE')
+    parser.add_argument(
+        '--max-workers', dest='max_workers', type=int,
+        default=multiprocessing.cpu_count(),
+        help='benchmark from 1 up to N workers (default: CPU count)')
+    parser.add_argument(
+        '--repeat', dest='repeat', type=int, default=3,
+        help='number of runs for each worker count, best is reported')
+    args = parser.parse_args(args)
+
+    with open(args.py_file, 'rb') as fp:
+        source = _decode_source(fp.read())
+    expected = pos2xml(source, args.py_file).toxml()
+    print('lines: {}'.format(source.count('\n')))
+    print('workers   seconds   speedup')
+    base = None
+    for workers in range(1, args.max_workers + 1):
+        best = None
+        for _ in range(args.repeat):
+            begin = time.perf_counter()
+            xml = parallel_py2xml(source, args.py_file, workers)
+            elapsed = time.perf_counter() - begin
+            best = elapsed if best is None else min(best, elapsed)
+        assert xml == expected, 'output differs from serial conversion'
+        base = base or best
+        print('{:7d} {:9.3f} {:8.2f}x'.format(workers, best, base / best))
+
+
+if __name__ == "__main__": # pragma: no cover
+    main()
@@ -0,0 +1,1994 @@
+"""py2xml engine based on AST node positions (python 3.8+)
+
+Since python 3.8 AST nodes have reliable `end_lineno`/`end_col_offset`.
+The converters in this module produce the same XML as `AstNodeX`
+but instead of matching every token from the source they:
+
+ - slice the source of "leaf" nodes (names, numbers, strings)
+   directly from the source using a precomputed line-offset table
+ - tokenize only the text between nodes (operators, commas, keywords...)
+ - determine parenthesis around expressions from node positions
+   instead of guessing (see http://bugs.python.org/issue18374)
+"""
+
+import ast
+import io
+import re
+import collections
+import tokenize as Token
+
+from .py2xml import Element, add_text, pos_byte2str
+
+
+# `start`/`end` are offset in the source string
+Tok = collections.namedtuple('Tok', 'type exact_type string start end')
+NODE = -1 # pseudo token type for nodes sliced from source
+
+SPACE_RE = re.compile(r'(?:[ \t\f]+|\\\r?\n)*')
+NEWLINE_RE = re.compile(r'\r\n|\r|\n')
+NAME_RE = re.compile(r'\w+')
+STRING_START_RE = re.compile(r'(?i:[rbuf]{0,2})[\'"]')
+OP_RE = re.compile('|'.join(
+    re.escape(op) for op in sorted(Token.EXACT_TOKEN_TYPES,
+                                   key=len, reverse=True)))
+# spaces between parts of an implicit concatenated string
+STR_SPACE_RE = re.compile(r'(?:[ \t\f\r\n]+|\\\r?\n|#[^\r\n]*)*')
+STRING_RE = re.compile(r'''(?i:[rbuf]{0,2})(?:
+    \'\'\'(?:[^\\]|\\.)*?\'\'\' | """(?:[^\\]|\\.)*?"""
+    | '(?:[^'\\\r\n]|\\.)*' | "(?:[^"\\\r\n]|\\.)*" )''', re.S | re.X)
+
+# python 3.8 has Index/ExtSlice nodes, later versions use expr directly
+INDEX = getattr(ast, 'Index', ())
+EXT_SLICE = getattr(ast, 'ExtSlice', ())
+FSTRING_START = getattr(Token, 'FSTRING_START', None)
+FSTRING_END = getattr(Token, 'FSTRING_END', None)
+DEFINITION_STMT = (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+
+class SrcBuffer:
+    """python source with a line-offset table and a lazy tokenizer
+
+    Has the same interface as `SrcToken`. The source is tokenized on
+    demand, nodes sliced from the source are skipped (`skip_node`).
+
+    To mimic `tokenize` NEWLINE/NL and INDENT/DEDENT the state
+    (parenthesis depth, line contains code, indent stack)
+    is kept together with each token.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.line_starts = [0]
+        self.line_starts.extend(m.end() for m in NEWLINE_RE.finditer(source))
+        self._col_maps = {}
+        self.current = Tok(Token.ENCODING, Token.ENCODING, '', 0, 0)
+        self.previous = None
+        self._state = (0, False, (0,))
+        # list of 2-tuple (token, state after token)
+        self._ahead = []
+
+    def offset(self, lineno, col_offset):
+        """convert AST position (col_offset in bytes) into string offset"""
+        col_map = self._col_maps.get(lineno)
+        if col_map is None:
+            start = self.line_starts[lineno - 1]
+            if lineno < len(self.line_starts):
+                line = self.source[start:self.line_starts[lineno]]
+            else:
+                line = self.source[start:]
+            if line.isascii():
+                col_map = False
+            else:
+                col_map = pos_byte2str(line) + [len(line)]
+            self._col_maps[lineno] = col_map
+        if col_map:
+            col_offset = col_map[col_offset]
+        return self.line_starts[lineno - 1] + col_offset
+
+    def start(self, node):
+        return self.offset(node.lineno, node.col_offset)
+
+    def end(self, node):
+        return self.offset(node.end_lineno, node.end_col_offset)
+
+
+    def _lex(self, pos, state):
+        """:return: 2-tuple (token starting at or after pos, new state)"""
+        source = self.source
+        depth, has_code, indents = state
+        start = SPACE_RE.match(source, pos).end()
+        if start >= len(source):
+            return Tok(Token.ENDMARKER, Token.ENDMARKER, '', start, start), state
+        char = source[start]
+
+        # INDENT / DEDENT on first token of a logical line
+        if depth == 0 and not has_code and char not in '#\r\n':
+            line_start = max(source.rfind('\n', 0, start),
+                             source.rfind('\r', 0, start)) + 1
+            indent = source[line_start:start]
+            column = len(indent.expandtabs(8))
+            if column > indents[-1]:
+                token = Tok(Token.INDENT, Token.INDENT, indent,
+                            line_start, start)
+                return token, (depth, has_code, indents + (column,))
+            if column < indents[-1]:
+                token = Tok(Token.DEDENT, Token.DEDENT, '', start, start)
+                return token, (depth, has_code, indents[:-1])
+
+        if char == '#':
+            end = NEWLINE_RE.search(source, start)
+            end = end.start() if end else len(source)
+            tok_type = exact_type = Token.COMMENT
+        elif char in '\r\n':
+            end = NEWLINE_RE.match(source, start).end()
+            if depth == 0 and has_code:
+                tok_type = exact_type = Token.NEWLINE
+                has_code = False
+            else:
+                tok_type = exact_type = Token.NL
+        else:
+            has_code = True
+            # strings and numbers are always nodes, they are never
+            # consumed as tokens. just mark where they start.
+            if STRING_START_RE.match(source, start):
+                tok_type = exact_type = Token.STRING
+                end = start + 1
+            elif char.isdigit() or (char == '.' and
+                                    source[start+1:start+2].isdigit()):
+                tok_type = exact_type = Token.NUMBER
+                end = start + 1
+            else:
+                match = NAME_RE.match(source, start)
+                if match:
+                    tok_type = exact_type = Token.NAME
+                    end = match.end()
+                else:
+                    match = OP_RE.match(source, start)
+                    end = match.end() if match else start + 1
+                    tok_type = Token.OP
+                    exact_type = Token.EXACT_TOKEN_TYPES.get(
+                        source[start:end], Token.ERRORTOKEN)
+                    if exact_type in (Token.LPAR, Token.LSQB, Token.LBRACE):
+                        depth += 1
+                    elif exact_type in (Token.RPAR, Token.RSQB,
+                                        Token.RBRACE):
+                        depth -= 1
+        token = Tok(tok_type, exact_type, source[start:end], start, end)
+        return token, (depth, has_code, indents)
+
+
+    def peek(self, index):
+        """look ahead on not consumed tokens"""
+        ahead = self._ahead
+        while len(ahead) <= index:
+            if ahead:
+                last, state = ahead[-1]
+                ahead.append(self._lex(last.end, state))
+            else:
+                ahead.append(self._lex(self.current.end, self._state))
+        return ahead[index][0]
+
+    def next(self):
+        return self.peek(0)
+
+    def pop(self):
+        self.peek(0)
+        token, self._state = self._ahead.pop(0)
+        self.previous = self.current
+        self.current = token
+        return token
+
+    def skip_node(self, start, end):
+        """consume source from start to end
+        :return: (str) source text of skipped node
+        """
+        text = self.source[start:end]
+        self._ahead = []
+        depth, _, indents = self._state
+        self._state = (depth, True, indents)
+        self.previous = self.current
+        self.current = Tok(NODE, NODE, text, start, end)
+        return text
+
+    def seek(self, pos):
+        """move to `pos`, start of a (possibly nested) statement.
+
+        Source before `pos` is not tokenized, the indent stack is
+        set from the indentation of the statement line.
+        """
+        source = self.source
+        line_start = max(source.rfind('\n', 0, pos),
+                         source.rfind('\r', 0, pos)) + 1
+        column = len(source[line_start:pos].expandtabs(8))
+        self._ahead = []
+        self._state = (0, False, (0, column) if column else (0,))
+        self.previous = self.current
+        self.current = Tok(NODE, NODE, '', pos, pos)
+
+    def pop_dotted_name(self):
+        name = self.pop().string
+        while self.next().exact_type == Token.DOT:
+            self.pop()
+            name += '.' + self.pop().string
+        return name
+
+
+    def calc_space(self, from_token, to_token):
+        return self.source[from_token.end:to_token.start]
+
+    def text_prev2next(self):
+        text = self.calc_space(self.previous, self.current)
+        text += self.current.string
+        text += self.calc_space(self.current, self.next())
+        return text
+
+    def prev_space(self):
+        return self.calc_space(self.previous, self.current)
+
+    def space_right(self):
+        return self.calc_space(self.current, self.next())
+
+
+    NON_AST_TOKENS = set([
+        Token.SEMI,
+        Token.NEWLINE, Token.NL,
+        Token.COMMENT,
+        Token.INDENT, Token.DEDENT,
+        ])
+    def write_non_ast_tokens(self, parent_ele, rspace=True):
+        text = ''
+        while self.next().exact_type in self.NON_AST_TOKENS:
+            token = self.pop()
+            text += self.prev_space() + token.string
+        if rspace:
+            text += self.space_right()
+        add_text(parent_ele, text)
+
+    def write_remaining(self, parent_ele):
+        """add all text not consumed yet"""
+        add_text(parent_ele, self.source[self.current.end:])
+
+
+
+def string_parts(source, start, end):
+    """split an implicit concatenated string into its parts
+    :return: list of 2-tuple (start, end) of each part
+    """
+    parts = []
+    pos = start
+    while True:
+        pos = STR_SPACE_RE.match(source, pos).end()
+        if pos >= end:
+            return parts
+        match = STRING_RE.match(source, pos)
+        if not match or match.end() > end:
+            return fstring_parts(source, start, end)
+        parts.append((pos, match.end()))
+        pos = match.end()
+
+
+def fstring_parts(source, start, end):
+    """same as `string_parts` using the tokenizer.
+    Required for f-strings on python 3.12+ that can contain nested quotes.
+    """
+    # put source in parenthesis so INDENT/NEWLINE are not generated
+    text = '(' + source[start:end] + ')'
+    line_starts = [0]
+    line_starts.extend(m.end() for m in NEWLINE_RE.finditer(text))
+    def offset(row_col):
+        return start - 1 + line_starts[row_col[0] - 1] + row_col[1]
+
+    parts = []
+    depth = 0
+    for token in Token.generate_tokens(io.StringIO(text).readline):
+        if token.type == FSTRING_START:
+            if not depth:
+                part_start = offset(token.start)
+            depth += 1
+        elif token.type == FSTRING_END:
+            depth -= 1
+            if not depth:
+                parts.append((part_start, offset(token.end)))
+        elif token.type == Token.STRING and not depth:
+            parts.append((offset(token.start), offset(token.end)))
+    return parts
+
+
+
+class PosConverter:
+    """convert python AST to XML using node positions
+
+    Converters have same name and output as the ones from `AstNodeX`,
+    but receive the python AST node as a parameter.
+    """
+
+    # statements converted in skeleton mode, others are kept as raw text
+    SKELETON_STMT = (ast.Import, ast.ImportFrom, ast.ClassDef,
+                     ast.FunctionDef, ast.AsyncFunctionDef)
+
+    def __init__(self, source, skeleton=False, max_depth=None,
+                 element=Element):
+        """
+        :param skeleton: (bool) only convert imports, classes and
+            functions signatures, other statements and function bodies
+            are added as `raw` elements
+        :param max_depth: (int) nodes nested deeper than this
+            are added as `raw` elements
+        :param element: element factory, `py2xml.Element` (DOM)
+            or `py2xml.CstElement`
+        """
+        self.Element = element
+        self.tokens = SrcBuffer(source)
+        self.skeleton = skeleton
+        self.max_depth = max_depth
+        self.depth = 0 # number of to_xml() calls being executed
+
+    def start(self, node):
+        """start position of node without its own parenthesis"""
+        start = self.tokens.start(node)
+        if isinstance(node, ast.GeneratorExp):
+            # position includes parenthesis, even if shared with a call
+            return start + 1
+        if isinstance(node, ast.Tuple) and self._is_parenthesized(node):
+            return start + 1
+        return start
+
+    def _is_parenthesized(self, node):
+        """check if the tuple source contain its own parenthesis.
+
+        Nodes always contain balanced parenthesis, so only the
+        text between its elements needs to be checked.
+        """
+        tokens = self.tokens
+        start, end = tokens.start(node), tokens.end(node)
+        source = tokens.source
+        if not node.elts or source[start] != '(' or source[end-1] != ')':
+            return False
+        # `(a, b), c` first element contains the parenthesis
+        if tokens.start(node.elts[0]) == start:
+            return False
+        bounds = [start]
+        for elt in node.elts:
+            bounds.append(tokens.start(elt))
+            bounds.append(tokens.end(elt))
+        bounds.append(end)
+        depth = 0
+        for gap_start, gap_end in zip(bounds[::2], bounds[1::2]):
+            pos = gap_start
+            while pos < gap_end:
+                pos = STR_SPACE_RE.match(source, pos).end()
+                if pos >= gap_end:
+                    break
+                char = source[pos]
+                if char == '(':
+                    depth += 1
+                elif char == ')':
+                    depth -= 1
+                    if depth == 0 and pos != end - 1:
+                        return False
+                pos += 1
+        return True
+
+
+    def to_xml(self, node, parent=None):
+        # hack for root node
+        if parent is None:
+            parent = self.Element(node.__class__.__name__)
+        if self.max_depth is not None and self.depth >= self.max_depth:
+            converter = self.c_raw
+        elif self.skeleton and isinstance(node, ast.stmt) and \
+                not isinstance(node, self.SKELETON_STMT):
+            converter = self.c_raw
+        else:
+            converter = getattr(self, 'c_' + node.__class__.__name__,
+                                self.c_generic)
+        self.depth += 1
+        try:
+            return converter(node, parent)
+        except Exception: # pragma: no cover
+            print('Error on {} {}:{}'.format(
+                node.__class__.__name__, getattr(node, 'lineno', ''),
+                getattr(node, 'col_offset', '')))
+            raise
+        finally:
+            self.depth -= 1
+
+
+    def c_generic(self, node, parent):
+        """node type without a specific converter. Just add its text"""
+        if isinstance(node, ast.stmt):
+            self.tokens.write_non_ast_tokens(parent)
+        start, end = self.tokens.start(node), self.tokens.end(node)
+        text = self.tokens.skip_node(start, end)
+        parent.appendChild(self.Element(node.__class__.__name__, text=text))
+
+
+    def stmt_start(self, node):
+        """start of statement including its decorators"""
+        decorators = getattr(node, 'decorator_list', None)
+        if decorators:
+            deco_start = self.tokens.start(decorators[0])
+            return self.tokens.source.rindex('@', 0, deco_start)
+        return self.tokens.start(node)
+
+    def _raw_element(self, start, end, node_name):
+        ele = self.Element('raw', text=self.tokens.skip_node(start, end))
+        ele.setAttribute('node', node_name)
+        return ele
+
+    def c_raw(self, node, parent):
+        """add source of node as text of a `raw` element,
+        node is not converted.
+        """
+        if isinstance(node, ast.stmt):
+            self.tokens.write_non_ast_tokens(parent)
+            parent.appendChild(self._raw_element(
+                self.stmt_start(node), self.tokens.end(node),
+                node.__class__.__name__))
+        else:
+            self._c_raw_expr(node, parent)
+
+    def _c_raw_body(self, parent, nodes):
+        """add a `body` element with all statements as a `raw` element"""
+        ele = self.Element('body')
+        self.tokens.write_non_ast_tokens(ele)
+        ele.appendChild(self._raw_element(
+            self.stmt_start(nodes[0]), self.tokens.end(nodes[-1]), 'body'))
+        parent.appendChild(ele)
+
+
+    ###########################################################
+    # expr
+    ###########################################################
+
+    def expr_wrapper(func):
+        """deals with optional "()" around expressions
+
+        Any LPAR before start of node is a parenthesis around it
+        (parent node already consumed its own tokens).
+        """
+        def _build_expr(self, node, parent):
+            start = self.start(node)
+            lpars = []
+            while True:
+                token = self.tokens.next()
+                if token.exact_type == Token.LPAR and token.start < start:
+                    lpars.append(self.pop_merge_NL())
+                else:
+                    break
+            for lpar_text in lpars:
+                add_text(parent, lpar_text)
+            func(self, node, parent)
+            for _ in lpars:
+                text = self.pop_merge_NL(lspace=True, rspace=False)
+                add_text(parent, text)
+        return _build_expr
+
+
+    @expr_wrapper
+    def _c_raw_expr(self, node, parent):
+        start = self.start(node)
+        end = self.tokens.end(node)
+        if start != self.tokens.start(node):
+            # parenthesis included in node position
+            end -= 1
+        # space after parenthesis was already consumed by expr_wrapper
+        start = max(start, self.tokens.next().start)
+        parent.appendChild(self._raw_element(start, end,
+                                             node.__class__.__name__))
+
+
+    def pop_merge_NL(self, lspace=False, rspace=True, exact_type=None):
+        """pop one token and sorounding NL tokens
+
+        :exact_type (str): only match given token
+        :return: text of NL's and token
+        """
+        text = ''
+        found_token = False
+        include_left = lspace
+        while True:
+            next_token = self.tokens.next()
+            if next_token.exact_type not in (Token.NL, Token.COMMENT):
+                if found_token:
+                    break
+                elif exact_type and exact_type != next_token.exact_type:
+                    return text
+                found_token = True
+            self.tokens.pop()
+            if include_left:
+                text += self.tokens.prev_space()
+            text += next_token.string
+            include_left = True
+        if rspace:
+            text += self.tokens.space_right()
+        return text
+
+    def _c_delimiter(self, ele):
+        """include space right"""
+        delimiters = (Token.COMMA, Token.NL, Token.COMMENT)
+        text = ''
+        while self.tokens.next().exact_type in delimiters:
+            token = self.tokens.pop()
+            text += self.tokens.prev_space() + token.string
+        text += self.tokens.space_right()
+        add_text(ele, text)
+
+    def _leaf(self, node):
+        """consume the node source text"""
+        return self.tokens.skip_node(self.tokens.start(node),
+                                     self.tokens.end(node))
+
+
+    def c_Module(self, node, parent):
+        ele = self.Element('Module')
+        for stmt in node.body:
+            self.to_xml(stmt, ele)
+        return ele
+
+
+    @expr_wrapper
+    def c_Constant(self, node, parent):
+        value = node.value
+        if isinstance(value, (str, bytes)):
+            self._c_string(node, parent,
+                           'Str' if isinstance(value, str) else 'Bytes')
+        elif value is Ellipsis:
+            parent.appendChild(self.Element('Ellipsis', text=self._leaf(node)))
+        elif value is None or isinstance(value, bool):
+            parent.appendChild(self.Element('NameConstant',
+                                       text=self._leaf(node)))
+        else:
+            parent.appendChild(self.Element('Num', text=self._leaf(node)))
+
+    def _c_string(self, node, parent, tag):
+        """strings might be made of several parts (implicit concatenation)
+        """
+        source = self.tokens.source
+        start, end = self.tokens.start(node), self.tokens.end(node)
+        if tag == 'JoinedStr' and FSTRING_START is not None:
+            parts = fstring_parts(source, start, end)
+        else:
+            parts = string_parts(source, start, end)
+        ele = self.Element(tag)
+        prev_end = None
+        for part_start, part_end in parts:
+            if prev_end is not None:
+                add_text(ele, source[prev_end:part_start])
+            ele.appendChild(self.Element(
+                's', text=source[part_start:part_end]))
+            prev_end = part_end
+        self.tokens.skip_node(start, end)
+        parent.appendChild(ele)
+
+    @expr_wrapper
+    def c_JoinedStr(self, node, parent):
+        self._c_string(node, parent, 'JoinedStr')
+
+
+    @expr_wrapper
+    def c_Tuple(self, node, parent):
+        ele = self.Element('Tuple')
+        ele.setAttribute('ctx', node.ctx.__class__.__name__)
+        if node.elts:
+            first = True
+            for item in node.elts:
+                if not first:
+                    add_text(ele, self.tokens.space_right())
+                first = False
+                self.to_xml(item, ele)
+                text = self.pop_merge_NL(lspace=True, exact_type=Token.COMMA,
+                                         rspace=False)
+                add_text(ele, text)
+        else:
+            # special case, empty tuple is represented by an empty `()`
+            assert self.tokens.pop().exact_type == Token.LPAR
+            text = '('
+            while self.tokens.pop().exact_type != Token.RPAR:
+                text += self.tokens.prev_space() + self.tokens.current.string
+            text += self.tokens.prev_space() + ')'
+            add_text(ele, text)
+        parent.appendChild(ele)
+
+
+    @expr_wrapper
+    def c_List(self, node, parent):
+        ele = self.Element(node.__class__.__name__)
+        if hasattr(node, 'ctx'): # set doesnt have ctx
+            ele.setAttribute('ctx', node.ctx.__class__.__name__)
+        add_text(ele, self.pop_merge_NL()) #LSQB
+        for item in node.elts:
+            self.to_xml(item, ele)
+            self._c_delimiter(ele)
+        # close brackets
+        assert self.tokens.pop().type == Token.OP
+        add_text(ele, self.tokens.current.string)
+        parent.appendChild(ele)
+
+    c_Set = c_List
+
+
+    @expr_wrapper
+    def c_Dict(self, node, parent):
+        ele = self.Element('Dict')
+        parent.appendChild(ele)
+
+        add_text(ele, self.pop_merge_NL()) # LBRACE
+        for key, value in zip(node.keys, node.values):
+            item_ele = self.Element('item')
+            ele.appendChild(item_ele)
+
+            if key is None:
+                # dict unpacking
+                assert self.tokens.pop().exact_type == Token.DOUBLESTAR
+                add_text(item_ele, '**' + self.tokens.space_right())
+            else:
+                self.to_xml(key, item_ele)
+                # COLON
+                add_text(item_ele, self.pop_merge_NL(lspace=True))
+            self.to_xml(value, item_ele)
+            # optional comma
+            self._c_delimiter(ele)
+        # close text
+        assert self.tokens.pop().exact_type == Token.RBRACE
+        add_text(ele, '}')
+
+
+    @expr_wrapper
+    def c_Name(self, node, parent):
+        # attributes are added in alphabetical order (same as python3.4)
+        ele = self.Element('Name', text=self._leaf(node))
+        ele.setAttribute('ctx', node.ctx.__class__.__name__)
+        ele.setAttribute('name', node.id)
+        parent.appendChild(ele)
+
+
+    @expr_wrapper
+    def c_Starred(self, node, parent):
+        assert self.tokens.pop().exact_type == Token.STAR
+        text = '*' + self.tokens.space_right()
+        ele = self.Element('Starred', text=text)
+        ele.setAttribute('ctx', node.ctx.__class__.__name__)
+        self.to_xml(node.value, ele)
+        parent.appendChild(ele)
+
+
+    @expr_wrapper
+    def c_Attribute(self, node, parent):
+        attribute_ele = self.Element('Attribute')
+        attribute_ele.setAttribute('ctx', node.ctx.__class__.__name__)
+        # value
+        value_ele = self.Element('value')
+        self.to_xml(node.value, value_ele)
+        attribute_ele.appendChild(value_ele)
+        # dot
+        text = self.pop_merge_NL(lspace=True)
+        add_text(attribute_ele, text)
+        # attr name
+        assert self.tokens.pop().type == Token.NAME, self.tokens.current
+        attr_ele = self.Element('attr', text=self.tokens.current.string)
+        attribute_ele.appendChild(attr_ele)
+        parent.appendChild(attribute_ele)
+
+
+    def c_Index(self, node, parent):
+        ele = self.Element('Index')
+        self.to_xml(node, ele)
+        parent.appendChild(ele)
+
+    def c_Slice(self, node, parent):
+        ele = self.Element('Slice')
+        parent.appendChild(ele)
+
+        # lower
+        if node.lower:
+            ele_lower = self.Element('lower')
+            self.to_xml(node.lower, ele_lower)
+            ele.appendChild(ele_lower)
+            add_text(ele, self.tokens.space_right())
+
+        # first colon
+        add_text(ele, self.pop_merge_NL(rspace=False))
+
+        # upper
+        if node.upper:
+            add_text(ele, self.tokens.space_right())
+            ele_upper = self.Element('upper')
+            self.to_xml(node.upper, ele_upper)
+            ele.appendChild(ele_upper)
+
+        if self.tokens.next().exact_type == Token.COLON:
+            colon2_text = self.pop_merge_NL(lspace=True, rspace=False)
+            add_text(ele, colon2_text) # COLON
+
+        # step
+        if node.step:
+            add_text(ele, self.tokens.space_right())
+            ele_step = self.Element('step')
+            self.to_xml(node.step, ele_step)
+            ele.appendChild(ele_step)
+
+
+    def c_ExtSlice(self, dims, parent):
+        for item in dims:
+            if isinstance(item, ast.Slice):
+                self.c_Slice(item, parent)
+            else:
+                self.c_Index(item.value if isinstance(item, INDEX) else item,
+                             parent)
+            self._c_delimiter(parent)
+
+
+    @expr_wrapper
+    def c_Subscript(self, node, parent):
+        sub_ele = self.Element('Subscript')
+        sub_ele.setAttribute('ctx', node.ctx.__class__.__name__)
+        parent.appendChild(sub_ele)
+
+        # value
+        value_ele = self.Element('value')
+        self.to_xml(node.value, value_ele)
+        sub_ele.appendChild(value_ele)
+
+        # slice
+        ele_slice = self.Element('slice')
+        add_text(ele_slice, self.pop_merge_NL(lspace=True)) # LSQB
+        slc = node.slice
+        if isinstance(slc, ast.Slice):
+            self.c_Slice(slc, ele_slice)
+        elif isinstance(slc, EXT_SLICE):
+            self.c_ExtSlice(slc.dims, ele_slice)
+        elif (isinstance(slc, ast.Tuple) and
+              any(isinstance(elt, ast.Slice) for elt in slc.elts)):
+            self.c_ExtSlice(slc.elts, ele_slice)
+        else:
+            self.c_Index(slc.value if isinstance(slc, INDEX) else slc,
+                         ele_slice)
+        close_text = self.pop_merge_NL(lspace=True, rspace=False) #RSQB
+        add_text(ele_slice, close_text)
+        sub_ele.appendChild(ele_slice)
+
+
+    @expr_wrapper
+    def c_Yield(self, node, parent):
+        assert self.tokens.pop().string == 'yield'
+        yield_text = self.tokens.current.string + self.tokens.space_right()
+        ele = self.Element(node.__class__.__name__, text=yield_text)
+        # from (only for YieldFrom)
+        if isinstance(node, ast.YieldFrom):
+            assert self.tokens.pop().string == 'from'
+            from_text = self.tokens.current.string + self.tokens.space_right()
+            add_text(ele, from_text)
+        # value
+        if node.value:
+            self.to_xml(node.value, ele)
+        parent.appendChild(ele)
+
+    c_YieldFrom = c_Yield
+
+
+    @expr_wrapper
+    def c_Await(self, node, parent):
+        assert self.tokens.pop().string == 'await'
+        ele = self.Element('Await', text='await' + self.tokens.space_right())
+        self.to_xml(node.value, ele)
+        parent.appendChild(ele)
+
+
+    @expr_wrapper
+    def c_NamedExpr(self, node, parent):
+        ele = self.Element('NamedExpr')
+        ele_target = self.Element('target')
+        self.to_xml(node.target, ele_target)
+        ele.appendChild(ele_target)
+        add_text(ele, self.pop_merge_NL(lspace=True)) # :=
+        ele_value = self.Element('value')
+        self.to_xml(node.value, ele_value)
+        ele.appendChild(ele_value)
+        parent.appendChild(ele)
+
+
+    @expr_wrapper
+    def c_BinOp(self, node, parent):
+        ele = self.Element('BinOp')
+        self.to_xml(node.left, ele)
+        # operator
+        op_text = self.pop_merge_NL(lspace=True) # OP
+        ele.appendChild(self.Element(node.op.__class__.__name__, text=op_text))
+        # right value
+        self.to_xml(node.right, ele)
+        parent.appendChild(ele)
+
+    @expr_wrapper
+    def c_BoolOp(self, node, parent):
+        ele = self.Element('BoolOp')
+        ele.setAttribute('op', node.op.__class__.__name__)
+
+        for index, value in enumerate(node.values):
+            if index:
+                # prepend operator text to all values but first one
+                op_text = self.pop_merge_NL(lspace=True)
+                add_text(ele, op_text)
+            ele_value = self.Element('value')
+            self.to_xml(value, ele_value)
+            ele.appendChild(ele_value)
+        parent.appendChild(ele)
+
+    @expr_wrapper
+    def c_UnaryOp(self, node, parent):
+        self.tokens.pop() # operator can be an OP or NAME
+        op_text = self.tokens.current.string
+        ele = self.Element('UnaryOp', text=op_text)
+        self.tokens.write_non_ast_tokens(ele)
+        ele.setAttribute('op', node.op.__class__.__name__)
+        self.to_xml(node.operand, ele)
+        parent.appendChild(ele)
+
+
+    CMP_TOKEN_COUNT = {
+        'Eq': 1, # ==
+        'Gt': 1, # >
+        'GtE': 1, # >=
+        'In': 1, # in
+        'Is': 1, # is
+        'IsNot': 2, # is not
+        'Lt': 1, # <
+        'LtE': 1, # <=
+        'NotEq': 1, # !=
+        'NotIn': 2, # not in
+        }
+    @expr_wrapper
+    def c_Compare(self, node, parent):
+        ele = self.Element('Compare')
+
+        ele_left = self.Element('value')
+        self.to_xml(node.left, ele_left)
+        ele.appendChild(ele_left)
+
+        for op, value in zip(node.ops, node.comparators):
+            cmp_text = self.tokens.space_right()
+            for token in range(self.CMP_TOKEN_COUNT[op.__class__.__name__]):
+                cmp_text += self.pop_merge_NL()
+            ele_op = self.Element('cmpop', text=cmp_text)
+            ele.appendChild(ele_op)
+            # value
+            ele_value = self.Element('value')
+            self.to_xml(value, ele_value)
+            ele.appendChild(ele_value)
+        parent.appendChild(ele)
+
+
+    def _c_call_keyword(self, parent, keyword):
+        ele_keyword = self.Element('keyword')
+        parent.appendChild(ele_keyword)
+        # arg
+        assert self.tokens.pop().type == Token.NAME, self.tokens.current
+        ele_arg = self.Element('arg', text=keyword.arg)
+        ele_keyword.appendChild(ele_arg)
+        # equal
+        add_text(ele_keyword, self.pop_merge_NL(lspace=True))
+        # value
+        ele_val = self.Element('value')
+        self.to_xml(keyword.value, ele_val)
+        ele_keyword.appendChild(ele_val)
+        self._c_delimiter(parent)
+
+
+    def _c_call_star_arg(self, ele, xarg, field):
+        token = self.tokens.pop()
+        # START DOUBLESTAR
+        assert token.type == Token.OP, self.tokens.current
+        text = token.string + self.tokens.space_right()
+        ele_xargs = self.Element(field, text=text)
+        self.to_xml(xarg, ele_xargs)
+        ele.appendChild(ele_xargs)
+        # optional comma
+        self._c_delimiter(ele)
+
+
+    def _call_args(self, args, keywords):
+        """Since python3.5 `*args` and `**kwargs` are part of
+        args and keywords.
+
+        :return: 2-tuple with
+          - list of positional arguments before any `*`/keyword
+          - list of 2-tuple (type, node) for remaining arguments in
+            source order. type is one of args, starargs, keyword, kwargs
+        """
+        positional = []
+        for arg in args:
+            if isinstance(arg, ast.Starred):
+                break
+            positional.append(arg)
+
+        others = []
+        for arg in args[len(positional):]:
+            if isinstance(arg, ast.Starred):
+                others.append((arg, 'starargs', arg.value))
+            else:
+                others.append((arg, 'args', arg))
+        for keyword in keywords:
+            atype = 'kwargs' if keyword.arg is None else 'keyword'
+            arg = keyword.value if keyword.arg is None else keyword
+            others.append((keyword.value, atype, arg))
+        others.sort(key=lambda item: self.tokens.start(item[0]))
+        return positional, [(atype, arg) for _, atype, arg in others]
+
+    def _c_call_others(self, ele, others):
+        """add keywords and starargs"""
+        for atype, arg in others:
+            if atype == 'keyword':
+                self._c_call_keyword(ele, arg)
+            elif atype == 'args':
+                # positional argument after `*args`
+                ele_args = self.Element('args')
+                ele.appendChild(ele_args)
+                self.to_xml(arg, ele_args)
+                self._c_delimiter(ele_args)
+            else:
+                self._c_call_star_arg(ele, arg, atype)
+
+
+    @expr_wrapper
+    def c_Call(self, node, parent):
+        ele = self.Element('Call')
+
+        # func
+        ele_func = self.Element('func')
+        self.to_xml(node.func, ele_func)
+        ele.appendChild(ele_func)
+
+        add_text(ele, self.pop_merge_NL(lspace=True)) # LPAR
+        # args
+        args, others = self._call_args(node.args, node.keywords)
+        if args:
+            ele_args = self.Element('args')
+            ele.appendChild(ele_args)
+            for arg in args:
+                self.to_xml(arg, ele_args)
+                # optional comma
+                self._c_delimiter(ele_args)
+
+        self._c_call_others(ele, others)
+
+        assert self.tokens.pop().exact_type == Token.RPAR, self.tokens.current
+        add_text(ele, ')')
+        parent.appendChild(ele)
+
+
+    @expr_wrapper
+    def c_IfExp(self, node, parent):
+        ele = self.Element('IfExpr')
+        parent.appendChild(ele)
+
+        # body
+        ele_body = self.Element('body')
+        self.to_xml(node.body, ele_body)
+        ele.appendChild(ele_body)
+
+        # if
+        add_text(ele, self.pop_merge_NL(lspace=True))
+
+        # test
+        ele_test = self.Element('test')
+        self.to_xml(node.test, ele_test)
+        ele.appendChild(ele_test)
+
+        # else
+        add_text(ele, self.pop_merge_NL(lspace=True))
+
+        # orelse
+        ele_orelse = self.Element('orelse')
+        self.to_xml(node.orelse, ele_orelse)
+        ele.appendChild(ele_orelse)
+
+
+    @expr_wrapper
+    def c_GeneratorExp(self, node, parent):
+        class_ = node.__class__.__name__
+        ele = self.Element(class_)
+        if class_ != 'GeneratorExp':
+            add_text(ele, self.pop_merge_NL()) #LSQB
+
+        if hasattr(node, 'elt'): # GeneratorExp ListComp SetComp
+            # elt
+            ele_elt = self.Element('elt')
+            ele.appendChild(ele_elt)
+            self.to_xml(node.elt, ele_elt)
+        else: # DictComp
+            ele_key = self.Element('key')
+            ele.appendChild(ele_key)
+            self.to_xml(node.key, ele_key)
+            add_text(ele, self.pop_merge_NL(lspace=True)) # COLON
+            ele_value = self.Element('value')
+            ele.appendChild(ele_value)
+            self.to_xml(node.value, ele_value)
+
+        # generators
+        ele_gen = self.Element('generators')
+        ele.appendChild(ele_gen)
+        for gen in node.generators:
+            ele_comp = self.Element('comprehension')
+            ele_gen.appendChild(ele_comp)
+            # for
+            for_text = self.pop_merge_NL(lspace=True) # for
+            if gen.is_async:
+                for_text += self.pop_merge_NL() # async for
+            add_text(ele_comp, for_text)
+            # target
+            ele_target = self.Element('target')
+            self.to_xml(gen.target, ele_target)
+            ele_comp.appendChild(ele_target)
+            # in
+            in_text = self.pop_merge_NL(lspace=True) # in
+            add_text(ele_comp, in_text)
+            # iter
+            ele_iter = self.Element('iter')
+            self.to_xml(gen.iter, ele_iter)
+            ele_comp.appendChild(ele_iter)
+
+            # ifs
+            if gen.ifs:
+                ele_ifs = self.Element('ifs')
+                ele_comp.appendChild(ele_ifs)
+                for gif in gen.ifs:
+                    ele_if = self.Element('if')
+                    ele_ifs.appendChild(ele_if)
+                    # if
+                    if_text = self.pop_merge_NL(lspace=True) # if
+                    add_text(ele_if, if_text)
+                    # target
+                    self.to_xml(gif, ele_if)
+
+        # close brackets
+        if class_ != 'GeneratorExp':
+            close_text = self.pop_merge_NL(lspace=True, rspace=False)
+            add_text(ele, close_text)
+        parent.appendChild(ele)
+
+    c_ListComp = c_GeneratorExp
+    c_SetComp = c_GeneratorExp
+    c_DictComp = c_GeneratorExp
+
+
+    @expr_wrapper
+    def c_Lambda(self, node, parent):
+        assert self.tokens.pop().string == 'lambda'
+        ele = self.Element('Lambda', text='lambda' + self.tokens.space_right())
+        # arguments
+        ele_arguments = self.Element('arguments')
+        self._arguments(ele_arguments, node.args)
+        ele.appendChild(ele_arguments)
+
+        # COLON :
+        add_text(ele, self.pop_merge_NL())
+
+        # body
+        ele_body = self.Element('body')
+        self.to_xml(node.body, ele_body)
+        ele.appendChild(ele_body)
+        parent.appendChild(ele)
+
+
+
+    ###########################################################
+    # stmt
+    ###########################################################
+
+    def _c_field_list(self, parent, field_name, nodes, text=None):
+        """must a field list that contains line, number information"""
+        ele = self.Element(field_name, text=text)
+        for item in nodes:
+            self.to_xml(item, ele)
+        parent.appendChild(ele)
+
+    def _pop_async(self, node, keyword):
+        """:return: text for (optional) async + keyword"""
+        text = ''
+        if node.__class__.__name__.startswith('Async'):
+            assert self.tokens.pop().string == 'async'
+            text = 'async' + self.tokens.space_right()
+        assert self.tokens.pop().string == keyword, self.tokens.current
+        return text + keyword + self.tokens.space_right()
+
+
+    def c_Expr(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        ele = self.Element('Expr')
+        self.to_xml(node.value, ele)
+        parent.appendChild(ele)
+
+
+    def c_Pass(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().type == Token.NAME
+        parent.appendChild(self.Element(node.__class__.__name__,
+                                   text=self.tokens.current.string))
+    c_Break = c_Pass
+    c_Continue = c_Pass
+
+
+    def c_Assert(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().string == 'assert'
+        assert_text = 'assert' + self.tokens.space_right()
+        assert_ele = self.Element('Assert', text=assert_text)
+        # test expr
+        test_ele = self.Element('test')
+        self.to_xml(node.test, test_ele)
+        assert_ele.appendChild(test_ele)
+        # msg
+        if node.msg:
+            assert self.tokens.pop().exact_type == Token.COMMA
+            add_text(assert_ele, self.tokens.text_prev2next())
+            msg_ele = self.Element('msg')
+            self.to_xml(node.msg, msg_ele)
+            assert_ele.appendChild(msg_ele)
+        parent.appendChild(assert_ele)
+
+
+    def c_Assign(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        ele = self.Element('Assign')
+        # targets
+        ele_targets = self.Element('targets')
+        ele.appendChild(ele_targets)
+        for target in node.targets:
+            self.to_xml(target, ele_targets)
+            # op `=`
+            assert self.tokens.pop().exact_type == Token.EQUAL
+            add_text(ele_targets, self.tokens.text_prev2next())
+        # value
+        self.to_xml(node.value, ele)
+        parent.appendChild(ele)
+
+
+    def c_AnnAssign(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        ele = self.Element('AnnAssign')
+        # target
+        ele_target = self.Element('target')
+        self.to_xml(node.target, ele_target)
+        ele.appendChild(ele_target)
+        # colon
+        assert self.tokens.pop().exact_type == Token.COLON
+        add_text(ele, self.tokens.text_prev2next())
+        # annotation
+        ele_ann = self.Element('annotation')
+        self.to_xml(node.annotation, ele_ann)
+        ele.appendChild(ele_ann)
+        # value
+        if node.value:
+            assert self.tokens.pop().exact_type == Token.EQUAL
+            add_text(ele, self.tokens.text_prev2next())
+            ele_value = self.Element('value')
+            self.to_xml(node.value, ele_value)
+            ele.appendChild(ele_value)
+        parent.appendChild(ele)
+
+
+    def c_Delete(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().string == 'del'
+        ele = self.Element('Delete', text='del' + self.tokens.space_right())
+        # targets
+        ele_targets = self.Element('targets')
+        ele.appendChild(ele_targets)
+        for target in node.targets:
+            self.to_xml(target, ele_targets)
+            # optional comma
+            self._c_delimiter(ele_targets)
+        parent.appendChild(ele)
+
+
+    def c_Global(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().type == Token.NAME
+        text = self.tokens.current.string + self.tokens.space_right()
+        ele = self.Element(node.__class__.__name__, text=text)
+        # names
+        ele_names = self.Element('names')
+        ele.appendChild(ele_names)
+        for name in node.names:
+            assert self.tokens.pop().type == Token.NAME
+            ele_name = self.Element('name', text=name)
+            ele_names.appendChild(ele_name)
+            # optional comma
+            self._c_delimiter(ele_names)
+        parent.appendChild(ele)
+
+    c_Nonlocal = c_Global
+
+
+    def c_AugAssign(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        ele = self.Element('AugAssign')
+        parent.appendChild(ele)
+        # target
+        ele_target = self.Element('target')
+        self.to_xml(node.target, ele_target)
+        ele.appendChild(ele_target)
+        # op
+        ele_op = self.Element('op')
+        assert self.tokens.pop().type == Token.OP
+        ele_op_val = self.Element(node.op.__class__.__name__,
+                             text=self.tokens.text_prev2next())
+        ele_op.appendChild(ele_op_val)
+        ele.appendChild(ele_op)
+        # value
+        ele_value = self.Element('value')
+        self.to_xml(node.value, ele_value)
+        ele.appendChild(ele_value)
+
+
+    def _c_import_names(self, ele, names):
+        for child in names:
+            alias = self.Element('alias')
+
+            # add name
+            self.tokens.pop_dotted_name()
+            name_ele = self.Element('name', text=child.name)
+            alias.appendChild(name_ele)
+
+            # check if optional asname is present
+            if child.asname:
+                assert self.tokens.pop().string == 'as'
+                add_text(alias, self.tokens.text_prev2next())
+                assert self.tokens.pop().type == Token.NAME
+                alias.appendChild(self.Element('asname', text=child.asname))
+            ele.appendChild(alias)
+            self._c_delimiter(ele)
+
+
+    def c_Import(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().string == 'import'
+        ele = self.Element('Import', text='import' + self.tokens.space_right())
+        self._c_import_names(ele, node.names)
+        parent.appendChild(ele)
+
+    def c_ImportFrom(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+
+        ele = self.Element('ImportFrom')
+        # level
+        ele.setAttribute('level', str(node.level))
+
+        # from <module>
+        assert self.tokens.pop().string == 'from'
+        from_text = 'from' + self.tokens.space_right()
+        # get level dots (`...` is a single token)
+        first = True
+        while self.tokens.next().exact_type in (Token.DOT, Token.ELLIPSIS):
+            self.tokens.pop() # dot
+            if not first:
+                from_text += self.tokens.prev_space()
+            from_text += self.tokens.current.string
+            first = False
+        if not first and node.module:
+            from_text += self.tokens.space_right()
+        add_text(ele, from_text)
+
+        # get module name
+        module_text = ''
+        if self.tokens.next().string != 'import':
+            module_text += self.tokens.pop_dotted_name()
+        ele.appendChild(self.Element('module', text=module_text))
+
+        # import keyword
+        assert self.tokens.pop().string == 'import'
+        add_text(ele, self.tokens.text_prev2next())
+
+        # parenthesis
+        token = self.tokens.next()
+        has_paren = False
+        if token.exact_type == Token.LPAR:
+            has_paren = True
+            add_text(ele, self.pop_merge_NL()) # LPAR
+
+        # names
+        names = self.Element('names')
+        self._c_import_names(names, node.names)
+        ele.appendChild(names)
+
+        if has_paren:
+            add_text(ele, self.pop_merge_NL()) #RPAR
+
+        # append to parent
+        parent.appendChild(ele)
+
+
+    def c_Return(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().string == 'return'
+        ele = self.Element('Return', text='return')
+        if node.value:
+            add_text(ele, self.tokens.space_right())
+            self.to_xml(node.value, ele)
+        parent.appendChild(ele)
+
+
+    def _arg_element(self, arg, default=None, kwonly=False):
+        """:return: XML node"""
+        arg_ele = self.Element('arg')
+        if kwonly:
+            arg_ele.setAttribute('kwonly', '')
+        arg_ele.setAttribute('name', arg.arg)
+        add_text(arg_ele, arg.arg)
+
+        if arg.annotation:
+            assert self.tokens.pop().exact_type == Token.COLON
+            ann_ele = self.Element('annotation')
+            ann_text = self.tokens.text_prev2next()
+            add_text(ann_ele, ann_text)
+            self.to_xml(arg.annotation, ann_ele)
+            arg_ele.appendChild(ann_ele)
+
+        # keyword_only arg might not have a default None instead of an ast node
+        if default is not None:
+            assert self.tokens.pop().exact_type == Token.EQUAL
+            default_ele = self.Element('default')
+            equal_text = self.tokens.text_prev2next()
+            add_text(default_ele, equal_text)
+            self.to_xml(default, default_ele)
+            arg_ele.appendChild(default_ele)
+
+        return arg_ele
+
+
+    def _star_arg(self, ele_arguments, arguments, field):
+        """handle vararg and kwarg"""
+        arg = getattr(arguments, field)
+        if arg:
+            ele_arg = self.Element(field)
+            token = self.tokens.pop()
+             # START / DOUBLESTAR
+            assert token.type == Token.OP, self.tokens.current
+            star_text = token.string
+            add_text(ele_arg, star_text)
+            assert self.tokens.pop().type == Token.NAME
+            add_text(ele_arg, self.tokens.prev_space())
+            ele_arg.appendChild(self._arg_element(arg))
+            ele_arguments.appendChild(ele_arg)
+            self._c_delimiter(ele_arguments)
+
+    def _arguments(self, ele_arguments, arguments):
+        """convert arugments for FuncDef and Lambda"""
+        # args (positional only args are separated by a `/`)
+        posonlyargs = getattr(arguments, 'posonlyargs', [])
+        args = posonlyargs + arguments.args
+        if args:
+            f_defaults = arguments.defaults
+            defaults = ([None] * (len(args) - len(f_defaults))) + f_defaults
+            for index, (arg, default) in enumerate(zip(args, defaults)):
+                assert self.tokens.pop().type == Token.NAME, self.tokens.current
+                arg_ele = self._arg_element(arg, default)
+                ele_arguments.appendChild(arg_ele)
+                self._c_delimiter(ele_arguments)
+                if index + 1 == len(posonlyargs):
+                    assert self.tokens.pop().exact_type == Token.SLASH
+                    add_text(ele_arguments, '/')
+                    self._c_delimiter(ele_arguments)
+
+        # vararg
+        self._star_arg(ele_arguments, arguments, 'vararg')
+
+        # kwonlyargs
+        kwonlyargs = arguments.kwonlyargs
+        kw_defaults = arguments.kw_defaults
+        if kwonlyargs and not arguments.vararg:
+            # if there is kwonly args but no vararg it needs an extra '*' arg
+            assert self.tokens.pop().exact_type == Token.STAR
+            add_text(ele_arguments, '*')
+            self._c_delimiter(ele_arguments)
+        for arg, default in zip(kwonlyargs, kw_defaults):
+            assert self.tokens.pop().type == Token.NAME, self.tokens.current
+            arg_ele = self._arg_element(arg, default, kwonly=True)
+            ele_arguments.appendChild(arg_ele)
+            self._c_delimiter(ele_arguments)
+
+        # kwarg
+        self._star_arg(ele_arguments, arguments, 'kwarg')
+
+
+    def _c_decorator_list(self, parent, decorators):
+        for deco in decorators:
+            assert self.tokens.pop().exact_type == Token.AT
+            deco_text = '@' + self.tokens.space_right()
+            ele_deco = self.Element('decorator', text=deco_text)
+            parent.appendChild(ele_deco)
+            self.to_xml(deco, ele_deco)
+            self.tokens.write_non_ast_tokens(parent)
+
+    def _c_type_params(self, parent, node):
+        """python3.12 generics, type params are included as plain text"""
+        type_params = getattr(node, 'type_params', None)
+        if type_params:
+            ele = self.Element('type_params',
+                               text=self.pop_merge_NL(lspace=True))
+            for param in type_params:
+                self.c_generic(param, ele)
+                self._c_delimiter(ele)
+            assert self.tokens.pop().exact_type == Token.RSQB
+            add_text(ele, ']')
+            parent.appendChild(ele)
+
+
+    def c_FunctionDef(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        ele = self.Element(node.__class__.__name__)
+
+        # decorator
+        self._c_decorator_list(ele, node.decorator_list)
+
+        # def
+        add_text(ele, self._pop_async(node, 'def'))
+
+        # name
+        assert self.tokens.pop().type == Token.NAME
+        ele.setAttribute('name', node.name)
+        add_text(ele, node.name)
+        self._c_type_params(ele, node)
+
+        # args
+        start_arguments_text = self.pop_merge_NL(lspace=True) # LPAR
+        ele_arguments = self.Element('arguments', text=start_arguments_text)
+        self._arguments(ele_arguments, node.args)
+
+        # close parent + colon
+        assert self.tokens.pop().exact_type == Token.RPAR
+        close_args_text = ')' + self.tokens.space_right()
+        add_text(ele_arguments, close_args_text)
+
+        if node.returns:
+            assert self.tokens.pop().type == Token.OP # ->
+            arrow_text = '->' + self.tokens.space_right()
+            ele_returns = self.Element('returns', text=arrow_text)
+            ele_arguments.appendChild(ele_returns)
+            self.to_xml(node.returns, ele_returns)
+            add_text(ele_returns, self.tokens.space_right())
+
+        # colon
+        assert self.tokens.pop().exact_type == Token.COLON
+        colon_text = ':'
+        add_text(ele_arguments, colon_text)
+        ele.appendChild(ele_arguments)
+
+        # body
+        if self.skeleton:
+            self._c_raw_body(ele, node.body)
+        else:
+            self._c_field_list(ele, 'body', node.body)
+        parent.appendChild(ele)
+
+    c_AsyncFunctionDef = c_FunctionDef
+
+
+    def c_ClassDef(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        ele = self.Element('ClassDef')
+
+        # decorator
+        self._c_decorator_list(ele, node.decorator_list)
+
+        # class
+        assert self.tokens.pop().string == 'class'
+        add_text(ele, 'class')
+
+        # name
+        assert self.tokens.pop().type == Token.NAME
+        ele.setAttribute('name', node.name)
+        text = self.tokens.prev_space() + node.name
+        add_text(ele, text)
+        self._c_type_params(ele, node)
+
+        # arguments
+        if self.tokens.next().exact_type == Token.LPAR:
+            start_arguments_text = self.pop_merge_NL(lspace=True)
+            ele_arguments = self.Element('arguments',
+                                         text=start_arguments_text)
+
+            bases, others = self._call_args(node.bases, node.keywords)
+            for item in bases:
+                ele_base = self.Element('base')
+                self.to_xml(item, ele_base)
+                ele_arguments.appendChild(ele_base)
+                self._c_delimiter(ele_arguments)
+
+            self._c_call_others(ele_arguments, others)
+
+            # close arguments
+            assert self.tokens.pop().exact_type == Token.RPAR
+            add_text(ele_arguments, ')')
+            ele.appendChild(ele_arguments)
+
+        # colon
+        assert self.tokens.pop().exact_type == Token.COLON
+        add_text(ele, self.tokens.prev_space() + ':')
+
+        # body
+        self._c_field_list(ele, 'body', node.body)
+        parent.appendChild(ele)
+
+
+
+    def c_While(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().type == Token.NAME
+        while_text = self.tokens.current.string + self.tokens.space_right()
+        ele = self.Element(node.__class__.__name__, text=while_text)
+        # test expr
+        test_ele = self.Element('test')
+        self.to_xml(node.test, test_ele)
+        ele.appendChild(test_ele)
+        # colon
+        assert self.tokens.pop().exact_type == Token.COLON
+        add_text(ele, self.tokens.prev_space() + ':')
+        # body
+        self._c_field_list(ele, 'body', node.body)
+        # orelse
+        orelse = node.orelse
+        if orelse:
+            self.tokens.write_non_ast_tokens(ele, rspace=False)
+            if self.tokens.next().string == 'elif':
+                ele_orelse = self.Element('orelse')
+                self.to_xml(orelse[0], ele_orelse)
+                ele.appendChild(ele_orelse)
+            else:
+                assert self.tokens.pop().string == 'else', self.tokens.current
+                else_text = self.tokens.text_prev2next() + ':'
+                assert self.tokens.pop().exact_type == Token.COLON
+                self._c_field_list(ele, 'orelse', orelse, text=else_text)
+
+        parent.appendChild(ele)
+
+    c_If = c_While
+
+
+    def c_For(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        for_text = self._pop_async(node, 'for')
+        ele = self.Element(node.__class__.__name__, text=for_text)
+        # target expr
+        ele_target = self.Element('target')
+        self.to_xml(node.target, ele_target)
+        ele.appendChild(ele_target)
+        # 'in'
+        assert self.tokens.pop().string == 'in'
+        in_text = self.tokens.text_prev2next()
+        add_text(ele, in_text)
+        # iter
+        ele_iter = self.Element('iter')
+        self.to_xml(node.iter, ele_iter)
+        ele.appendChild(ele_iter)
+        # colon
+        assert self.tokens.pop().exact_type == Token.COLON
+        add_text(ele, self.tokens.prev_space() + ':')
+        # body
+        self._c_field_list(ele, 'body', node.body)
+        parent.appendChild(ele)
+
+        # else
+        if node.orelse:
+            self.tokens.write_non_ast_tokens(ele, rspace=False)
+            assert self.tokens.pop().string == 'else', self.tokens.current
+            else_text = self.tokens.text_prev2next() + ':'
+            assert self.tokens.pop().exact_type == Token.COLON
+            self._c_field_list(ele, 'orelse', node.orelse, text=else_text)
+
+    c_AsyncFor = c_For
+
+
+    def c_Raise(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().string == 'raise'
+        ele = self.Element('Raise', text='raise')
+        # exc
+        if node.exc:
+            add_text(ele, self.tokens.space_right())
+            ele_exc = self.Element('exc')
+            self.to_xml(node.exc, ele_exc)
+            ele.appendChild(ele_exc)
+
+        # cause
+        if node.cause:
+            assert self.tokens.pop().string == 'from'
+            add_text(ele, self.tokens.text_prev2next())
+            ele_cause = self.Element('cause')
+            self.to_xml(node.cause, ele_cause)
+            ele.appendChild(ele_cause)
+        parent.appendChild(ele)
+
+
+    def c_ExceptHandler(self, node, parent, star=False):
+        ele = self.Element('ExceptHandler')
+        parent.appendChild(ele)
+        # except
+        self.tokens.write_non_ast_tokens(ele)
+        assert self.tokens.pop().string == 'except', self.tokens.current
+        except_text = 'except' + self.tokens.space_right()
+        if star:
+            assert self.tokens.pop().exact_type == Token.STAR
+            except_text += '*' + self.tokens.space_right()
+        add_text(ele, except_text)
+        # type
+        if node.type:
+            ele_type = self.Element('type')
+            self.to_xml(node.type, ele_type)
+            ele.appendChild(ele_type)
+            # name
+            if node.name:
+                assert self.tokens.pop().string == 'as'
+                add_text(ele, self.tokens.text_prev2next())
+                assert self.tokens.pop().type == Token.NAME
+                ele_name = self.Element('name', text=node.name)
+                ele.appendChild(ele_name)
+        # :
+        assert self.tokens.pop().exact_type == Token.COLON
+        colon_text = self.tokens.prev_space() + ':'
+        add_text(ele, colon_text)
+        # body
+        self._c_field_list(ele, 'body', node.body)
+
+
+    def c_Try(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        ele = self.Element(node.__class__.__name__)
+        parent.appendChild(ele)
+        assert self.tokens.pop().string == 'try', self.tokens.current
+        try_text = 'try' + self.tokens.space_right() + ':'
+        add_text(ele, try_text)
+        assert self.tokens.pop().exact_type == Token.COLON
+
+        # body
+        self._c_field_list(ele, 'body', node.body)
+
+        # handlers
+        if node.handlers:
+            ele_handlers = self.Element('handlers')
+            ele.appendChild(ele_handlers)
+            star = isinstance(node, getattr(ast, 'TryStar', ()))
+            for handler in node.handlers:
+                self.c_ExceptHandler(handler, ele_handlers, star=star)
+
+        if node.orelse:
+            self.tokens.write_non_ast_tokens(ele, rspace=False)
+            assert self.tokens.pop().string == 'else', self.tokens.current
+            else_text = self.tokens.text_prev2next() + ':'
+            assert self.tokens.pop().exact_type == Token.COLON
+            self._c_field_list(ele, 'orelse', node.orelse, text=else_text)
+
+        if node.finalbody:
+            self.tokens.write_non_ast_tokens(ele, rspace=False)
+            assert self.tokens.pop().string == 'finally', self.tokens.current
+            final_text = self.tokens.text_prev2next() + ':'
+            assert self.tokens.pop().exact_type == Token.COLON
+            self._c_field_list(ele, 'finalbody', node.finalbody,
+                               text=final_text)
+
+    c_TryStar = c_Try
+
+
+    def _with_has_paren(self, node):
+        """python3.9+ with items might be enclosed in parenthesis"""
+        if self.tokens.next().exact_type != Token.LPAR:
+            return False
+        last = node.items[-1]
+        last = last.optional_vars or last.context_expr
+        source = self.tokens.source
+        pos = STR_SPACE_RE.match(source, self.tokens.end(last)).end()
+        # `with (a):` parenthesis is part of expression
+        if (len(node.items) == 1 and not node.items[0].optional_vars):
+            return False
+        return source[pos] == ')' or (
+            source[pos] == ',' and
+            source[STR_SPACE_RE.match(source, pos + 1).end()] == ')')
+
+    def c_With(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        with_text = self._pop_async(node, 'with')
+        ele = self.Element(node.__class__.__name__, text=with_text)
+        ele_items = self.Element('items')
+        ele.appendChild(ele_items)
+        has_paren = self._with_has_paren(node)
+        if has_paren:
+            add_text(ele_items, self.pop_merge_NL()) # LPAR
+        for item in node.items:
+            ele_item = self.Element('withitem')
+            ele_items.appendChild(ele_item)
+            self.to_xml(item.context_expr, ele_item)
+            if item.optional_vars:
+                assert self.tokens.pop().string == 'as'
+                add_text(ele_item, self.tokens.text_prev2next())
+                self.to_xml(item.optional_vars, ele_item)
+            self._c_delimiter(ele_items)
+        if has_paren:
+            add_text(ele_items, self.pop_merge_NL()) # RPAR
+
+        # colon
+        assert self.tokens.pop().exact_type == Token.COLON
+        add_text(ele, ':')
+        # body
+        self._c_field_list(ele, 'body', node.body)
+        parent.appendChild(ele)
+
+    c_AsyncWith = c_With
+
+
+    ###########################################################
+    # match (python3.10+)
+    ###########################################################
+
+    def c_Match(self, node, parent):
+        self.tokens.write_non_ast_tokens(parent)
+        assert self.tokens.pop().string == 'match'
+        ele = self.Element('Match', text='match' + self.tokens.space_right())
+        # subject
+        ele_subject = self.Element('subject')
+        self.to_xml(node.subject, ele_subject)
+        ele.appendChild(ele_subject)
+        # colon
+        assert self.tokens.pop().exact_type == Token.COLON
+        add_text(ele, self.tokens.prev_space() + ':')
+        # cases
+        ele_cases = self.Element('cases')
+        ele.appendChild(ele_cases)
+        for case in node.cases:
+            self.c_match_case(case, ele_cases)
+        parent.appendChild(ele)
+
+    def c_match_case(self, node, parent):
+        ele = self.Element('match_case')
+        parent.appendChild(ele)
+        self.tokens.write_non_ast_tokens(ele)
+        assert self.tokens.pop().string == 'case', self.tokens.current
+        add_text(ele, 'case' + self.tokens.space_right())
+        # pattern
+        ele_pattern = self.Element('pattern')
+        self.to_xml(node.pattern, ele_pattern)
+        ele.appendChild(ele_pattern)
+        # guard
+        if node.guard:
+            assert self.tokens.pop().string == 'if'
+            add_text(ele, self.tokens.text_prev2next())
+            ele_guard = self.Element('guard')
+            self.to_xml(node.guard, ele_guard)
+            ele.appendChild(ele_guard)
+        # colon
+        assert self.tokens.pop().exact_type == Token.COLON
+        add_text(ele, self.tokens.prev_space() + ':')
+        # body
+        self._c_field_list(ele, 'body', node.body)
+
+    def _c_pattern_name(self, ele, name):
+        """capture name, `_` if name is None"""
+        assert self.tokens.pop().type == Token.NAME, self.tokens.current
+        ele.setAttribute('name', name or '_')
+        add_text(ele, self.tokens.current.string)
+
+    @expr_wrapper
+    def c_MatchValue(self, node, parent):
+        ele = self.Element('MatchValue')
+        self.to_xml(node.value, ele)
+        parent.appendChild(ele)
+
+    @expr_wrapper
+    def c_MatchSingleton(self, node, parent):
+        parent.appendChild(self.Element('MatchSingleton',
+                                        text=self._leaf(node)))
+
+    @expr_wrapper
+    def c_MatchAs(self, node, parent):
+        ele = self.Element('MatchAs')
+        if node.pattern:
+            ele_pattern = self.Element('pattern')
+            self.to_xml(node.pattern, ele_pattern)
+            ele.appendChild(ele_pattern)
+            assert self.tokens.pop().string == 'as'
+            add_text(ele, self.tokens.text_prev2next())
+        self._c_pattern_name(ele, node.name)
+        parent.appendChild(ele)
+
+    @expr_wrapper
+    def c_MatchStar(self, node, parent):
+        assert self.tokens.pop().exact_type == Token.STAR
+        ele = self.Element('MatchStar', text='*' + self.tokens.space_right())
+        self._c_pattern_name(ele, node.name)
+        parent.appendChild(ele)
+
+    @expr_wrapper
+    def c_MatchOr(self, node, parent):
+        ele = self.Element('MatchOr')
+        for index, pattern in enumerate(node.patterns):
+            if index:
+                add_text(ele, self.pop_merge_NL(lspace=True)) # |
+            self.to_xml(pattern, ele)
+        parent.appendChild(ele)
+
+    def _pattern_brackets(self, node):
+        """:return: bool if sequence pattern is enclosed by brackets"""
+        char = self.tokens.source[self.tokens.start(node)]
+        if char == '[':
+            return True
+        if char != '(' or not node.patterns:
+            return char == '('
+        # same check as done for tuples
+        return self._is_parenthesized(ast.Tuple(
+            elts=node.patterns, lineno=node.lineno,
+            col_offset=node.col_offset, end_lineno=node.end_lineno,
+            end_col_offset=node.end_col_offset))
+
+    @expr_wrapper
+    def c_MatchSequence(self, node, parent):
+        ele = self.Element('MatchSequence')
+        has_brackets = self._pattern_brackets(node)
+        if has_brackets:
+            add_text(ele, self.pop_merge_NL()) # LSQB/LPAR
+        for pattern in node.patterns:
+            self.to_xml(pattern, ele)
+            self._c_delimiter(ele)
+        if has_brackets:
+            assert self.tokens.pop().exact_type in (Token.RSQB, Token.RPAR)
+            add_text(ele, self.tokens.current.string)
+        parent.appendChild(ele)
+
+    @expr_wrapper
+    def c_MatchMapping(self, node, parent):
+        ele = self.Element('MatchMapping')
+        add_text(ele, self.pop_merge_NL()) # LBRACE
+        for key, pattern in zip(node.keys, node.patterns):
+            item_ele = self.Element('item')
+            ele.appendChild(item_ele)
+            self.to_xml(key, item_ele)
+            add_text(item_ele, self.pop_merge_NL(lspace=True)) # COLON
+            self.to_xml(pattern, item_ele)
+            self._c_delimiter(ele)
+        if node.rest:
+            assert self.tokens.pop().exact_type == Token.DOUBLESTAR
+            ele_rest = self.Element('rest',
+                                    text='**' + self.tokens.space_right())
+            self._c_pattern_name(ele_rest, node.rest)
+            ele.appendChild(ele_rest)
+            self._c_delimiter(ele)
+        assert self.tokens.pop().exact_type == Token.RBRACE
+        add_text(ele, '}')
+        parent.appendChild(ele)
+
+    @expr_wrapper
+    def c_MatchClass(self, node, parent):
+        ele = self.Element('MatchClass')
+        ele_cls = self.Element('cls')
+        self.to_xml(node.cls, ele_cls)
+        ele.appendChild(ele_cls)
+        add_text(ele, self.pop_merge_NL(lspace=True)) # LPAR
+        for pattern in node.patterns:
+            self.to_xml(pattern, ele)
+            self._c_delimiter(ele)
+        for attr, pattern in zip(node.kwd_attrs, node.kwd_patterns):
+            ele_keyword = self.Element('keyword')
+            ele.appendChild(ele_keyword)
+            assert self.tokens.pop().type == Token.NAME
+            ele_keyword.appendChild(self.Element('arg', text=attr))
+            add_text(ele_keyword, self.pop_merge_NL(lspace=True)) # EQUAL
+            self.to_xml(pattern, ele_keyword)
+            self._c_delimiter(ele)
+        assert self.tokens.pop().exact_type == Token.RPAR
+        add_text(ele, ')')
+        parent.appendChild(ele)
+
+
+
+def _stmt_lines(stmt):
+    """:return: 2-tuple (first, last) line of statement and decorators"""
+    decorators = getattr(stmt, 'decorator_list', None)
+    first = decorators[0].lineno if decorators else stmt.lineno
+    return first, stmt.end_lineno
+
+def _stmt_bodies(stmt):
+    """statement lists nested in a compound statement"""
+    for field in ('body', 'orelse', 'finalbody'):
+        nodes = getattr(stmt, field, None)
+        if isinstance(nodes, list):
+            yield nodes
+    for handler in getattr(stmt, 'handlers', ()):
+        yield handler.body
+    for case in getattr(stmt, 'cases', ()):
+        yield case.body
+
+
+def select_lines(tree, first, last):
+    """find statements in the line range (both inclusive).
+
+    If the range is inside the body of a compound statement
+    (not including its first line) the nested statements are used.
+    :return: list of sibling statements
+    """
+    def in_range(stmt):
+        stmt_first, stmt_last = _stmt_lines(stmt)
+        return stmt_first <= last and stmt_last >= first
+
+    body = tree.body
+    while True:
+        stmts = [stmt for stmt in body if in_range(stmt)]
+        if len(stmts) != 1 or _stmt_lines(stmts[0])[0] >= first:
+            break
+        inner = [nodes for nodes in _stmt_bodies(stmts[0])
+                 if any(in_range(stmt) for stmt in nodes)]
+        if len(inner) != 1:
+            break
+        body = inner[0]
+    if not stmts:
+        raise ValueError('No statement in lines {}-{}'.format(first, last))
+    return stmts
+
+
+def select_name(tree, name):
+    """find class/function by its dotted name, i.e. `MyClass.method`.
+
+    If a name is defined more than once (i.e. property getter/setter)
+    the first definition that contains the rest of the path is used.
+    :return: list with the statement
+    """
+    def find(body, parts):
+        for stmt in body:
+            if isinstance(stmt, DEFINITION_STMT) and stmt.name == parts[0]:
+                if len(parts) == 1:
+                    return stmt
+                found = find(stmt.body, parts[1:])
+                if found:
+                    return found
+        return None
+
+    stmt = find(tree.body, name.split('.'))
+    if stmt is None:
+        raise ValueError('Definition not found: {}'.format(name))
+    return [stmt]
+
+
+def iter_pos2xml(source, filename='<str>', lines=None, select=None,
+                 tree=None, **options):
+    """convert python source code using AST node positions,
+    one top-level statement at a time.
+
+    Yield the DOM Element of the module after each statement is added
+    to it, and after the remaining text at the end of file is added.
+
+    If `lines` or `select` are given only the selected statements are
+    converted, the text of the `Module` is the source from the start
+    of the first statement to the end of the last one.
+
+    :param lines: 2-tuple (first, last) see `select_lines`
+    :param select: (str) dotted name, see `select_name`
+    :param tree: `ast.Module` of source, if already parsed
+    :param options: see `PosConverter`
+    """
+    if tree is None:
+        tree = ast.parse(source, filename)
+    converter = PosConverter(source, **options)
+    root = converter.Element('Module')
+    if lines or select:
+        if select:
+            stmts = select_name(tree, select)
+        else:
+            stmts = select_lines(tree, *lines)
+        converter.tokens.seek(converter.stmt_start(stmts[0]))
+        for stmt in stmts:
+            converter.to_xml(stmt, root)
+            yield root
+        return
+    for stmt in tree.body:
+        converter.to_xml(stmt, root)
+        yield root
+    # add remaining text at the end of the file
+    converter.tokens.write_remaining(root)
+    yield root
+
+
+def pos2xml(source, filename='<str>', **options):
+    """convert python source code to XML using AST node positions
+
+    :return: DOM Element of the module
+    """
+    for root in iter_pos2xml(source, filename, **options):
+        pass
+    return root
@@ -0,0 +1,346 @@
+"""daemon to convert python modules without the process startup cost
+
+The server listens on a Unix socket. Each request and response is
+a JSON object in a single line (JSON-lines). Requests:
+
+  - op: `py2xml`, `xml2py`, `check` or `astview`
+  - source: (str) content of module (or XML for `xml2py`)
+  - path: (str) path of module, used if `source` is not given
+  - options: (dict) for `py2xml` and `check` keyword arguments of
+    `py2xml.py2xml()`, for `astview` the output `format`
+  - id: (optional) returned in the response
+
+Response:
+
+  - ok: (bool)
+  - result: (str) output, for `check` the diff (empty if OK)
+  - error: (str) error message if not ok
+  - cached: (bool) result was taken from the cache
+
+Requests are executed by a pool of worker processes that keep modules
+and data (i.e. the AST type map) loaded. Results of recent requests
+are kept in a LRU cache.
+
+The op `shutdown` stops the server.
+"""
+
+import io
+import os
+import sys
+import stat
+import errno
+import json
+import hashlib
+import argparse
+import importlib
+import threading
+import socket
+import socketserver
+from collections import OrderedDict
+
+
+OPS = ('py2xml', 'xml2py', 'check', 'astview')
+
+
+def default_socket():
+    """path of socket: env PYREG_SOCKET or in the user runtime dir"""
+    path = os.environ.get('PYREG_SOCKET')
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR', '/tmp')
+    return os.path.join(runtime_dir, 'pyreg-{}.sock'.format(os.getuid()))
+
+
+
+# converters keep state in module and class attributes (i.e.
+# `AstNodeX.tokens`), only one conversion per process at a time
+_execute_lock = threading.Lock()
+
+def execute(op, source, filename, options):
+    """execute a request, executed in a worker process
+
+    Requests executed by threads of the same process are serialized.
+    :return: (str) result
+    """
+    with _execute_lock:
+        return _execute(op, source, filename, options)
+
+def _execute(op, source, filename, options):
+    from .py2xml import py2xml, xml2py
+    if op == 'py2xml':
+        return py2xml(fromstring=source, **options)
+    if op == 'xml2py':
+        return xml2py(fromstring=source)
+    if op == 'check':
+        import difflib
+        roundtriped = xml2py(fromstring=py2xml(fromstring=source, **options))
+        diff = difflib.unified_diff(
+            source.splitlines(), roundtriped.splitlines(),
+            lineterm='', fromfile=filename)
+        return ''.join(line + '\n' for line in diff)
+    if op == 'astview':
+        from .astview import AstNode, ast2html
+        tree = AstNode.tree(io.StringIO(source), filename)
+        fmt = options.get('format', 'html')
+        if fmt == 'html':
+            return ast2html(filename, tree)
+        if fmt == 'map':
+            return ''.join(line + '\n' for line in tree.to_map())
+        if fmt == 'txt':
+            return tree.to_text() + '\n'
+        raise ValueError('Invalid astview format: {}'.format(fmt))
+    raise ValueError('Invalid op: {}'.format(op))
+
+
+def _warm_up():
+    """worker initializer, import modules used by `execute`,
+    load the ASDL map and the HTML templates
+    """
+    importlib.import_module('.py2xml', __package__)
+    from .astview import init_html
+    from .jinja_env import get_env
+    get_env().get_template('ast.html')
+    try:
+        init_html()
+    except OSError: # no ASDL map for this python version
+        pass
+
+
+
+class ResultCache:
+    """thread-safe LRU cache"""
+
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if not self.size:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """handle JSON-lines requests of a connection"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            request = None
+            try:
+                request = json.loads(line.decode('utf-8'))
+                if request.get('op') == 'shutdown':
+                    response = {'ok': True}
+                    threading.Thread(target=self.server.shutdown).start()
+                else:
+                    response = self.server.process(request)
+            except Exception as exception:
+                response = {'ok': False, 'error': '{}: {}'.format(
+                    exception.__class__.__name__, exception)}
+            if isinstance(request, dict) and 'id' in request:
+                response['id'] = request['id']
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+def remove_stale_socket(socket_path):
+    """remove socket file left by a server that is not running
+
+    :raise FileExistsError: if path exists and is not a socket
+    :raise OSError: (EADDRINUSE) if a server is listening on the socket
+    """
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, 'File exists and is not a socket',
+                              socket_path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except ConnectionRefusedError:
+        os.unlink(socket_path)
+        return
+    finally:
+        sock.close()
+    raise OSError(errno.EADDRINUSE, 'Server already running', socket_path)
+
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server executing requests on a process pool"""
+    daemon_threads = True
+
+    def __init__(self, socket_path, workers=2, cache_size=256):
+        remove_stale_socket(socket_path)
+        super().__init__(socket_path, RequestHandler)
+        self.socket_path = socket_path
+        from concurrent.futures import ProcessPoolExecutor
+        self.pool = ProcessPoolExecutor(workers, initializer=_warm_up) \
+            if sys.version_info >= (3, 7) else ProcessPoolExecutor(workers)
+        self.cache = ResultCache(cache_size)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def process(self, request):
+        """:return: response dict"""
+        op = request.get('op')
+        if op not in OPS:
+            raise ValueError('Invalid op: {}'.format(op))
+        options = request.get('options') or {}
+        source = request.get('source')
+        filename = request.get('path') or '<str>'
+        if source is None:
+            with open(request['path'], 'rb') as fp:
+                data = fp.read()
+            if op == 'xml2py':
+                source = data.decode('utf-8')
+            else:
+                from .py2xml import _decode_source
+                source = _decode_source(data)
+
+        key = (op, filename, json.dumps(options, sort_keys=True),
+               hashlib.sha256(source.encode('utf-8')).digest())
+        result = self.cache.get(key)
+        if result is not None:
+            return {'ok': True, 'result': result, 'cached': True}
+        result = self.pool.submit(execute, op, source, filename,
+                                  options).result()
+        self.cache.put(key, result)
+        return {'ok': True, 'result': result, 'cached': False}
+
+
+
+class Client:
+    """connection to a running server"""
+
+    def __init__(self, socket_path=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path or default_socket())
+        self.rfile = self.sock.makefile('rb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+    def request(self, op, source=None, path=None, **options):
+        """send request and wait for response
+        :return: response dict
+        """
+        request = {'op': op, 'options': options}
+        if source is not None:
+            request['source'] = source
+        if path is not None:
+            request['path'] = os.path.abspath(path)
+        self.sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        return json.loads(self.rfile.readline().decode('utf-8'))
+
+
+
+def main(args=None):
+    """command line: `serve` to start the daemon, others are clients"""
+    description = """pyRegurgitator daemon and client.
+Client commands `py2xml` and `astview` take the same basic arguments
+as the stand-alone programs."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--socket', dest='socket', default=None,
+        help='path of Unix socket. Default: $PYREG_SOCKET or '
+        '$XDG_RUNTIME_DIR/pyreg-UID.sock')
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help='start daemon')
+    serve_parser.add_argument(
+        '-j', '--jobs', dest='jobs', type=int, default=2,
+        help='number of worker processes (default: %(default)s)')
+    serve_parser.add_argument(
+        '--cache-size', dest='cache_size', type=int, default=256,
+        help='number of results kept in cache (default: %(default)s)')
+
+    py2xml_parser = subparsers.add_parser('py2xml', help='convert module')
+    py2xml_parser.add_argument('-r', '--reverse', dest='reverse',
+                               action='store_true')
+    py2xml_parser.add_argument('-c', '--check', dest='check',
+                               action='store_true')
+    py2xml_parser.add_argument('--engine', dest='engine',
+                               choices=('token', 'pos'), default=None)
+    py2xml_parser.add_argument('py_file', metavar='MODULE', nargs='?')
+
+    astview_parser = subparsers.add_parser('astview', help='AST of module')
+    astview_parser.add_argument('-f', '--format', dest='format',
+                                choices=('html', 'map', 'txt'),
+                                default='html')
+    astview_parser.add_argument('py_file', metavar='MODULE', nargs='?')
+
+    subparsers.add_parser('shutdown', help='stop daemon')
+
+    args = parser.parse_args(args)
+    socket_path = args.socket or default_socket()
+
+    if args.command == 'serve':
+        try:
+            server = Server(socket_path, args.jobs, args.cache_size)
+        except OSError as exception:
+            print(exception, file=sys.stderr)
+            sys.exit(2)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt: # pragma: no cover
+            pass
+        finally:
+            server.server_close()
+        return
+    if args.command is None:
+        parser.error('command is required')
+
+    # client
+    options = {}
+    if args.command == 'shutdown':
+        op = 'shutdown'
+    elif args.command == 'astview':
+        op = 'astview'
+        options['format'] = args.format
+    else:
+        op = 'xml2py' if args.reverse else 'check' if args.check else 'py2xml'
+        if args.engine and not args.reverse:
+            options['engine'] = args.engine
+    source = None
+    if op != 'shutdown' and not args.py_file:
+        source = sys.stdin.buffer.read().decode('utf-8')
+    with Client(socket_path) as client:
+        response = client.request(op, source,
+                                  getattr(args, 'py_file', None), **options)
+    if not response['ok']:
+        print(response['error'], file=sys.stderr)
+        sys.exit(2)
+    sys.stdout.buffer.write(response.get('result', '').encode('utf-8'))
+    if op == 'check' and response['result']:
+        sys.exit(1)
+
+
+if __name__ == "__main__": # pragma: no cover
+    main()
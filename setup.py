@@ -34,6 +34,8 @@ setup(name = 'pyRegurgitator',
             'asdlview = pyreg.asdlview:asdl_view',
             'astview = pyreg.astview:ast_view',
             'py2xml = pyreg.py2xml:main',
+            'py2xml-batch = pyreg.py2xml_batch:main',
+            'pyreg = pyreg.serve:main',
             ]
         },
       )
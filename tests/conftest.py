@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from pyreg import jinja_env
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_dir(tmpdir_factory):
+    """jinja bytecode cache in a temporary dir, not in user home"""
+    old = os.environ.get('PYREG_CACHE_DIR')
+    os.environ['PYREG_CACHE_DIR'] = str(tmpdir_factory.mktemp('cache'))
+    jinja_env._env = None
+    yield
+    if old is None:
+        del os.environ['PYREG_CACHE_DIR']
+    else:
+        os.environ['PYREG_CACHE_DIR'] = old
+    jinja_env._env = None
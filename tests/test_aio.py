@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyreg import aio
+from pyreg.py2xml import py2xml
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """count submitted jobs, jobs wait for `release` to be set"""
+    def __init__(self):
+        super().__init__(2)
+        self.submitted = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+        def wait_and_run():
+            self.release.wait(5)
+            return fn(*args, **kwargs)
+        return super().submit(wait_and_run)
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine) \
+        if not hasattr(asyncio, 'run') else asyncio.run(coroutine)
+
+
+@pytest.fixture
+def executor():
+    executor = CountingExecutor()
+    yield executor
+    executor.release.set()
+    executor.shutdown()
+
+
+class TestConverter:
+    def test_convert_reverse(self, executor):
+        converter = aio.Converter(executor)
+        async def main():
+            xml = await converter.convert('x = 1\n')
+            return xml, await converter.reverse(xml)
+        xml, source = run(main())
+        assert xml == py2xml(fromstring='x = 1\n')
+        assert source == 'x = 1\n'
+
+    def test_cache(self, executor):
+        converter = aio.Converter(executor)
+        async def main():
+            await converter.convert('x = 1\n')
+            await converter.convert('x = 1\n')
+            await converter.convert('x = 2\n')
+        run(main())
+        assert executor.submitted == 2
+
+    def test_concurrent_same_content(self, executor):
+        converter = aio.Converter(executor)
+        async def main():
+            return await asyncio.gather(
+                *[converter.convert('x = 1\n') for _ in range(5)])
+        results = run(main())
+        assert len(set(results)) == 1
+        assert executor.submitted == 1
+
+    def test_max_concurrency(self, executor):
+        converter = aio.Converter(executor, max_concurrency=1)
+        async def main():
+            executor.release.clear()
+            tasks = [asyncio.ensure_future(converter.convert(str(num)))
+                     for num in range(3)]
+            await asyncio.sleep(0.05)
+            submitted = executor.submitted
+            executor.release.set()
+            await asyncio.gather(*tasks)
+            return submitted
+        assert run(main()) == 1
+        assert executor.submitted == 3
+
+    def test_thread_executor(self):
+        sources = [''.join('x{} = ({},\n {})\n'.format(num, line, num)
+                           for line in range(200))
+                   for num in range(8)]
+        with ThreadPoolExecutor(4) as executor:
+            converter = aio.Converter(executor, max_concurrency=4)
+            async def main():
+                return await asyncio.gather(
+                    *[converter.convert(source) for source in sources])
+            results = run(main())
+        assert results == [py2xml(fromstring=source) for source in sources]
+
+    def test_error(self, executor):
+        converter = aio.Converter(executor)
+        with pytest.raises(SyntaxError):
+            run(converter.convert('def ('))
+        assert not converter._pending
+
+    def test_cancel(self, executor):
+        converter = aio.Converter(executor, max_concurrency=1)
+        async def main():
+            executor.release.clear()
+            first = asyncio.ensure_future(converter.convert('a'))
+            second = asyncio.ensure_future(converter.convert('b'))
+            other = asyncio.ensure_future(converter.convert('b'))
+            await asyncio.sleep(0.05)
+            second.cancel()
+            await asyncio.sleep(0)
+            # `other` still waiting for the same conversion
+            assert not other.done()
+            other.cancel()
+            await asyncio.sleep(0.01)
+            executor.release.set()
+            await first
+            with pytest.raises(asyncio.CancelledError):
+                await other
+        run(main())
+        # conversion of `b` was cancelled before being submitted
+        assert executor.submitted == 1
+        assert not converter._pending
+
+
+class TestClose:
+    def test_keep_caller_executor(self, executor):
+        converter = aio.Converter(executor)
+        converter.close()
+        assert run(converter.convert('x')) == py2xml(fromstring='x')
+        # configure() closes the previous converter
+        aio.configure(executor)
+        aio.configure()
+        assert executor.submit(lambda: 1).result() == 1
+
+    def test_own_executor(self):
+        converter = aio.Converter()
+        executor = converter.executor
+        converter.close()
+        with pytest.raises(RuntimeError):
+            executor.submit(int)
+
+
+class TestModuleApi:
+    def test_configure(self, executor):
+        converter = aio.configure(executor)
+        assert aio.get_converter() is converter
+        assert run(aio.convert('x')) == py2xml(fromstring='x')
@@ -1,6 +1,8 @@
 import os
 
-from pyreg.astview import ast_view
+import pytest
+
+from pyreg.astview import AstNode, ast_view, ast2html, iter_ast2html
 
 SAMPLE = os.path.join(os.path.dirname(__file__), 'sample.py')
 
@@ -40,3 +42,59 @@ def test_html(capsys):
             </tr>
 """
     assert expected in out
+
+
+def test_html_chunks():
+    with open(SAMPLE) as fp:
+        tree = AstNode.tree(fp, SAMPLE)
+    chunks = list(iter_ast2html(SAMPLE, tree))
+    assert len(chunks) > 10
+    assert ''.join(chunks) == ast2html(SAMPLE, tree)
+    assert ''.join(tree.iter_html()) == tree.to_html()
+
+
+def _stmt_lines(source):
+    import io
+    tree = AstNode.tree(io.StringIO(source), '<str>')
+    return [sorted(n.line_nums) for n in tree.fields['body'].value]
+
+def test_line_nums_expression():
+    assert [[1, 2]] == _stmt_lines("mm = 5 + \\\n    9\n")
+
+def test_line_nums_multiline_string():
+    source = 'x = 1\ns = """a\nb\n"""\n'
+    assert [[1], [2, 3, 4]] == _stmt_lines(source)
+
+def test_line_nums_docstring():
+    assert [[1, 2, 3]] == _stmt_lines('"""doc\nstring\n"""\n')
+
+def test_line_nums_nested_statement():
+    source = "if (a and\n    b):\n    c = 1\n"
+    assert [[1, 2]] == _stmt_lines(source)
+
+
+def test_map_list_of_values():
+    import io
+    tree = AstNode.tree(io.StringIO("def f():\n    global a, b\n"), '<str>')
+    lines = list(tree.iter_map())
+    assert ".body[0].body[0].names[0] => 'a'" in lines
+    assert lines == tree.to_map()
+
+def test_text_chunks():
+    with open(SAMPLE) as fp:
+        tree = AstNode.tree(fp, SAMPLE)
+    chunks = list(tree.iter_text())
+    assert len(chunks) > 10
+    assert ''.join(chunks).startswith('Module(body=[Assign(')
+
+
+def test_multiple_formats(capsys, tmpdir):
+    ast_view(['--format', 'map,txt', '-o', str(tmpdir), SAMPLE])
+    ast_view(['--format', 'map', SAMPLE])
+    assert tmpdir.join('sample.py.map').read() == capsys.readouterr()[0]
+    ast_view(['--format', 'txt', SAMPLE])
+    assert tmpdir.join('sample.py.txt').read() == capsys.readouterr()[0]
+
+def test_multiple_formats_no_output():
+    with pytest.raises(SystemExit):
+        ast_view(['--format', 'map,txt', SAMPLE])
@@ -0,0 +1,84 @@
+import os
+import json
+
+import pytest
+
+from pyreg.astview import AstNode, ast_view
+from pyreg.astview_chunked import write_chunked
+
+
+SOURCE = '''import os
+
+def foo(a):
+    return os.path.join(a, 'x')
+
+class Bar:
+    y = 2
+'''
+
+@pytest.fixture
+def module(tmpdir):
+    path = tmpdir.join('mod.py')
+    path.write(SOURCE)
+    return str(path)
+
+def _fragment_html(path):
+    with open(path) as fp:
+        js = fp.read()
+    assert js.startswith('pyregFragment(')
+    return json.loads(js.split(', ', 1)[1][:-3])
+
+
+class TestWriteChunked(object):
+    def test_page(self, module, tmpdir):
+        with open(module) as fp:
+            tree = AstNode.tree(fp, module)
+        page = write_chunked(module, tree, str(tmpdir.join('out')))
+        assert str(tmpdir.join('out', 'mod.py.html')) == page
+        with open(page) as fp:
+            html = fp.read()
+        assert 'id="node2"' in html
+        assert 'pyregExpand(2)' in html
+        assert '"mod.py.fragments"' in html
+        # statement source lines are on the page, sub-nodes are not
+        assert '3: def foo(a):' in html
+        assert 'return os.path.join' not in html
+
+    def test_fragments(self, module, tmpdir):
+        with open(module) as fp:
+            tree = AstNode.tree(fp, module)
+        out = str(tmpdir.join('out'))
+        write_chunked(module, tree, out)
+        fragments = tmpdir.join('out', 'mod.py.fragments')
+        assert ['0.js', '1.js', '2.js'] == sorted(os.listdir(str(fragments)))
+        html = _fragment_html(str(fragments.join('1.js')))
+        assert html == tree.fields['body'].value[1].to_html()
+        assert 'return os.path.join' in html
+
+    def test_workers(self, module, tmpdir):
+        with open(module) as fp:
+            tree = AstNode.tree(fp, module)
+        write_chunked(module, tree, str(tmpdir.join('serial')))
+        write_chunked(module, tree, str(tmpdir.join('parallel')), workers=2)
+        for index in range(3):
+            name = os.path.join('mod.py.fragments', '{}.js'.format(index))
+            assert (tmpdir.join('serial', name).read() ==
+                    tmpdir.join('parallel', name).read())
+
+    def test_remove_old_fragments(self, module, tmpdir):
+        fragments = tmpdir.join('out', 'mod.py.fragments')
+        fragments.ensure('7.js')
+        with open(module) as fp:
+            tree = AstNode.tree(fp, module)
+        write_chunked(module, tree, str(tmpdir.join('out')))
+        assert not fragments.join('7.js').exists()
+
+
+def test_cmd(module, tmpdir):
+    ast_view(['--chunked', '-o', str(tmpdir.join('out')), module])
+    assert tmpdir.join('out', 'mod.py.html').exists()
+    assert tmpdir.join('out', 'mod.py.fragments', '2.js').exists()
+
+def test_cmd_requires_output(module):
+    with pytest.raises(SystemExit):
+        ast_view(['--chunked', module])
@@ -0,0 +1,53 @@
+import io
+import os
+
+from pyreg.astview import AstNode, ast_view, ast2html
+from pyreg.astview_compact import iter_compact, iter_compact_html
+
+
+HERE = os.path.dirname(__file__)
+SAMPLE2 = os.path.join(HERE, '..', 'samples', 'sample2.py')
+
+def _tree(source):
+    return AstNode.tree(io.StringIO(source), '<str>')
+
+
+class TestIterCompact(object):
+    def test_stmt(self):
+        tree = _tree('x = 1\n')
+        html = ''.join(iter_compact(tree))
+        # end positions on python3.8+
+        if dict(tree.fields['body'].value[0].attrs).get('end_lineno'):
+            position = '<i title="line,column-end_line,end_column">1,0-1,5</i>'
+        else:
+            position = '<i title="line,column">1,0</i>'
+        assert html.startswith(
+            '<details open><summary><b>Module</b></summary><ul><li>body: '
+            '<ol start="0"><li><details open class="s"><summary>'
+            '<b>Assign</b> ' + position + '</summary>'
+            '<pre>1: x = 1</pre>')
+
+    def test_leaf_node(self):
+        html = ''.join(iter_compact(_tree('x = 1\n')))
+        assert '<li>ctx: <b>Store</b>' in html
+
+    def test_escape(self):
+        html = ''.join(iter_compact(_tree('x = "<b>"\n')))
+        assert '<pre>1: x = "&lt;b&gt;"</pre>' in html
+        assert "<code>'&lt;b&gt;'</code>" in html
+
+    def test_empty_list(self):
+        html = ''.join(iter_compact(_tree('def f(): pass\n')))
+        assert '<li>decorator_list: []' in html
+
+
+def test_smaller():
+    with open(SAMPLE2) as fp:
+        tree = AstNode.tree(fp, 'sample2.py')
+    compact = ''.join(iter_compact_html('sample2.py', tree))
+    assert len(compact) * 3 < len(ast2html('sample2.py', tree))
+
+
+def test_cmd(capsys):
+    ast_view(['--compact', os.path.join(HERE, 'sample.py')])
+    assert '<b>BinOp</b>' in capsys.readouterr()[0]
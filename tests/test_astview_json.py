@@ -0,0 +1,115 @@
+import io
+import os
+import ast
+import json
+
+import pytest
+
+from pyreg.astview import AstNode, ast_view
+from pyreg import astview_json
+from pyreg.astview_json import tree2json, json2ast, load
+
+
+SOURCE = '''"""doc"""
+x = b'\\xff' + 1j + ...
+def f(a, *args, b=2):
+    global g
+    return [i for i in a if i]
+'''
+
+SAMPLE = os.path.join(os.path.dirname(__file__), 'sample.py')
+
+@pytest.fixture
+def no_map(monkeypatch):
+    # without ASDL info fields are in the python `_fields` order
+    monkeypatch.setattr(AstNode, 'MAP', {})
+
+def _tree(source):
+    return AstNode.tree(io.StringIO(source), '<str>')
+
+
+@pytest.mark.usefixtures('no_map')
+class TestTree2Json(object):
+    def test_nested(self):
+        data = json.loads(tree2json(_tree('x = 1\n')))
+        assert 'Module' == data['_type']
+        assign = data['body'][0]
+        assert 'Assign' == assign['_type']
+        assert 1 == assign['lineno']
+        assert {'_type': 'Store'} == assign['targets'][0]['ctx']
+
+    def test_field_order(self, monkeypatch):
+        monkeypatch.setattr(AstNode, 'MAP', {
+            'Assign': {'order': ['value', 'targets']}})
+        text = tree2json(_tree('x = 1\n'))
+        assert text.index('"value"') < text.index('"targets"')
+
+    def test_flat(self):
+        text = tree2json(_tree('x = 1\n'), flat=True)
+        lines = text.splitlines()
+        assert '[' == lines[0]
+        assert ']' == lines[-1]
+        nodes = json.loads(text)
+        assert 'Module' == nodes[-1]['_type']
+        assign = nodes[nodes[-1]['body'][0]['_node']]
+        assert 'Assign' == assign['_type']
+
+    def test_consts(self):
+        text = tree2json(_tree("b'\\xff', 1j, ...\n"))
+        assert '{"_const":"bytes","value":"\\u00ff"}' in text
+        assert '{"_const":"complex","value":[0.0,1.0]}' in text
+        # node on python < 3.8, constant on newer versions
+        assert '"Ellipsis"' in text
+
+
+@pytest.mark.usefixtures('no_map')
+class TestLoad(object):
+    @pytest.mark.parametrize('flat', [False, True])
+    def test_ast(self, flat):
+        tree = json2ast(tree2json(_tree(SOURCE), flat))
+        expected = ast.parse(SOURCE)
+        assert (ast.dump(expected, include_attributes=True) ==
+                ast.dump(tree, include_attributes=True))
+        compile(tree, '<str>', 'exec')
+
+    def test_astnode(self):
+        tree = _tree(SOURCE)
+        loaded = load(io.StringIO(tree2json(tree)))
+        assert isinstance(loaded, AstNode)
+        assert tree.to_text() == loaded.to_text()
+
+    def test_as_ast(self):
+        loaded = load(io.StringIO(tree2json(_tree('x = 1\n'))), as_ast=True)
+        assert isinstance(loaded, ast.Module)
+
+
+@pytest.mark.usefixtures('no_map')
+def test_cmd_json(capsys, tmpdir):
+    module = tmpdir.join('mod.py')
+    module.write('x = 1\n')
+    ast_view(['--format', 'json', str(module)])
+    assert 'Module' == json.loads(capsys.readouterr()[0])['_type']
+    ast_view(['--format', 'json', '--flat', str(module)])
+    assert 'Module' == json.loads(capsys.readouterr()[0])[-1]['_type']
+
+
+def test_cmd_json_missing_map(capsys, monkeypatch):
+    def load_map(cls):
+        raise FileNotFoundError('python99.asdl.json')
+    monkeypatch.setattr(AstNode, 'MAP', None)
+    monkeypatch.setattr(AstNode, 'load_map', classmethod(load_map))
+    monkeypatch.setattr(astview_json, '_no_map', False)
+    ast_view(['--format', 'json', SAMPLE])
+    tree = json2ast(capsys.readouterr()[0])
+    with open(SAMPLE) as fp:
+        expected = ast.parse(fp.read())
+    assert ast.dump(expected) == ast.dump(tree)
+
+
+def test_cmd_json_sample(capsys):
+    # uses the ASDL map of running python, if available
+    ast_view(['--format', 'json', '--flat', SAMPLE])
+    tree = json2ast(capsys.readouterr()[0])
+    with open(SAMPLE) as fp:
+        expected = ast.parse(fp.read())
+    assert ast.dump(expected) == ast.dump(tree)
@@ -0,0 +1,92 @@
+import os
+import threading
+from urllib.request import urlopen
+from urllib.error import HTTPError
+
+import pytest
+
+from pyreg.astview_server import TreeCache, Server
+
+
+@pytest.fixture
+def module(tmpdir):
+    path = tmpdir.join('mod.py')
+    path.write('x = 1\n')
+    return str(path)
+
+
+class TestTreeCache(object):
+    def test_cached(self, module):
+        cache = TreeCache()
+        tree = cache.get(module)
+        assert 'Module' == tree.class_
+        assert tree is cache.get(module)
+
+    def test_changed(self, module):
+        cache = TreeCache()
+        tree = cache.get(module)
+        with open(module, 'w') as fp:
+            fp.write('x = 2\ny = 3\n')
+        os.utime(module, ns=(0, 1))
+        new = cache.get(module)
+        assert new is not tree
+        assert 2 == len(new.fields['body'].value)
+
+    def test_same_content(self, module):
+        cache = TreeCache()
+        tree = cache.get(module)
+        os.utime(module, ns=(0, 1))
+        assert tree is cache.get(module)
+
+    def test_max_nodes(self, tmpdir, module):
+        # 'x = 1' has 5 nodes: Module, Assign, Name, Store, Num/Constant
+        other = tmpdir.join('other.py')
+        other.write('y = 1\n')
+        cache = TreeCache(max_nodes=8)
+        cache.get(module)
+        cache.get(str(other))
+        assert 1 == len(cache)
+        assert 5 == cache.nodes
+
+
+@pytest.fixture
+def server(tmpdir, module):
+    tmpdir.join('pkg').ensure('sub.py').write('def f(a):\n    return a\n')
+    tmpdir.join('.hidden').ensure('h.py')
+    server = Server(str(tmpdir), ('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+def _get(url):
+    return urlopen(url).read().decode('utf-8')
+
+
+class TestServer(object):
+    def test_index(self, server):
+        html = _get(server + '/')
+        assert '<a href="/view/mod.py">mod.py</a>' in html
+        assert '/view/pkg/sub.py' in html
+        assert 'h.py' not in html
+
+    def test_view(self, server):
+        html = _get(server + '/view/pkg/sub.py')
+        assert '<details data-path=".body[0]" class="s">' in html
+        assert '1: def f(a):' in html
+        assert 'return a' not in html
+
+    def test_node(self, server):
+        html = _get(server + '/node/pkg/sub.py?path=.body%5B0%5D')
+        assert html.startswith('<ul><li>name: <code>')
+        assert 'data-path=".body[0].body[0]"' in html
+
+    @pytest.mark.parametrize('path', [
+        '/view/nope.py', '/view/../mod.py', '/node/mod.py?path=.body[9]',
+        '/node/mod.py?path=.foo', '/other'])
+    def test_not_found(self, server, path):
+        with pytest.raises(HTTPError) as exc_info:
+            urlopen(server + path)
+        assert 404 == exc_info.value.code
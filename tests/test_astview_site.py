@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from pyreg.astview import ast_view
+from pyreg.astview_site import build_site
+
+
+@pytest.fixture
+def src(tmpdir):
+    src = tmpdir.mkdir('src')
+    src.join('mod.py').write('x = 1\n')
+    src.mkdir('pkg').join('sub.py').write('def f(a):\n    return a\n')
+    return src
+
+
+class TestBuildSite(object):
+    def test_pages(self, src, tmpdir):
+        out = tmpdir.join('out')
+        summary = build_site(str(src), str(out), workers=1)
+        assert ['mod.py', 'pkg/sub.py'] == summary['rendered']
+        assert out.join('_static', 'ast.css').exists()
+        page = out.join('pkg', 'sub.py.html').read()
+        assert 'href="../_static/ast.css"' in page
+        assert '<style' not in page
+        index = out.join('index.html').read()
+        assert '<a href="pkg/sub.py.html">pkg/sub.py</a>' in index
+
+    def test_skip_unchanged(self, src, tmpdir):
+        out = str(tmpdir.join('out'))
+        build_site(str(src), out, workers=1)
+        src.join('mod.py').write('x = 2\n')
+        summary = build_site(str(src), out, workers=1)
+        assert ['mod.py'] == summary['rendered']
+        assert ['pkg/sub.py'] == summary['skipped']
+
+    def test_mode_changed(self, src, tmpdir):
+        out = tmpdir.join('out')
+        build_site(str(src), str(out), workers=1)
+        summary = build_site(str(src), str(out), workers=1, mode='compact')
+        assert 2 == len(summary['rendered'])
+        assert 'ast_compact.css' in out.join('mod.py.html').read()
+
+    def test_removed(self, src, tmpdir):
+        out = tmpdir.join('out')
+        build_site(str(src), str(out), workers=1)
+        src.join('mod.py').remove()
+        summary = build_site(str(src), str(out), workers=1)
+        assert ['mod.py'] == summary['removed']
+        assert not out.join('mod.py.html').exists()
+        assert 'mod.py' not in out.join('index.html').read()
+
+    def test_error(self, src, tmpdir):
+        out = tmpdir.join('out')
+        src.join('bad.py').write('x = (\n')
+        summary = build_site(str(src), str(out), workers=2)
+        assert [str(src.join('bad.py'))] == \
+            [result.path for result in summary['errors']]
+        assert 2 == len(summary['rendered'])
+        assert not out.join('bad.py.html').exists()
+        assert os.listdir(str(out.join('_static')))
+
+    def test_error_after_rendered(self, src, tmpdir):
+        out = tmpdir.join('out')
+        build_site(str(src), str(out), workers=1)
+        assert out.join('mod.py.html').exists()
+        src.join('mod.py').write('x = (\n')
+        summary = build_site(str(src), str(out), workers=1)
+        assert 1 == len(summary['errors'])
+        assert not out.join('mod.py.html').exists()
+        assert 'mod.py' not in out.join('index.html').read()
+
+
+def test_cmd(src, tmpdir, capsys):
+    out = str(tmpdir.join('out'))
+    with pytest.raises(SystemExit) as exc_info:
+        ast_view(['--site', str(src), '-o', out])
+    assert 0 == exc_info.value.code
+    assert 'rendered mod.py\n' in capsys.readouterr()[0]
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from pyreg import jinja_env
+
+
+@pytest.fixture
+def fresh_env(monkeypatch):
+    """force creation of a new environment"""
+    monkeypatch.setattr(jinja_env, '_env', None)
+
+
+class TestCacheDir:
+    def test_env_var(self, monkeypatch):
+        monkeypatch.setenv('PYREG_CACHE_DIR', '/x')
+        assert jinja_env.cache_dir() == os.path.join('/x', 'jinja')
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setenv('PYREG_CACHE_DIR', '')
+        assert jinja_env.cache_dir() is None
+
+    def test_xdg(self, monkeypatch):
+        monkeypatch.delenv('PYREG_CACHE_DIR', raising=False)
+        monkeypatch.setenv('XDG_CACHE_HOME', '/c')
+        assert jinja_env.cache_dir() == os.path.join('/c', 'pyreg', 'jinja')
+
+
+class TestGetEnv:
+    def test_single_env(self, fresh_env, monkeypatch):
+        monkeypatch.setenv('PYREG_CACHE_DIR', '')
+        env = jinja_env.get_env()
+        assert jinja_env.get_env() is env
+        assert env.bytecode_cache is None
+        assert env.get_template('ast.html') is env.get_template('ast.html')
+
+    def test_bytecode_cache(self, fresh_env, monkeypatch, tmpdir):
+        monkeypatch.setenv('PYREG_CACHE_DIR', str(tmpdir))
+        jinja_env.get_env().get_template('ast_node.html')
+        assert tmpdir.join('jinja').listdir()
@@ -3,7 +3,8 @@ import xml.etree.ElementTree as ET
 
 import pytest
 
-from pyreg.py2xml import pos_byte2str, py2xml
+from pyreg.py2xml import pos_byte2str, py2xml, TEXT_NODES_AVOIDED
+from pyreg.py2xml import py2dom, dom_events, iter_events
 
 
 class TestFixUnicodeColumnPosition:
@@ -27,6 +28,52 @@ def s2xml(string):
 
 
 
+class TestTextNodes:
+    def test_empty_and_merged_text(self):
+        assert s2xml('class A: pass') == \
+            '<ClassDef name="A">class A:<body> <Pass>pass</Pass></body>'\
+            '</ClassDef>'
+        assert TEXT_NODES_AVOIDED['empty'] > 0
+        assert TEXT_NODES_AVOIDED['merged'] > 0
+
+
+
+class TestEvents:
+    SOURCE = '# comment\ndef f(a):\n    return a\n\nx = 1 # one\n'
+
+    @staticmethod
+    def merge_text(events):
+        """merge consecutive text events"""
+        result = []
+        for event in events:
+            if event[0] == 'text' and result and result[-1][0] == 'text':
+                result[-1] = ('text', result[-1][1] + event[1], None)
+            else:
+                result.append(event)
+        return result
+
+    def test_same_as_dom(self):
+        events = list(iter_events(fromstring=self.SOURCE))
+        dom = py2dom(fromstring=self.SOURCE)
+        assert self.merge_text(events) == list(dom_events(dom))
+
+    def test_text(self):
+        events = list(iter_events(fromstring=self.SOURCE))
+        text = ''.join(value for event, value, _ in events
+                       if event == 'text')
+        assert text == self.SOURCE
+
+    def test_events(self):
+        assert list(iter_events(fromstring='pass')) == [
+            ('start', 'Module', {}),
+            ('start', 'Pass', {}),
+            ('text', 'pass', None),
+            ('end', 'Pass', None),
+            ('end', 'Module', None),
+            ]
+
+
+
 class TestSimpleExpressions:
     def test_num(self):
         assert s2xml('6') == '<Expr><Num>6</Num></Expr>'
@@ -44,8 +91,9 @@ class TestSimpleExpressions:
     def test_str_multiline(self):
         string = '''"""line 1
 line 2""" '''
+        # trailing space is kept, required to get back the same source
         assert s2xml(string) == \
-            '<Expr><Str><s>"""line 1\nline 2"""</s></Str></Expr>'
+            '<Expr><Str><s>"""line 1\nline 2"""</s></Str></Expr> '
 
 
     def test_str_implicit_concat(self):
@@ -1317,3 +1365,12 @@ class TestBugs:
             '<Str><s>"-"</s></Str></args>)</Call></Expr>'
 
 
+
+    def test_par_method_chain(self):
+        assert s2xml('(a.b().c)[0]') == \
+            '<Expr><Subscript ctx="Load"><value>(<Attribute ctx="Load">'\
+            '<value><Call><func><Attribute ctx="Load"><value>'\
+            '<Name ctx="Load" name="a">a</Name></value>.<attr>b</attr>'\
+            '</Attribute></func>()</Call></value>.<attr>c</attr>'\
+            '</Attribute>)</value><slice>[<Index><Num>0</Num></Index>]'\
+            '</slice></Subscript></Expr>'
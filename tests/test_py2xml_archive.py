@@ -0,0 +1,86 @@
+import sys
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from pyreg.py2xml import py2xml, main
+from pyreg.py2xml_archive import (
+    archive_type, ArchiveWriter, ArchiveReader, batch2archive, MANIFEST)
+
+
+class TestArchiveType:
+    @pytest.mark.parametrize('path, kind', [
+        ('out.zip', 'zip'),
+        ('out.tar', 'tar'),
+        ('out.tar.gz', 'tar:gz'),
+        ('out.tgz', 'tar:gz'),
+        ('out.tar.xz', 'tar:xz'),
+        ('out', None),
+        ])
+    def test_type(self, path, kind):
+        assert archive_type(path) == kind
+
+    def test_unsupported(self, tmpdir):
+        with pytest.raises(ValueError):
+            ArchiveWriter(str(tmpdir.join('out.rar')))
+
+
+class TestArchive:
+    @pytest.mark.parametrize('ext', ['zip', 'tar', 'tar.gz', 'tar.xz'])
+    def test_read_write(self, tmpdir, ext):
+        path = str(tmpdir.join('out.' + ext))
+        with ArchiveWriter(path) as writer:
+            writer.add('a.py', 'a.py.xml', b'<Module>x</Module>', 'ha')
+            writer.add('b/c.py', 'b/c.py.xml', memoryview(b'<Module/>'), 'hc')
+        with ArchiveReader(path) as reader:
+            assert reader.read('b/c.py') == b'<Module/>'
+            assert reader.xml2py('a.py') == 'x'
+            assert reader.members['a.py']['sha256'] == 'ha'
+            with pytest.raises(KeyError):
+                reader.read('x.py')
+
+    def test_manifest_offset(self, tmpdir):
+        path = str(tmpdir.join('out.tar'))
+        with ArchiveWriter(path) as writer:
+            writer.add('a.py', 'a.py.xml', b'<Module>x</Module>', 'ha')
+        with tarfile.open(path) as tar:
+            manifest = json.loads(tar.extractfile(MANIFEST).read().decode())
+            entry = manifest['members'][0]
+            assert entry['offset'] == tar.getmember('a.py.xml').offset_data
+            assert entry['size'] == 18
+
+    def test_zip_manifest_last(self, tmpdir):
+        path = str(tmpdir.join('out.zip'))
+        with ArchiveWriter(path) as writer:
+            writer.add('a.py', 'a.py.xml', b'<Module>x</Module>', 'ha')
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ['a.py.xml', MANIFEST]
+            info = archive.getinfo('a.py.xml')
+            manifest = json.loads(archive.read(MANIFEST).decode())
+            assert manifest['members'][0]['offset'] == info.header_offset
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8),
+                    reason='shared_memory requires python3.8+')
+class TestBatch2Archive:
+    def test_batch(self, tmpdir):
+        src = tmpdir.mkdir('src')
+        src.join('a.py').write('x = 1\n')
+        src.join('bad.py').write('def (\n')
+        path = str(tmpdir.join('out.tar.gz'))
+        files = [str(src.join('a.py')), str(src.join('bad.py'))]
+        errors = batch2archive(files, path, str(src), workers=1)
+        assert [e.path for e in errors] == files[1:]
+        with ArchiveReader(path) as reader:
+            assert list(reader.members) == ['a.py']
+            assert reader.read('a.py') == py2xml(files[0]).encode('utf8')
+
+    def test_reverse_cli(self, tmpdir, capsys):
+        src = tmpdir.mkdir('src')
+        src.join('a.py').write('x = 1\n')
+        path = str(tmpdir.join('out.zip'))
+        batch2archive([str(src.join('a.py'))], path, str(src), workers=1)
+        main(['--reverse', '--archive', path, 'a.py'])
+        assert capsys.readouterr().out == 'x = 1\n'
@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+
+import pytest
+
+from pyreg.py2xml import py2xml
+from pyreg.py2xml_batch import iter_batch, output_path, find_modules, main
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+@pytest.fixture
+def src_dir(tmpdir):
+    pkg = tmpdir.mkdir('src').mkdir('pkg')
+    pkg.join('a.py').write('x = 1\n')
+    pkg.join('b.py').write('def f():\n    return 2\n')
+    pkg.join('bad.py').write('def (\n')
+    pkg.join('data.txt').write('not python')
+    return tmpdir.join('src')
+
+
+class TestOutputPath:
+    def test_relative_to_root(self):
+        assert output_path('/src/pkg/a.py', 'out', '/src') == \
+            os.path.join('out', 'pkg', 'a.py.xml')
+
+    def test_no_root(self):
+        assert output_path('pkg/a.py', 'out', fmt='bin') == \
+            os.path.join('out', 'pkg', 'a.py.bin')
+
+    def test_outside_root(self):
+        with pytest.raises(ValueError):
+            output_path('/other/a.py', 'out', '/src')
+
+    def test_outside_out_dir(self):
+        with pytest.raises(ValueError):
+            output_path('../a.py', 'out')
+        with pytest.raises(ValueError):
+            output_path('pkg/../../a.py', 'out')
+
+
+class TestFindModules:
+    def test_find(self, src_dir):
+        found = find_modules([str(src_dir)])
+        assert [os.path.basename(p) for p in found] == \
+            ['a.py', 'b.py', 'bad.py']
+
+
+class TestBatch:
+    def test_out_dir(self, src_dir, tmpdir):
+        files = find_modules([str(src_dir)])
+        out_dir = str(tmpdir.join('out'))
+        results = [result for result, data in
+                   iter_batch(files, out_dir, str(src_dir), workers=2)]
+        assert [r.path for r in results] == files
+        assert results[2].error and results[2].output is None
+        xml_file = os.path.join(out_dir, 'pkg', 'a.py.xml')
+        assert results[0].output == xml_file
+        with open(xml_file) as fp:
+            assert fp.read() == py2xml(files[0])
+        assert results[0].size == os.path.getsize(xml_file)
+
+    @pytest.mark.skipif(sys.version_info < (3, 8),
+                        reason='shared_memory requires python3.8+')
+    def test_shared_memory(self, src_dir):
+        files = find_modules([str(src_dir)])
+        items = []
+        for result, data in iter_batch(files, workers=2):
+            items.append(bytes(data) if data is not None else None)
+        assert items[0] == py2xml(files[0]).encode('utf8')
+        assert items[1] == py2xml(files[1]).encode('utf8')
+        assert items[2] is None
+
+    @pytest.mark.skipif(sys.version_info < (3, 8),
+                        reason='shared_memory requires python3.8+')
+    def test_stop_early(self, src_dir):
+        files = find_modules([str(src_dir)])
+        shm_dir = '/dev/shm'
+        before = set(os.listdir(shm_dir)) if os.path.isdir(shm_dir) else None
+        results = iter_batch(files[:2] * 4, workers=2)
+        result, data = next(results)
+        results.close()
+        with pytest.raises(StopIteration):
+            next(results)
+        # segments of consumed and not consumed results are released
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=result.output)
+        if before is not None:
+            assert set(os.listdir(shm_dir)) == before
+
+    @pytest.mark.skipif(sys.version_info < (3, 8),
+                        reason='shared_memory requires python3.8+')
+    def test_stop_early_no_wait(self, tmpdir):
+        # each module takes ~0.2s to convert
+        module = tmpdir.join('big.py')
+        module.write(''.join(
+            'def f{0}(a, b=1):\n    return [x * {0} for x in a if x > b]\n'
+            .format(num) for num in range(300)))
+        results = iter_batch([str(module)] * 20, workers=1)
+        next(results)
+        begin = time.time()
+        results.close()
+        # remaining modules are not converted
+        assert time.time() - begin < 1
+
+
+class TestMain:
+    def test_exit_code(self, src_dir, tmpdir):
+        with pytest.raises(SystemExit) as exc_info:
+            main([str(src_dir), '-o', str(tmpdir.join('out')), '-j', '1',
+                  '--root', str(tmpdir)])
+        assert exc_info.value.code == 1
+        assert tmpdir.join('out', 'src', 'pkg', 'b.py.xml').check()
+
+    def test_outside_root(self, src_dir, tmpdir):
+        with pytest.raises(SystemExit) as exc_info:
+            main([str(src_dir), '-o', str(tmpdir.join('out')),
+                  '--root', str(tmpdir.join('other'))])
+        assert exc_info.value.code == 2
+        assert not tmpdir.join('out').check()
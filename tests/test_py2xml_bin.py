@@ -0,0 +1,61 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from pyreg.py2xml import py2xml, py2bin, xml2py
+from pyreg.py2xml_bin import BinTree, bin2etree, bin2py
+
+
+SOURCE = '''# comment
+def f(a, b=1):
+    """ä & <b>"""
+    return a < b
+
+x = []
+'''
+
+
+class TestBinFormat:
+    def test_same_tree_as_xml(self):
+        xml_root = ET.fromstring(py2xml(fromstring=SOURCE))
+        bin_root = bin2etree(py2bin(fromstring=SOURCE))
+        assert ET.tostring(bin_root) == ET.tostring(xml_root)
+
+    def test_source(self):
+        assert bin2py(py2bin(fromstring=SOURCE)) == SOURCE
+
+    def test_xml2py(self):
+        assert xml2py(fromstring=py2bin(fromstring=SOURCE)) == SOURCE
+
+    def test_xml2py_file(self, tmpdir):
+        bin_file = tmpdir.join('x.bin')
+        bin_file.write_binary(py2bin(fromstring=SOURCE))
+        assert xml2py(str(bin_file)) == SOURCE
+
+    def test_events(self):
+        tree = BinTree(py2bin(fromstring='pass'))
+        assert list(tree.iter_events()) == [
+            ('start', 'Module', {}),
+            ('start', 'Pass', {}),
+            ('text', 'pass', None),
+            ('end', 'Pass', None),
+            ('end', 'Module', None),
+            ]
+
+    def test_empty_element(self):
+        source = 'from . import x'
+        bin_root = bin2etree(py2bin(fromstring=source))
+        assert bin_root.find('ImportFrom').get('level') == '1'
+        assert bin_root.find('ImportFrom/module').text is None
+
+    def test_strings_interned(self):
+        tree = BinTree(py2bin(fromstring='a = b = c'))
+        assert tree.strings.count('Name') == 1
+        assert tree.strings.count('Store') == 1
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            BinTree(b'PYXX' + bytes(40))
+        data = py2bin(fromstring=SOURCE)
+        with pytest.raises(ValueError):
+            BinTree(data[:-1])
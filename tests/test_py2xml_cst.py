@@ -0,0 +1,89 @@
+import xml.etree.ElementTree as ET
+
+from pyreg.py2xml import py2xml, py2cst, iter_module
+from pyreg.py2xml_cst import CstNode
+
+
+SOURCE = '''# comment
+class A(object):
+    def foo(self, x):
+        """doc & <stuff>"""
+        return (x + 1) * 2
+
+    def bar(self):
+        pass
+'''
+
+
+def xml_items(xml):
+    """compare XML ignoring attribute order"""
+    return [(ele.tag, sorted(ele.items()), ele.text, ele.tail)
+            for ele in ET.fromstring(xml).iter()]
+
+
+class TestCstNode:
+    def test_text_tail(self):
+        root = CstNode('Module')
+        root.add_text('a')
+        child = root.appendChild(CstNode('Name', text='b'))
+        root.add_text('c')
+        root.add_text('d')
+        assert root.text == 'a'
+        assert child.tail == 'cd'
+        assert root.to_source() == 'abcd'
+
+    def test_attributes(self):
+        node = CstNode('Name')
+        assert node.get('ctx') is None
+        node.setAttribute('ctx', 'Load')
+        assert node.get('ctx') == 'Load'
+
+    def test_to_xml_escape(self):
+        root = CstNode('Str', text='"<&>"')
+        root.setAttribute('x', '"')
+        assert root.to_xml() == '<Str x="&quot;">"&lt;&amp;&gt;"</Str>'
+
+
+class TestPy2Cst:
+    def test_same_as_xml(self):
+        assert xml_items(py2cst(fromstring=SOURCE).to_xml()) == \
+            xml_items(py2xml(fromstring=SOURCE))
+
+    def test_to_source(self):
+        assert py2cst(fromstring=SOURCE).to_source() == SOURCE
+
+    def test_find(self):
+        root = py2cst(fromstring=SOURCE)
+        func = root.find('FunctionDef')
+        assert func.get('name') == 'foo'
+        assert [f.get('name') for f in root.findall('FunctionDef')] == \
+            ['foo', 'bar']
+        assert func.find('Return').to_source() == 'return (x + 1) * 2'
+        assert root.find('Lambda') is None
+
+    def test_parents(self):
+        root = py2cst(fromstring=SOURCE)
+        func = root.find('FunctionDef')
+        assert func.parent is None
+        root.link_parents()
+        assert func.parent.tag == 'body'
+        assert func.parent.parent.tag == 'ClassDef'
+
+    def test_edit(self):
+        root = py2cst(fromstring='x = 1\n')
+        root.find('Num').text = '2'
+        assert root.to_source() == 'x = 2\n'
+
+    def test_builder_restored(self):
+        py2cst(fromstring='x = 1')
+        assert py2xml(fromstring='x').startswith('<Module>')
+
+    def test_builder_per_conversion(self):
+        # a DOM conversion while a CST conversion is not finished
+        cst = iter_module(fromstring=SOURCE, cst=True)
+        next(cst)
+        assert py2xml(fromstring=SOURCE).startswith('<Module>')
+        for root in cst:
+            pass
+        assert isinstance(root, CstNode)
+        assert root.to_source() == SOURCE
@@ -0,0 +1,137 @@
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+from pyreg.py2xml import py2xml
+from pyreg.py2xml_archive import ArchiveReader, load_manifest
+from pyreg.py2xml_batch import batch2dir, find_modules
+from pyreg.py2xml_git import parse_revisions, git_changes, incremental
+
+
+pytestmark = [
+    pytest.mark.skipif(shutil.which('git') is None, reason='requires git'),
+    pytest.mark.skipif(sys.version_info < (3, 8),
+                       reason='shared_memory requires python3.8+'),
+    ]
+
+
+def git(repo, *args):
+    cmd = ['git', '-c', 'user.name=test', '-c', 'user.email=test@x',
+           '-c', 'commit.gpgsign=false'] + list(args)
+    subprocess.check_output(cmd, cwd=str(repo))
+
+
+@pytest.fixture
+def repo(tmpdir):
+    repo = tmpdir.mkdir('repo')
+    git(repo, 'init', '-q')
+    repo.mkdir('pkg').join('a.py').write('a = 1\n')
+    repo.join('pkg', 'b.py').write('b = 1\n')
+    repo.join('c.py').write('c = 1\n')
+    repo.join('readme.txt').write('text\n')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', 'first')
+    git(repo, 'tag', 'v1')
+    # second commit
+    repo.join('pkg', 'a.py').write('a = 2\n')
+    repo.join('c.py').remove()
+    repo.join('d.py').write('d = 1\n')
+    repo.join('readme.txt').write('changed\n')
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'second')
+    git(repo, 'branch', '-M', 'master')
+    return repo
+
+
+class TestGitChanges:
+    def test_parse_revisions(self):
+        assert parse_revisions('v1') == ('v1', None)
+        assert parse_revisions('v1..v2') == ('v1', 'v2')
+        assert parse_revisions('v1..') == ('v1', 'HEAD')
+
+    def test_revisions(self, repo):
+        assert git_changes('v1', 'HEAD', str(repo)) == \
+            (['d.py', 'pkg/a.py'], ['c.py'])
+
+    def test_working_tree(self, repo):
+        repo.join('pkg', 'b.py').write('b = 2\n')
+        repo.join('new.py').write('n = 1\n')
+        assert git_changes('HEAD', None, str(repo)) == \
+            (['new.py', 'pkg/b.py'], [])
+
+
+def first_version(repo, tmpdir, out):
+    """convert all modules from first commit"""
+    git(repo, 'checkout', '-q', 'v1')
+    files = find_modules([str(repo)])
+    batch2dir(files, out, str(repo), workers=1)
+    git(repo, 'checkout', '-q', 'master')
+
+
+class TestIncremental:
+    def test_dir(self, repo, tmpdir):
+        out = str(tmpdir.join('out'))
+        first_version(repo, tmpdir, out)
+        b_mtime = os.path.getmtime(os.path.join(out, 'pkg', 'b.py.xml'))
+
+        summary = incremental(out, 'v1', str(repo), workers=1)
+        assert summary['converted'] == ['d.py', 'pkg/a.py']
+        assert summary['removed'] == ['c.py']
+        assert not summary['errors']
+        assert not os.path.exists(os.path.join(out, 'c.py.xml'))
+        with open(os.path.join(out, 'pkg', 'a.py.xml')) as fp:
+            assert fp.read() == py2xml(fromstring='a = 2\n')
+        assert os.path.getmtime(os.path.join(out, 'pkg', 'b.py.xml')) == \
+            b_mtime
+        assert sorted(load_manifest(out)) == ['d.py', 'pkg/a.py', 'pkg/b.py']
+
+        # idempotent
+        summary = incremental(out, 'v1', str(repo), workers=1)
+        assert summary['converted'] == []
+        assert summary['skipped'] == ['d.py', 'pkg/a.py']
+        assert summary['removed'] == []
+
+    def test_archive_revisions(self, repo, tmpdir):
+        out = str(tmpdir.join('out.zip'))
+        git(repo, 'checkout', '-q', 'v1')
+        from pyreg.py2xml_archive import batch2archive
+        batch2archive(find_modules([str(repo)]), out, str(repo), workers=1)
+        # converted from HEAD revision, not from working tree
+        summary = incremental(out, 'v1..master', str(repo), workers=1)
+        assert summary['converted'] == ['d.py', 'pkg/a.py']
+        with ArchiveReader(out) as reader:
+            assert sorted(reader.members) == ['d.py', 'pkg/a.py', 'pkg/b.py']
+            assert reader.xml2py('pkg/a.py') == 'a = 2\n'
+            assert reader.xml2py('pkg/b.py') == 'b = 1\n'
+
+    @pytest.mark.parametrize('name', ['out', 'out.zip'])
+    def test_syntax_error_keeps_output(self, repo, tmpdir, name):
+        out = str(tmpdir.join(name))
+        git(repo, 'checkout', '-q', 'v1')
+        files = find_modules([str(repo)])
+        if name.endswith('.zip'):
+            from pyreg.py2xml_archive import batch2archive
+            batch2archive(files, out, str(repo), workers=1)
+        else:
+            batch2dir(files, out, str(repo), workers=1)
+        git(repo, 'checkout', '-q', 'master')
+        old_entry = load_manifest(out)['pkg/b.py']
+        repo.join('pkg', 'b.py').write('b = (\n')
+
+        for _ in range(2):
+            summary = incremental(out, 'v1', str(repo), workers=1)
+            assert [os.path.basename(result.path)
+                    for result in summary['errors']] == ['b.py']
+            assert 'pkg/b.py' not in summary['skipped']
+            assert 'pkg/b.py' not in summary['converted']
+            # previous output is kept
+            assert load_manifest(out)['pkg/b.py'] == old_entry
+            if name.endswith('.zip'):
+                with ArchiveReader(out) as reader:
+                    assert reader.xml2py('pkg/b.py') == 'b = 1\n'
+            else:
+                with open(os.path.join(out, 'pkg', 'b.py.xml')) as fp:
+                    assert fp.read() == py2xml(fromstring='b = 1\n')
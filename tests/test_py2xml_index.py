@@ -0,0 +1,81 @@
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from pyreg.py2xml import py2xml
+from pyreg.py2xml_index import build_index, write_index, NodeIndex
+
+
+SOURCE = '''from . import x
+def f(a, b=1):
+    return a < b and "ä&ö"
+'''
+
+
+class TestPositions:
+    def test_attributes(self):
+        xml = py2xml(fromstring='x = 1', positions=True)
+        positions = [(ele.tag, ele.get('start'), ele.get('end'))
+                     for ele in ET.fromstring(xml).iter()]
+        assert positions == [
+            ('Module', '0', '5'), ('Assign', '0', '5'),
+            ('targets', '0', '4'), ('Name', '0', '1'), ('Num', '4', '5')]
+
+    def test_byte_offset(self):
+        xml = py2xml(fromstring='"ä"; b', positions=True)
+        root = ET.fromstring(xml)
+        name = root.find('.//Name')
+        assert name.get('start') == '6'
+        assert name.get('end') == '7'
+
+
+class TestIndex:
+    def test_build_index(self):
+        src = SOURCE.encode('utf-8')
+        xml = py2xml(fromstring=SOURCE).encode('utf-8')
+        records = build_index(xml)
+        elements = list(ET.fromstring(xml).iter())
+        assert len(records) == len(elements)
+        for ele, (src_start, src_end, xml_start, xml_end) in \
+                zip(elements, records):
+            text = ''.join(ele.itertext()).encode('utf-8')
+            assert src[src_start:src_end] == text
+            assert ET.fromstring(xml[xml_start:xml_end]).tag == ele.tag
+
+    def test_same_as_attributes(self):
+        xml = py2xml(fromstring=SOURCE, positions=True)
+        records = build_index(xml.encode('utf-8'))
+        for ele, record in zip(ET.fromstring(xml).iter(), records):
+            assert (int(ele.get('start')), int(ele.get('end'))) == \
+                record[:2]
+
+    def test_write_load(self, tmpdir):
+        records = [(0, 5, 0, 40), (1, 3, 8, 30)]
+        index_file = tmpdir.join('x.idx')
+        with open(str(index_file), 'wb') as fp:
+            write_index(records, fp)
+        index = NodeIndex.load(str(index_file))
+        assert len(index) == 2
+        assert index[1] == (1, 3, 8, 30)
+        assert index[-1] == (1, 3, 8, 30)
+        with pytest.raises(IndexError):
+            index[2]
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            NodeIndex(b'XXXX' + bytes(10))
+        data = io.BytesIO()
+        write_index([(0, 1, 2, 3)], data)
+        with pytest.raises(ValueError):
+            NodeIndex(data.getvalue()[:-1])
+        with pytest.raises(ValueError):
+            NodeIndex(b'')
+
+    @pytest.mark.parametrize('content', [b'', b'PYX'])
+    def test_load_invalid(self, tmpdir, content):
+        index_file = tmpdir.join('x.idx')
+        index_file.write_binary(content)
+        with pytest.raises(ValueError) as exc_info:
+            NodeIndex.load(str(index_file))
+        assert 'Not a py2xml index file' == str(exc_info.value)
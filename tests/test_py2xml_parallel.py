@@ -0,0 +1,65 @@
+import sys
+
+import pytest
+
+from pyreg.py2xml import py2xml
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 8),
+                                reason='pos engine requires python3.8+')
+
+
+SOURCE = '''# comment
+import os
+
+X = (1, 2)  # trailing comment
+a = 1; b = 2
+
+@deco
+def f(x):
+    return x + 1
+''' * 5
+
+
+class TestSplitModule:
+    def test_chunks_cover_source(self):
+        from pyreg.py2xml_parallel import split_module
+        chunks = split_module(SOURCE, chunks=4)
+        assert len(chunks) > 1
+        assert chunks[0][0] == 0
+        assert chunks[-1][1] == len(SOURCE)
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            assert end == start
+            # starts on a line with a top-level statement
+            assert SOURCE[start-1] == '\n'
+            assert SOURCE[start] in '@Xai'
+
+    def test_single_statement(self):
+        from pyreg.py2xml_parallel import split_module
+        assert split_module('x = 1\n', chunks=4) == [(0, 6)]
+
+    def test_empty(self):
+        from pyreg.py2xml_parallel import split_module
+        assert split_module('# comment\n', chunks=4) == [(0, 10)]
+
+
+class TestParallel:
+    def test_same_as_serial(self):
+        from pyreg.py2xml_parallel import parallel_py2xml
+        assert parallel_py2xml(SOURCE, workers=2) == py2xml(fromstring=SOURCE)
+
+    @pytest.mark.parametrize('source', ['', '\n'])
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_empty_module(self, source, workers):
+        from pyreg.py2xml_parallel import parallel_py2xml
+        assert parallel_py2xml(source, workers=workers) == \
+            py2xml(fromstring=source)
+
+    def test_options(self):
+        from pyreg.py2xml_parallel import parallel_py2xml
+        assert parallel_py2xml(SOURCE, workers=2, skeleton=True) == \
+            py2xml(fromstring=SOURCE, skeleton=True)
+
+    def test_chunk_without_statements(self):
+        from pyreg.py2xml_parallel import _chunk2xml
+        assert _chunk2xml('# comment\n', {}) == '# comment\n'
+        assert _chunk2xml('', {}) == ''
@@ -0,0 +1,207 @@
+import sys
+
+import pytest
+
+from pyreg.py2xml import py2xml, xml2py
+
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 8),
+                                reason='pos engine requires python3.8+')
+
+
+def s2xml(string, **options):
+    """convert python code to XML, return string stripping the tag <Module>"""
+    result = py2xml(fromstring=string, engine='pos', **options)
+    return result[8:-9]
+
+
+
+class TestSrcBuffer:
+    def test_offset_unicode(self):
+        from pyreg.py2xml_pos import SrcBuffer
+        buf = SrcBuffer('a = 1\nä = "ö"\n')
+        assert buf.offset(2, 0) == 6
+        # col_offset is in bytes
+        assert buf.offset(2, 5) == 10
+
+    def test_offset_crlf(self):
+        from pyreg.py2xml_pos import SrcBuffer
+        buf = SrcBuffer('a = 1\r\nb = 2\r\n')
+        assert buf.offset(2, 4) == 11
+
+
+class TestParenthesis:
+    def test_tuple_parenthesis(self):
+        assert s2xml('(a, b), c') == \
+            '<Expr><Tuple ctx="Load">'\
+            '(<Tuple ctx="Load"><Name ctx="Load" name="a">a</Name>, '\
+            '<Name ctx="Load" name="b">b</Name></Tuple>), '\
+            '<Name ctx="Load" name="c">c</Name></Tuple></Expr>'
+
+    def test_subscript_space(self):
+        string = 'b [ a ]'
+        assert xml2py(fromstring=py2xml(fromstring=string)) == string
+
+
+class TestNewNodes:
+    def test_named_expr(self):
+        assert s2xml('(y := 5)') == \
+            '<Expr>(<NamedExpr><target><Name ctx="Store" name="y">y</Name>'\
+            '</target> := <value><Num>5</Num></value></NamedExpr>)</Expr>'
+
+    def test_ann_assign(self):
+        assert s2xml('x: int = 3') == \
+            '<AnnAssign><target><Name ctx="Store" name="x">x</Name></target>'\
+            ': <annotation><Name ctx="Load" name="int">int</Name>'\
+            '</annotation> = <value><Num>3</Num></value></AnnAssign>'
+
+    def test_async_await(self):
+        assert s2xml('async def f():\n    await x') == \
+            '<AsyncFunctionDef name="f">async def f<arguments>():'\
+            '</arguments><body>\n    <Expr><Await>await '\
+            '<Name ctx="Load" name="x">x</Name></Await></Expr></body>'\
+            '</AsyncFunctionDef>'
+
+    def test_posonly(self):
+        assert s2xml('def f(a, /, b): pass') == \
+            '<FunctionDef name="f">def f<arguments>(<arg name="a">a</arg>, '\
+            '/, <arg name="b">b</arg>):</arguments><body> <Pass>pass</Pass>'\
+            '</body></FunctionDef>'
+
+    def test_call_star_before_args(self):
+        assert s2xml('f(*a, b, **k)') == \
+            '<Expr><Call><func><Name ctx="Load" name="f">f</Name></func>('\
+            '<starargs>*<Name ctx="Load" name="a">a</Name></starargs>, '\
+            '<args><Name ctx="Load" name="b">b</Name>, </args>'\
+            '<kwargs>**<Name ctx="Load" name="k">k</Name></kwargs>)'\
+            '</Call></Expr>'
+
+    def test_dict_unpack(self):
+        assert s2xml('{**a}') == \
+            '<Expr><Dict>{<item>**<Name ctx="Load" name="a">a</Name></item>}'\
+            '</Dict></Expr>'
+
+    def test_joined_str(self):
+        assert s2xml("f'{x}' 'y'") == \
+            "<Expr><JoinedStr><s>f'{x}'</s> <s>'y'</s></JoinedStr></Expr>"
+
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason='python3.10+')
+    def test_match(self):
+        string = 'match x:\n    case [1, *r] | None:\n        pass\n'
+        assert s2xml(string) == \
+            '<Match>match <subject><Name ctx="Load" name="x">x</Name>'\
+            '</subject>:<cases><match_case>\n    case <pattern><MatchOr>'\
+            '<MatchSequence>[<MatchValue><Num>1</Num></MatchValue>, '\
+            '<MatchStar name="r">*r</MatchStar>]</MatchSequence> | '\
+            '<MatchSingleton>None</MatchSingleton></MatchOr></pattern>:'\
+            '<body>\n        <Pass>pass</Pass></body></match_case></cases>'\
+            '</Match>\n'
+
+    def test_roundtrip(self):
+        string = ('@deco\nasync def f(a, /, *, b: int = (1)) -> None:\n'
+                  '    async with a as (b, c):\n'
+                  '        return [x async for x in b if (y := x)]\n')
+        assert xml2py(fromstring=py2xml(fromstring=string)) == string
+
+
+class TestRaw:
+    SOURCE = ('import os\n'
+              'X = (\n    (1, 2),\n)\n'
+              '@deco\n'
+              'def f(a=1):\n    # comment\n    return (a +\n            2)\n')
+
+    def test_skeleton(self):
+        assert s2xml(self.SOURCE, skeleton=True) == \
+            '<Import>import <alias><name>os</name></alias></Import>\n'\
+            '<raw node="Assign">X = (\n    (1, 2),\n)</raw>\n'\
+            '<FunctionDef name="f"><decorator>@<Name ctx="Load" '\
+            'name="deco">deco</Name></decorator>\n'\
+            'def f<arguments>(<arg name="a">a<default>=<Num>1</Num>'\
+            '</default></arg>):</arguments><body>\n    # comment\n    '\
+            '<raw node="body">return (a +\n            2)</raw></body>'\
+            '</FunctionDef>\n'
+
+    def test_max_depth(self):
+        assert s2xml('x = (a + b)', max_depth=1) == \
+            '<Assign><targets><raw node="Name">x</raw> = </targets>'\
+            '(<raw node="BinOp">a + b</raw>)</Assign>'
+
+    def test_max_depth_decorator(self):
+        assert s2xml('@deco\ndef f(): pass', max_depth=0) == \
+            '<raw node="FunctionDef">@deco\ndef f(): pass</raw>'
+
+    @pytest.mark.parametrize('depth', [0, 1, 2, 3, 4])
+    def test_roundtrip(self, depth):
+        xml = py2xml(fromstring=self.SOURCE, max_depth=depth)
+        assert xml2py(fromstring=xml) == self.SOURCE
+
+    def test_roundtrip_skeleton(self):
+        xml = py2xml(fromstring=self.SOURCE, skeleton=True)
+        assert xml2py(fromstring=xml) == self.SOURCE
+
+    def test_token_engine(self):
+        with pytest.raises(ValueError):
+            py2xml(fromstring='x', engine='token', skeleton=True)
+
+
+class TestSelect:
+    SOURCE = ('import os\n'
+              'class A:\n'
+              '    x = 1\n'
+              '\n'
+              '    @deco\n'
+              '    def foo(self):\n'
+              '        if self:\n'
+              '            return 1\n'
+              '        return 2\n'
+              '\n'
+              '    def bar(self): pass\n')
+
+    def test_select(self):
+        assert s2xml(self.SOURCE, select='A.bar') == \
+            '<FunctionDef name="bar">def bar<arguments>(<arg name="self">'\
+            'self</arg>):</arguments><body> <Pass>pass</Pass></body>'\
+            '</FunctionDef>'
+
+    def test_select_same_as_full(self):
+        import xml.etree.ElementTree as ET
+        full = ET.fromstring(py2xml(fromstring=self.SOURCE))
+        func = full.find('.//FunctionDef')
+        func.tail = None
+        part = ET.fromstring(py2xml(fromstring=self.SOURCE, select='A.foo'))
+        assert ET.tostring(part[0]) == ET.tostring(func)
+
+    def test_select_source(self):
+        xml = py2xml(fromstring=self.SOURCE, select='A.foo')
+        assert xml2py(fromstring=xml) == \
+            '@deco\n    def foo(self):\n        if self:\n'\
+            '            return 1\n        return 2'
+
+    def test_select_not_found(self):
+        with pytest.raises(ValueError):
+            py2xml(fromstring=self.SOURCE, select='A.baz')
+
+    def test_lines_top_level(self):
+        xml = py2xml(fromstring=self.SOURCE, lines=(1, 2))
+        assert xml2py(fromstring=xml) == self.SOURCE[:-1]
+
+    def test_lines_nested(self):
+        xml = py2xml(fromstring=self.SOURCE, lines=(8, 9))
+        assert xml2py(fromstring=xml) == \
+            'if self:\n            return 1\n        return 2'
+
+    def test_lines_decorator(self):
+        xml = py2xml(fromstring=self.SOURCE, lines=(3, 5))
+        assert xml2py(fromstring=xml) == \
+            'x = 1\n\n    @deco\n    def foo(self):\n        if self:\n'\
+            '            return 1\n        return 2'
+
+    def test_parsed_tree(self):
+        import ast
+        tree = ast.parse(self.SOURCE)
+        assert py2xml(fromstring=self.SOURCE, tree=tree) == \
+            py2xml(fromstring=self.SOURCE)
+
+    def test_lines_empty(self):
+        with pytest.raises(ValueError):
+            py2xml(fromstring='x = 1\n\n\ny = 2\n', lines=(2, 3))
@@ -0,0 +1,150 @@
+import sys
+import socket
+import threading
+
+import pytest
+
+from pyreg.py2xml import py2xml
+from pyreg.astview import AstNode
+from pyreg.serve import Server, Client, ResultCache, main, _warm_up
+from pyreg.serve import remove_stale_socket
+
+
+@pytest.fixture
+def server(tmpdir):
+    socket_path = str(tmpdir.join('pyreg.sock'))
+    server = Server(socket_path, workers=1, cache_size=2)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+class TestResultCache:
+    def test_lru(self):
+        cache = ResultCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+
+    def test_disabled(self):
+        cache = ResultCache(0)
+        cache.put('a', 1)
+        assert cache.get('a') is None
+
+
+class TestWarmUp:
+    def test_templates_loaded(self, monkeypatch):
+        monkeypatch.setattr(AstNode, 'MAP', None)
+        monkeypatch.setattr(AstNode, 'load_map', classmethod(
+            lambda cls: setattr(cls, 'MAP', {})))
+        _warm_up()
+        assert AstNode.MAP == {}
+        assert AstNode.node_template.name == 'ast_node.html'
+
+    def test_missing_map(self, monkeypatch):
+        def load_map(cls):
+            raise FileNotFoundError('python99.asdl.json')
+        monkeypatch.setattr(AstNode, 'MAP', None)
+        monkeypatch.setattr(AstNode, 'load_map', classmethod(load_map))
+        _warm_up()
+        assert AstNode.MAP is None
+
+
+class TestRemoveStaleSocket:
+    def test_stale(self, tmpdir):
+        path = str(tmpdir.join('stale.sock'))
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.close()
+        remove_stale_socket(path)
+        assert not tmpdir.join('stale.sock').check()
+
+    def test_not_socket(self, tmpdir):
+        path = tmpdir.join('file.txt')
+        path.write('data')
+        with pytest.raises(FileExistsError):
+            Server(str(path), workers=1)
+        assert 'data' == path.read()
+
+    def test_server_running(self, server):
+        with pytest.raises(OSError) as exc_info:
+            Server(server.socket_path, workers=1)
+        assert 'already running' in str(exc_info.value)
+        with Client(server.socket_path) as client:
+            assert client.request('py2xml', 'x')['ok']
+
+    def test_cmd_server_running(self, server, capsys):
+        with pytest.raises(SystemExit) as exc_info:
+            main(['--socket', server.socket_path, 'serve'])
+        assert 2 == exc_info.value.code
+        assert 'already running' in capsys.readouterr()[1]
+
+
+class TestServer:
+    def test_py2xml(self, server):
+        with Client(server.socket_path) as client:
+            response = client.request('py2xml', 'x = 1\n')
+            assert response == {'ok': True, 'cached': False,
+                                'result': py2xml(fromstring='x = 1\n')}
+            assert client.request('py2xml', 'x = 1\n')['cached']
+
+    @pytest.mark.skipif(sys.version_info < (3, 8),
+                        reason='pos engine requires python3.8+')
+    def test_options(self, server):
+        source = 'class A:\n    def f(self): pass\n'
+        with Client(server.socket_path) as client:
+            response = client.request('py2xml', source, engine='pos',
+                                      select='A.f')
+        assert response['result'] == \
+            py2xml(fromstring=source, engine='pos', select='A.f')
+
+    def test_path(self, server, tmpdir):
+        module = tmpdir.join('mod.py')
+        module.write('x = 1\n')
+        with Client(server.socket_path) as client:
+            xml = client.request('py2xml', path=str(module))['result']
+            assert client.request('xml2py', xml)['result'] == 'x = 1\n'
+            assert client.request('check', path=str(module))['result'] == ''
+
+    def test_error(self, server):
+        with Client(server.socket_path) as client:
+            response = client.request('py2xml', 'def (')
+            assert not response['ok']
+            assert response['error'].startswith('SyntaxError')
+            assert not client.request('foo', 'x')['ok']
+
+    def test_astview_txt(self, server):
+        with Client(server.socket_path) as client:
+            response = client.request('astview', 'x', format='txt')
+        assert response['result'].startswith('Module(')
+
+    def test_invalid_json(self, server):
+        client = Client(server.socket_path)
+        client.sock.sendall(b'{not json\n{"op": "xml2py", "source": "<a>b</a>"'
+                            b', "id": 3}\n')
+        assert client.rfile.readline().startswith(b'{"ok": false')
+        assert client.rfile.readline() == \
+            b'{"ok": true, "result": "b", "cached": false, "id": 3}\n'
+        client.close()
+
+
+class TestClientCli:
+    def test_py2xml(self, server, tmpdir, capsys):
+        module = tmpdir.join('mod.py')
+        module.write('x = 1\n')
+        main(['--socket', server.socket_path, 'py2xml', str(module)])
+        assert capsys.readouterr().out == py2xml(str(module))
+
+    def test_error(self, server, tmpdir, capsys):
+        module = tmpdir.join('mod.py')
+        module.write('def (\n')
+        with pytest.raises(SystemExit) as exc_info:
+            main(['--socket', server.socket_path, 'py2xml', str(module)])
+        assert exc_info.value.code == 2